@@ -0,0 +1,60 @@
+"""
+Benchmark the unformatted code detector over a corpus of real messages.
+
+The corpus is either a JSON lines file with one message per line (like the
+messages export) or the last messages of the database pointed by ``POSTGRES_DSN``.
+
+Usage: ``PYTHONPATH=. python benchmarks/code_detection.py [messages.jsonl]``
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import statistics
+
+import asyncpg
+from sirbot_pyslackers.plugins.snippets import looks_like_code
+
+LIMIT = 100_000
+
+
+def load_file(path):
+    with open(path) as f:
+        return [json.loads(line).get("text") or "" for line in f]
+
+
+async def load_database(dsn):
+    connection = await asyncpg.connect(dsn)
+    try:
+        rows = await connection.fetch(
+            """SELECT text FROM slack.messages ORDER BY id DESC LIMIT $1""", LIMIT
+        )
+    finally:
+        await connection.close()
+    return [row["text"] or "" for row in rows]
+
+
+def main():
+    if len(sys.argv) > 1:
+        corpus = load_file(sys.argv[1])
+    else:
+        corpus = asyncio.run(load_database(os.environ["POSTGRES_DSN"]))
+
+    timings, detected = [], 0
+    for text in corpus:
+        start = time.perf_counter_ns()
+        result = looks_like_code(text)
+        timings.append(time.perf_counter_ns() - start)
+        detected += result
+
+    timings.sort()
+    print(f"{len(corpus)} messages, {detected} detected as code")
+    print(f"mean: {statistics.mean(timings):.0f} ns")
+    print(f"median: {timings[len(timings) // 2]} ns")
+    print(f"p99: {timings[int(len(timings) * 0.99)]} ns")
+    print(f"max: {timings[-1]} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark the flood detector with 10k active users.
+
+Usage: ``PYTHONPATH=. python benchmarks/flood.py``
+"""
+import time
+import random
+import tracemalloc
+
+from sirbot_pyslackers.plugins.flood import FloodPlugin
+
+USERS = 10_000
+CHANNELS = 200
+MESSAGES = 1_000_000
+
+
+def main():
+    users = [f"U{i:08d}" for i in range(USERS)]
+    channels = [f"C{i:08d}" for i in range(CHANNELS)]
+    messages = [
+        {"user": random.choice(users), "channel": random.choice(channels)}
+        for _ in range(MESSAGES)
+    ]
+
+    tracemalloc.start()
+    plugin = FloodPlugin()
+    now = 0.0
+    start = time.perf_counter()
+    for message in messages:
+        now += 0.01
+        plugin.record(message, now=now)
+    elapsed = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{len(plugin.users)} users and {len(plugin.channels)} channels tracked")
+    print(f"{elapsed / MESSAGES * 1e9:.0f} ns per message (with tracemalloc)")
+    print(f"{memory / 1024 / 1024:.1f} MiB ({memory / USERS:.0f} bytes per user)")
+
+    plugin = FloodPlugin()
+    start = time.perf_counter()
+    for message in messages:
+        plugin.record(message)
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed / MESSAGES * 1e9:.0f} ns per message")
+
+
+if __name__ == "__main__":
+    main()
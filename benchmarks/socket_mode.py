@@ -0,0 +1,115 @@
+"""
+Compare the latency of slack events received over HTTP webhooks and socket mode.
+
+Both modes run against a local bot. In webhook mode every event is a new HTTP
+connection, as slack does. In socket mode events are sent over one websocket.
+The latency is measured until the handler runs and until slack gets its response
+or acknowledgement.
+
+Usage: ``PYTHONPATH=. python benchmarks/socket_mode.py``
+"""
+import json
+import time
+import asyncio
+import statistics
+
+import aiohttp
+from sirbot import SirBot
+from aiohttp import web
+from sirbot.plugins.slack import SlackPlugin
+from sirbot_pyslackers import plugins
+
+EVENTS = 1000
+
+
+def payload(i):
+    return {
+        "token": "verify",
+        "type": "event_callback",
+        "event": {"type": "message", "text": str(i), "channel": "C1", "user": "U1"},
+    }
+
+
+def report(mode, handled, acked):
+    for name, latencies in (("handler", handled), ("response", acked)):
+        latencies = sorted(latencies)
+        print(
+            f"{mode:>8} {name:>8}: median {statistics.median(latencies) * 1e3:.2f} ms"
+            f", p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f} ms"
+        )
+
+
+async def serve(app):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]
+
+
+async def main():
+    sent, handled = {}, []
+
+    async def on_message(message, app):
+        handled.append(time.perf_counter() - sent[message["text"]])
+
+    stub = web.Application()
+    stub["ws"] = asyncio.get_event_loop().create_future()
+
+    async def connections_open(request):
+        return web.json_response({"ok": True, "url": f"ws://{request.host}/link"})
+
+    async def link(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"type": "hello"})
+        stub["ws"].set_result(ws)
+        await asyncio.sleep(3600)
+
+    stub.router.add_post("/apps.connections.open", connections_open)
+    stub.router.add_get("/link", link)
+    stub_runner, stub_port = await serve(stub)
+
+    bot = SirBot()
+    slack = SlackPlugin(token="xoxb", verify="verify")
+    slack.on_message(".*", on_message)
+    bot.load_plugin(slack)
+    bot.load_plugin(plugins.TasksPlugin())
+    bot.load_plugin(
+        plugins.SocketModePlugin(
+            app_token="xapp", api_url=f"http://127.0.0.1:{stub_port}/"
+        )
+    )
+    bot_runner, bot_port = await serve(bot)
+
+    acked = []
+    connector = aiohttp.TCPConnector(force_close=True)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for i in range(EVENTS):
+            sent[str(i)] = time.perf_counter()
+            async with session.post(
+                f"http://127.0.0.1:{bot_port}/slack/events", json=payload(i)
+            ) as r:
+                assert r.status == 200
+            acked.append(time.perf_counter() - sent[str(i)])
+    report("webhook", handled, acked)
+
+    handled.clear()
+    acked.clear()
+    ws = await stub["ws"]
+    for i in range(EVENTS):
+        sent[str(i)] = time.perf_counter()
+        await ws.send_json(
+            {"envelope_id": str(i), "type": "events_api", "payload": payload(i)}
+        )
+        ack = json.loads((await ws.receive()).data)
+        acked.append(time.perf_counter() - sent[ack["envelope_id"]])
+    await asyncio.sleep(0.1)
+    report("socket", handled, acked)
+
+    await bot_runner.cleanup()
+    await stub_runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -14,12 +14,13 @@ from sirbot.plugins.postgres import PgPlugin
 from sirbot.plugins.apscheduler import APSchedulerPlugin
 from sirbot.plugins.readthedocs import RTDPlugin
 
-from . import endpoints
-from .plugins import PypiPlugin, StocksPlugin
+from . import log, plugins, exporter, importer, endpoints, compaction
+from .supervisor import Supervisor
 
 PORT = os.environ.get("SIRBOT_PORT", os.environ.get("PORT", 9000))
 HOST = os.environ.get("SIRBOT_ADDR", "127.0.0.1")
-VERSION = "0.0.11"
+WORKERS = int(os.environ.get("SIRBOT_WORKERS", 1))
+VERSION = "0.0.18"
 LOG = logging.getLogger(__name__)
 PSH_CONFIG = platformshconfig.Config()
 
@@ -54,6 +55,9 @@ def setup_logging():
     if sentry_dsn:
         make_sentry_logger(sentry_dsn)
 
+    # Sentry events and stdout writes are handled out of the event loop thread
+    log.start_queue()
+
 
 def configure_postgresql_plugin():
 
@@ -78,31 +82,97 @@ def configure_postgresql_plugin():
         )
 
 
-if __name__ == "__main__":
+def configure_read_replica_plugin():
+    return plugins.ReadReplicaPlugin(dsn=os.environ.get("POSTGRES_READ_DSN"))
 
-    setup_logging()
 
-    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
-        postgres = configure_postgresql_plugin()
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(postgres.startup(None))
-        sys.exit(0)
+def configure_snapshot_plugin(worker_id):
+    if "SNAPSHOT_PATH" in os.environ:
+        path = os.environ["SNAPSHOT_PATH"]
+    elif PSH_CONFIG.is_valid_platform():
+        path = os.path.join(PSH_CONFIG.appDir, "snapshots", "caches.snapshot")
+    else:
+        return None
+
+    # Every worker restores the snapshot of the primary worker caches
+    return plugins.SnapshotPlugin(path=path, save=worker_id == 0)
 
+
+def make_bot(worker_id=0):
+    """
+    Create the bot and load all its plugins.
+
+    Scheduled jobs only run in the primary worker (``worker_id == 0``).
+    """
     bot = SirBot()
 
     slack = SlackPlugin()
     endpoints.slack.create_endpoints(slack)
     bot.load_plugin(slack)
 
-    pypi = PypiPlugin()
+    notifications = plugins.NotificationsPlugin()
+    bot.load_plugin(notifications)
+
+    lookups = plugins.LookupsPlugin()
+    bot.load_plugin(lookups)
+
+    pypi = plugins.PypiPlugin()
     bot.load_plugin(pypi)
 
-    stocks = StocksPlugin()
+    stocks = plugins.StocksPlugin()
     bot.load_plugin(stocks)
 
+    github = plugins.GithubPlugin()
+    bot.load_plugin(github)
+
+    keywords = plugins.KeywordsPlugin()
+    bot.load_plugin(keywords)
+
+    flood = plugins.FloodPlugin()
+    bot.load_plugin(flood)
+
+    duplicates = plugins.DuplicatesPlugin()
+    bot.load_plugin(duplicates)
+
+    snippets = plugins.SnippetsPlugin()
+    bot.load_plugin(snippets)
+
+    tasks = plugins.TasksPlugin(
+        pools={
+            "messages": (20, 500),
+            "lookups": (5, 50),
+            "events": (5, 100),
+            "socket_mode": (50, 200),
+        }
+    )
+    bot.load_plugin(tasks)
+
+    if "SLACK_APP_TOKEN" in os.environ:
+        socket_mode = plugins.SocketModePlugin()
+        bot.load_plugin(socket_mode)
+
+    archive = plugins.ArchivePlugin()
+    bot.load_plugin(archive)
+
+    diagnostics = plugins.DiagnosticsPlugin()
+    bot.load_plugin(diagnostics)
+
+    metrics = plugins.MetricsPlugin()
+    bot.load_plugin(metrics)
+
+    health = plugins.HealthPlugin()
+    bot.load_plugin(health)
+
+    snapshot = configure_snapshot_plugin(worker_id)
+    if snapshot:
+        bot.load_plugin(snapshot)
+
     scheduler = APSchedulerPlugin(timezone="UTC")
     endpoints.apscheduler.create_jobs(scheduler, bot)
-    bot.load_plugin(scheduler)
+    jobs = plugins.JobsPlugin(scheduler.scheduler)
+    bot.load_plugin(jobs)
+    if worker_id == 0:
+        bot.load_plugin(scheduler)
 
     readthedocs = RTDPlugin()
     endpoints.readthedocs.register(readthedocs)
@@ -111,4 +181,51 @@ if __name__ == "__main__":
     postgres = configure_postgresql_plugin()
     bot.load_plugin(postgres)
 
-    bot.start(host=HOST, port=PORT, print=False)
+    replica = configure_read_replica_plugin()
+    bot.load_plugin(replica)
+
+    return bot
+
+
+if __name__ == "__main__":
+
+    setup_logging()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        postgres = configure_postgresql_plugin()
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(postgres.startup(None))
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "import":
+        if len(sys.argv) != 3:
+            sys.exit("usage: python -m sirbot_pyslackers import <export.zip>")
+        postgres = configure_postgresql_plugin()
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(postgres.startup(None))
+        loop.run_until_complete(importer.import_export(postgres, sys.argv[2]))
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "compact":
+        postgres = configure_postgresql_plugin()
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(postgres.startup(None))
+        loop.run_until_complete(compaction.compact_tables(postgres))
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        args = exporter.parse_args(sys.argv[2:])
+        if "POSTGRES_READ_DSN" in os.environ:
+            postgres = PgPlugin(dsn=os.environ["POSTGRES_READ_DSN"])
+        else:
+            postgres = configure_postgresql_plugin()
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(postgres.startup(None))
+        loop.run_until_complete(exporter.export(postgres, **vars(args)))
+        sys.exit(0)
+
+    if WORKERS > 1:
+        Supervisor(make_bot, WORKERS).run(host=HOST, port=PORT)
+    else:
+        bot = make_bot()
+        bot.start(host=HOST, port=PORT, print=False)
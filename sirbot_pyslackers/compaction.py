@@ -0,0 +1,125 @@
+import json
+import logging
+
+LOG = logging.getLogger(__name__)
+# Fields of the raw payloads stored in their own column, and fields with a known
+# constant value. They are removed from ``raw`` when written and restored on read.
+TABLES = {
+    "slack.messages": {
+        "columns": {"ts": "id", "text": "text", "user": "user", "channel": "channel"},
+        "constants": {"type": "message"},
+    },
+    "slack.users": {
+        "columns": {
+            "id": "id",
+            "deleted": "deleted",
+            "is_admin": "admin",
+            "is_bot": "bot",
+        },
+        "constants": {},
+    },
+    "slack.channels": {
+        "columns": {"id": "id"},
+        "constants": {
+            "is_channel": True,
+            "is_group": False,
+            "is_im": False,
+            "is_mpim": False,
+            "is_private": False,
+        },
+    },
+}
+
+
+def compact(table, raw, row):
+    """
+    Remove from ``raw`` the fields equal to their column in ``row`` or to their
+    constant value.
+
+    Columns missing from ``row``, or null, are not used: only pass the columns
+    stored alongside ``raw``.
+    """
+    spec = TABLES[table]
+    compacted = dict(raw)
+    for field, column in spec["columns"].items():
+        value = row.get(column)
+        if value is not None and compacted.get(field) == value:
+            del compacted[field]
+    for field, value in spec["constants"].items():
+        if field in compacted and compacted[field] == value:
+            del compacted[field]
+    return compacted
+
+
+def expand(table, raw, row):
+    """Restore the fields removed from a compacted ``raw`` payload"""
+    if raw is None:
+        return None
+
+    spec = TABLES[table]
+    columns = {
+        field: row[column]
+        for field, column in spec["columns"].items()
+        if row[column] is not None
+    }
+    return {**spec["constants"], **columns, **raw}
+
+
+async def compact_tables(postgres, batch_size=5000):
+    """
+    Compact the raw payloads already stored, by batches of ``batch_size`` rows.
+
+    Returns:
+        Number of compacted rows, and size of the payloads in bytes before and
+        after, per table.
+    """
+    report = {}
+    for table in TABLES:
+        stats = report[table] = {"rows": 0, "before": 0, "after": 0}
+        query = _compact_query(table)
+        last = ""
+        async with postgres.connection() as pg_con:
+            while True:
+                batch = await pg_con.fetchrow(query, last, batch_size)
+                if not batch["rows"]:
+                    break
+
+                last = batch["last"]
+                for key in stats:
+                    stats[key] += batch[key]
+
+        saved = stats["before"] - stats["after"]
+        LOG.info(
+            "Compacted %s rows of %s, %s bytes saved (%.0f%%)",
+            stats["rows"],
+            table,
+            saved,
+            100 * saved / stats["before"] if stats["before"] else 0,
+        )
+    return report
+
+
+def _compact_query(table):
+    spec = TABLES[table]
+    values = [
+        (field, f'to_jsonb(t."{column}")') for field, column in spec["columns"].items()
+    ] + [
+        (field, f"'{json.dumps(value)}'::jsonb")
+        for field, value in spec["constants"].items()
+    ]
+    removed = ", ".join(
+        f"CASE WHEN t.raw -> '{field}' = {value} THEN '{field}' END"
+        for field, value in values
+    )
+    return f"""WITH batch AS (
+  SELECT id, pg_column_size(raw) AS size FROM {table}
+  WHERE id > $1 AND raw IS NOT NULL ORDER BY id LIMIT $2
+), compacted AS (
+  UPDATE {table} AS t
+  SET raw = t.raw - array_remove(ARRAY[{removed}]::text[], NULL)
+  FROM batch WHERE t.id = batch.id
+  RETURNING t.id, batch.size AS before, pg_column_size(t.raw) AS after
+)
+SELECT count(*) AS rows, max(id) AS last, coalesce(sum(before), 0) AS before,
+  coalesce(sum(after), 0) AS after
+FROM compacted"""
@@ -1,19 +1,36 @@
+import time
+import asyncio
 import logging
 import datetime
+import functools
+from collections import defaultdict
 
 import pytz
 from slack import methods
 from slack.events import Message
 
+from ..compaction import compact
+from ..plugins.jobs import recorded
+from .slack.messages import FIAT_CURRENCY, quote_attachment
+
 LOG = logging.getLogger(__name__)
 
 
 def create_jobs(scheduler, bot):
-    scheduler.scheduler.add_job(slack_channel_list, "cron", hour=1, kwargs={"bot": bot})
-    scheduler.scheduler.add_job(slack_users_list, "cron", hour=2, kwargs={"bot": bot})
     scheduler.scheduler.add_job(
-        etc_finance_bell,
+        recorded(slack_channel_list), "cron", hour=1, kwargs={"bot": bot}
+    )
+    scheduler.scheduler.add_job(
+        recorded(slack_users_list), "cron", hour=2, kwargs={"bot": bot}
+    )
+    scheduler.scheduler.add_job(
+        recorded(archive_reconcile), "cron", hour=3, kwargs={"bot": bot}
+    )
+    scheduler.scheduler.add_job(
+        recorded(etc_finance_bell, "etc_finance_bell_open"),
         "cron",
+        id="etc_finance_bell_open",
+        name="etc_finance_bell_open",
         day_of_week="0-4",
         hour=9,
         minute=30,
@@ -21,15 +38,20 @@ def create_jobs(scheduler, bot):
         kwargs={"bot": bot, "state": "open"},
     )
     scheduler.scheduler.add_job(
-        etc_finance_bell,
+        recorded(etc_finance_bell, "etc_finance_bell_closed"),
         "cron",
+        id="etc_finance_bell_closed",
+        name="etc_finance_bell_closed",
         day_of_week="0-4",
         hour=16,
         timezone="America/New_York",
         kwargs={"bot": bot, "state": "closed"},
     )
     scheduler.scheduler.add_job(
-        advent_of_code,
+        recorded(watchlist_poll), "cron", minute="*/5", kwargs={"bot": bot}
+    )
+    scheduler.scheduler.add_job(
+        recorded(advent_of_code),
         "cron",
         month=12,
         day="1-25",
@@ -78,37 +100,126 @@ async def advent_of_code(bot):
 
 async def slack_channel_list(bot):
     LOG.info("Updating list of slack channels...")
+    channels = bot["plugins"]["slack"].api.iter(
+        methods.CHANNELS_LIST, minimum_time=3, data={"exclude_members": True}
+    )
+
     async with bot["plugins"]["pg"].connection() as pg_con:
-        async for channel in bot["plugins"]["slack"].api.iter(
-            methods.CHANNELS_LIST, minimum_time=3, data={"exclude_members": True}
-        ):
-            await pg_con.execute(
-                """INSERT INTO slack.channels (id, raw) VALUES ($1, $2)
-                                    ON CONFLICT (id) DO UPDATE SET raw = $2""",
-                channel["id"],
-                channel,
-            )
-    LOG.info("List of slack channels up to date.")
+        stats = await _pipeline(channels, functools.partial(_write_channels, pg_con))
+    LOG.info("List of slack channels up to date.", extra={"sync": stats})
+    return stats
 
 
 async def slack_users_list(bot):
     LOG.info("Updating list of slack users...")
+    users = bot["plugins"]["slack"].api.iter(methods.USERS_LIST, minimum_time=12)
+
     async with bot["plugins"]["pg"].connection() as pg_con:
-        async for user in bot["plugins"]["slack"].api.iter(
-            methods.USERS_LIST, minimum_time=12
-        ):
-            await pg_con.execute(
-                """INSERT INTO slack.users (id, name, deleted, admin, bot, raw) VALUES
-                                    ($1, $2, $3, $4, $5, $6) ON CONFLICT (id) DO UPDATE SET
-                                    name = $2, deleted = $3, admin = $4, bot = $5, raw = $6""",
-                user["id"],
-                user["profile"]["display_name"],
-                user.get("deleted", False),
-                user.get("is_admin", False),
-                user.get("is_bot", False),
-                user,
-            )
-    LOG.info("List of slack users up to date")
+        stats = await _pipeline(users, functools.partial(_write_users, pg_con))
+    LOG.info("List of slack users up to date", extra={"sync": stats})
+    return stats
+
+
+async def _write_channels(pg_con, batch):
+    await pg_con.executemany(
+        """INSERT INTO slack.channels (id, raw) VALUES ($1, $2)
+        ON CONFLICT (id) DO UPDATE SET raw = $2""",
+        [
+            (channel["id"], compact("slack.channels", channel, channel))
+            for channel in batch
+        ],
+    )
+
+
+async def _write_users(pg_con, batch):
+    await pg_con.executemany(
+        """INSERT INTO slack.users (id, name, deleted, admin, bot, raw) VALUES
+        ($1, $2, $3, $4, $5, $6) ON CONFLICT (id) DO UPDATE SET
+        name = $2, deleted = $3, admin = $4, bot = $5, raw = $6""",
+        [_user_row(user) for user in batch],
+    )
+
+
+def _user_row(user):
+    row = {
+        "id": user["id"],
+        "deleted": user.get("deleted", False),
+        "admin": user.get("is_admin", False),
+        "bot": user.get("is_bot", False),
+    }
+    return (
+        row["id"],
+        user["profile"]["display_name"],
+        row["deleted"],
+        row["admin"],
+        row["bot"],
+        compact("slack.users", user, row),
+    )
+
+
+async def _pipeline(items, write, batch_size=200, queue_size=2):
+    """
+    Write ``items`` by batches while the next ones are fetched.
+
+    A producer task fetches the items and a writer task persists them, with a
+    bounded queue of batches in between.
+
+    Returns:
+        Number of rows and batches, and the seconds spent fetching, writing and
+        in total.
+    """
+    queue = asyncio.Queue(queue_size)
+    stats = {"rows": 0, "batches": 0, "fetch": 0.0, "write": 0.0}
+    start = time.perf_counter()
+
+    tasks = [
+        asyncio.ensure_future(_produce(items, queue, batch_size, stats)),
+        asyncio.ensure_future(_consume(queue, write, stats)),
+    ]
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    for task in pending:
+        task.cancel()
+    for task in done:
+        task.result()
+
+    stats["total"] = time.perf_counter() - start
+    return stats
+
+
+async def _produce(items, queue, batch_size, stats):
+    batch = []
+    start = time.perf_counter()
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            stats["fetch"] += time.perf_counter() - start
+            await queue.put(batch)
+            batch = []
+            start = time.perf_counter()
+
+    stats["fetch"] += time.perf_counter() - start
+    if batch:
+        await queue.put(batch)
+    await queue.put(None)
+
+
+async def _consume(queue, write, stats):
+    while True:
+        batch = await queue.get()
+        if batch is None:
+            return
+
+        start = time.perf_counter()
+        await write(batch)
+        stats["write"] += time.perf_counter() - start
+        stats["rows"] += len(batch)
+        stats["batches"] += 1
+
+
+async def archive_reconcile(bot):
+    LOG.info("Reconciling activity rollups...")
+    await bot["plugins"]["archive"].reconcile()
+    LOG.info("Activity rollups reconciled")
 
 
 async def etc_finance_bell(bot, state):
@@ -146,3 +257,66 @@ async def etc_finance_bell(bot, state):
         ] = """:bell: :bell: :bell: The US Stock Market is now *CLOSED* for trading. :bell: :bell: :bell:"""
 
     await bot["plugins"]["slack"].api.query(url=methods.CHAT_POST_MESSAGE, data=message)
+
+
+async def watchlist_poll(bot):
+    async with bot["plugins"]["pg"].connection() as pg_con:
+        watches = await pg_con.fetch(
+            """SELECT id, channel, symbol, direction, threshold, "user", triggered
+            FROM stocks.watches"""
+        )
+
+    if not watches:
+        return 0
+
+    symbols = list({watch["symbol"] for watch in watches})
+    LOG.debug("Polling %s watched tickers", len(symbols))
+    quotes = await bot["plugins"]["stocks"].prices(symbols)
+
+    alerts = defaultdict(list)
+    triggered, rearmed = [], []
+    for watch in watches:
+        quote = quotes.get(watch["symbol"])
+        if quote is None:
+            continue
+
+        if watch["direction"] == "above":
+            crossed = quote.price > watch["threshold"]
+        else:
+            crossed = quote.price < watch["threshold"]
+
+        if crossed and not watch["triggered"]:
+            triggered.append(watch["id"])
+            alerts[watch["channel"]].append((watch, quote))
+        elif not crossed and watch["triggered"]:
+            rearmed.append(watch["id"])
+
+    async with bot["plugins"]["pg"].connection() as pg_con:
+        await pg_con.execute(
+            """UPDATE stocks.watches SET triggered = TRUE WHERE id = ANY($1)""",
+            triggered,
+        )
+        await pg_con.execute(
+            """UPDATE stocks.watches SET triggered = FALSE WHERE id = ANY($1)""",
+            rearmed,
+        )
+
+    for channel, items in alerts.items():
+        await _post_watch_alert(bot, channel, items)
+    return len(watches)
+
+
+async def _post_watch_alert(bot, channel, items):
+    message = Message()
+    message["channel"] = channel
+    message["text"] = "\n".join(
+        f":rotating_light: {quote.symbol} is {watch['direction']} "
+        f"${watch['threshold']:,} (<@{watch['user']}>)"
+        for watch, quote in items
+    )
+    quotes = {quote.symbol: quote for _, quote in items}
+    message["attachments"] = [
+        quote_attachment(quote, FIAT_CURRENCY["USD"]) for quote in quotes.values()
+    ]
+
+    await bot["plugins"]["slack"].api.query(url=methods.CHAT_POST_MESSAGE, data=message)
@@ -1,8 +1,5 @@
 import logging
 
-from slack import methods
-from slack.events import Message
-
 LOG = logging.getLogger(__name__)
 
 
@@ -12,7 +9,10 @@ def register(readthedocs):
 
 
 async def build_failure(data, app):
-    msg = Message()
-    msg["channel"] = "community_projects"
-    msg["text"] = f"""Building of {data["name"]} documentation failed ! :cry:"""
-    await app.plugins["slack"].api.query(methods.CHAT_POST_MESSAGE, data=msg)
+    text = f"""Building of {data["name"]} documentation failed ! :cry:"""
+    app["plugins"]["notifications"].notify(
+        "community_projects",
+        "build_failure",
+        {"fallback": text, "text": text, "color": "danger"},
+        key=data["name"],
+    )
@@ -10,7 +10,8 @@ from slack.events import Message
 from slack.exceptions import SlackAPIError
 from slack.io.aiohttp import SlackAPI
 
-from .utils import ADMIN_CHANNEL
+from .utils import SNIPPET_TIP, ADMIN_CHANNEL
+from ...plugins.tasks import PoolFull
 
 LOG = logging.getLogger(__name__)
 
@@ -35,9 +36,10 @@ async def topic_change_revert(action, app):
     response["channel"] = action["channel"]["id"]
     response["ts"] = action["message_ts"]
     response["attachments"] = action["original_message"]["attachments"]
-    response["attachments"][0]["color"] = "danger"
-    response["attachments"][0]["text"] = f'Change reverted by <@{action["user"]["id"]}>'
-    del response["attachments"][0]["actions"]
+    attachment = _clicked_attachment(response, action)
+    attachment["color"] = "danger"
+    attachment["text"] = f'Change reverted by <@{action["user"]["id"]}>'
+    del attachment["actions"]
 
     data = json.loads(action["actions"][0]["value"])
     await app.plugins["slack"].api.query(
@@ -53,11 +55,10 @@ async def topic_change_validate(action, app):
     response["channel"] = action["channel"]["id"]
     response["ts"] = action["message_ts"]
     response["attachments"] = action["original_message"]["attachments"]
-    response["attachments"][0]["color"] = "good"
-    response["attachments"][0][
-        "text"
-    ] = f'Change validated by <@{action["user"]["id"]}>'
-    del response["attachments"][0]["actions"]
+    attachment = _clicked_attachment(response, action)
+    attachment["color"] = "good"
+    attachment["text"] = f'Change validated by <@{action["user"]["id"]}>'
+    del attachment["actions"]
 
     await app.plugins["slack"].api.query(url=action["response_url"], data=response)
 
@@ -67,11 +68,10 @@ async def pin_added_validate(action, app):
     response["channel"] = action["channel"]["id"]
     response["ts"] = action["message_ts"]
     response["attachments"] = action["original_message"]["attachments"]
-    response["attachments"][0]["color"] = "good"
-    response["attachments"][0][
-        "pretext"
-    ] = f'Pin validated by <@{action["user"]["id"]}>'
-    del response["attachments"][0]["actions"]
+    attachment = _clicked_attachment(response, action)
+    attachment["color"] = "good"
+    attachment["pretext"] = f'Pin validated by <@{action["user"]["id"]}>'
+    del attachment["actions"]
 
     await app.plugins["slack"].api.query(url=action["response_url"], data=response)
 
@@ -82,9 +82,10 @@ async def pin_added_revert(action, app):
     response["channel"] = action["channel"]["id"]
     response["ts"] = action["message_ts"]
     response["attachments"] = action["original_message"]["attachments"]
-    response["attachments"][0]["color"] = "danger"
-    response["attachments"][0]["pretext"] = f'Pin reverted by <@{action["user"]["id"]}>'
-    del response["attachments"][0]["actions"]
+    attachment = _clicked_attachment(response, action)
+    attachment["color"] = "danger"
+    attachment["pretext"] = f'Pin reverted by <@{action["user"]["id"]}>'
+    del attachment["actions"]
 
     action_data = json.loads(action["actions"][0]["value"])
     remove_data = {"channel": action_data["channel"]}
@@ -138,7 +139,9 @@ async def report(action, app):
         {"title": "Comment", "value": action["submission"]["comment"], "short": False}
     )
 
-    await app.plugins["slack"].api.query(url=methods.CHAT_POST_MESSAGE, data=admin_msg)
+    app["plugins"]["notifications"].notify(
+        ADMIN_CHANNEL, "report", admin_msg["attachments"][0]
+    )
 
     async with app["plugins"]["pg"].connection() as pg_con:
         await pg_con.execute(
@@ -168,7 +171,9 @@ async def tell_admin(action, app):
         }
     ]
 
-    await app.plugins["slack"].api.query(url=methods.CHAT_POST_MESSAGE, data=admin_msg)
+    app["plugins"]["notifications"].notify(
+        ADMIN_CHANNEL, "tell_admin", admin_msg["attachments"][0]
+    )
 
     response = Message()
     response["response_type"] = "ephemeral"
@@ -187,14 +192,7 @@ async def make_snippet(action, app):
         tip_message = Message()
         tip_message["channel"] = action["channel"]["id"]
         tip_message["user"] = action["message"]["user"]
-        tip_message["text"] = (
-            "Please use the snippet feature, or backticks, when sharing code. You can do so by "
-            "clicking on the :heavy_plus_sign: on the left of the input box for a snippet.\n"
-            "For more information on snippets click "
-            "<https://get.slack.help/hc/en-us/articles/204145658-Create-a-snippet|here>.\n"
-            "For more information on inline code formatting with backticks click "
-            "<https://get.slack.help/hc/en-us/articles/202288908-Format-your-messages#inline-code|here>."
-        )
+        tip_message["text"] = SNIPPET_TIP
 
         await asyncio.gather(
             app.plugins["slack"].api.query(
@@ -227,23 +225,40 @@ async def user_cleanup_confirm(action, app):
     response["channel"] = action["channel"]["id"]
     response["ts"] = action["message_ts"]
     response["attachments"] = action["original_message"]["attachments"]
-    response["attachments"][0]["color"] = "good"
-    response["attachments"][0][
-        "text"
-    ] = f'Cleanup confirmed by <@{action["user"]["id"]}>'
-    del response["attachments"][0]["actions"]
+
+    user_id = action["actions"][0]["value"]
+    try:
+        app["plugins"]["tasks"].spawn(
+            "cleanup", _cleanup_user(app, user_id), name=f"cleanup {user_id}"
+        )
+    except PoolFull:
+        # The buttons are kept to try again
+        response["attachments"][0]["color"] = "warning"
+        response["attachments"][0][
+            "text"
+        ] = "Too many cleanups in progress, try again in a few minutes"
+    else:
+        response["attachments"][0]["color"] = "good"
+        response["attachments"][0][
+            "text"
+        ] = f'Cleanup confirmed by <@{action["user"]["id"]}>'
+        del response["attachments"][0]["actions"]
 
     await app.plugins["slack"].api.query(url=action["response_url"], data=response)
 
-    user_id = action["actions"][0]["value"]
-    asyncio.create_task(_cleanup_user(app, user_id))
+
+def _clicked_attachment(response, action):
+    """Attachment of the clicked button, notifications are grouped in one message"""
+    return response["attachments"][int(action["attachment_id"]) - 1]
 
 
 async def _cleanup_user(app, user):
     try:
         async with app["plugins"]["pg"].connection() as pg_con:
             messages = await pg_con.fetch(
-                """SELECT id, channel FROM slack.messages WHERE "user" = $1""", user
+                """SELECT id, channel FROM slack.messages
+                WHERE "user" = $1 AND deleted_at IS NULL""",
+                user,
             )
 
         api = SlackAPI(
@@ -255,6 +270,7 @@ async def _cleanup_user(app, user):
                 await api.query(url=methods.CHAT_DELETE, data=data)
             except SlackAPIError as e:
                 if e.error == "message_not_found":
+                    app["plugins"]["archive"].tombstone(message["id"])
                     continue
                 else:
                     LOG.exception(
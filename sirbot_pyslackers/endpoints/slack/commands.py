@@ -1,12 +1,31 @@
+import re
 import json
+import asyncio
 import logging
+import datetime
+from decimal import Decimal, InvalidOperation
 
 from slack import methods
+from aiohttp import ClientError
 from slack.events import Message
 
 from .utils import HELP_FIELD_DESCRIPTIONS
+from ...plugins.resilience import CircuitOpen
 
 LOG = logging.getLogger(__name__)
+MAX_KEYWORDS = 20
+STATS_DAYS = 7
+JOBS_HISTORY = 5
+JOB_OUTCOMES = {
+    "success": ":white_check_mark:",
+    "failure": ":x:",
+    "overlap": ":double_vertical_bar:",
+    "missed": ":warning:",
+}
+WATCH_REGEX = re.compile(
+    r"^(?P<symbol>\^?[A-Z.-]{1,10})\s+(?P<direction>above|below)\s+\$?(?P<threshold>[0-9.,]+)$",
+    flags=re.IGNORECASE,
+)
 
 
 def create_endpoints(plugin):
@@ -19,6 +38,10 @@ def create_endpoints(plugin):
     plugin.on_command("/snippet", snippet)
     plugin.on_command("/report", report)
     plugin.on_command("/resources", resources)
+    plugin.on_command("/watch", watch)
+    plugin.on_command("/alerts", keyword_alerts)
+    plugin.on_command("/stats", stats)
+    plugin.on_command("/jobs", jobs)
 
 
 async def just_ask(command, app):
@@ -126,7 +149,17 @@ async def pypi_search(command, app):
         response["response_type"] = "ephemeral"
         response["text"] = "Please enter the package name you wish to find"
     else:
-        results = await app.plugins["pypi"].search(command["text"])
+        try:
+            results = await app.plugins["pypi"].search(command["text"])
+        except (CircuitOpen, asyncio.TimeoutError, ClientError):
+            LOG.warning("PyPI search unavailable.")
+            response["response_type"] = "ephemeral"
+            response["text"] = "PyPi search is unavailable right now"
+            await app.plugins["slack"].api.query(
+                url=methods.CHAT_POST_MESSAGE, data=response
+            )
+            return
+
         if results:
             response["response_type"] = "in_channel"
             response["attachments"] = [
@@ -137,6 +170,11 @@ async def pypi_search(command, app):
                 }
             ]
 
+            if results.stale:
+                response["attachments"][0][
+                    "footer"
+                ] = "Cached results, PyPi is unavailable right now"
+
             for result in results[:3]:
                 response["attachments"][0]["fields"].append(
                     {
@@ -255,3 +293,169 @@ async def resources(command, app):
     )
 
     await app.plugins["slack"].api.query(url=methods.CHAT_POST_MESSAGE, data=response)
+
+
+async def watch(command, app):
+    """
+    Manage the stock tickers watched in a channel.
+
+    Usage: ``/watch``, ``/watch TSLA above 250`` or ``/watch remove TSLA``.
+    """
+    response = Message()
+    response["channel"] = command["channel_id"]
+    text = command["text"].strip()
+    match = WATCH_REGEX.match(text)
+
+    async with app["plugins"]["pg"].connection() as pg_con:
+        if not text or text.lower() == "list":
+            rows = await pg_con.fetch(
+                """SELECT symbol, direction, threshold FROM stocks.watches
+                WHERE channel = $1 ORDER BY symbol, threshold""",
+                command["channel_id"],
+            )
+            if rows:
+                response["text"] = "Watched tickers:\n" + "\n".join(
+                    f"• {row['symbol']} {row['direction']} ${row['threshold']:,}"
+                    for row in rows
+                )
+            else:
+                response["text"] = "No ticker watched in this channel"
+        elif text.lower().startswith("remove "):
+            symbol = text.split(maxsplit=1)[1].upper()
+            await pg_con.execute(
+                """DELETE FROM stocks.watches WHERE channel = $1 AND symbol = $2""",
+                command["channel_id"],
+                symbol,
+            )
+            response["text"] = f"<@{command['user_id']}> stopped watching {symbol}"
+        elif match:
+            try:
+                threshold = Decimal(match.group("threshold").replace(",", ""))
+            except InvalidOperation:
+                threshold = None
+
+            if threshold is None:
+                response["text"] = f"Sorry I can not understand `{text}`"
+            else:
+                await pg_con.execute(
+                    """INSERT INTO stocks.watches (channel, symbol, direction, threshold, "user")
+                    VALUES ($1, $2, $3, $4, $5) ON CONFLICT DO NOTHING""",
+                    command["channel_id"],
+                    match.group("symbol").upper(),
+                    match.group("direction").lower(),
+                    threshold,
+                    command["user_id"],
+                )
+                response["text"] = (
+                    f"<@{command['user_id']}> is watching {match.group('symbol').upper()} "
+                    f"{match.group('direction').lower()} ${threshold:,}"
+                )
+        else:
+            response["text"] = (
+                "Usage: `/watch`, `/watch TICKER above|below PRICE` "
+                "or `/watch remove TICKER`"
+            )
+
+    await app.plugins["slack"].api.query(url=methods.CHAT_POST_MESSAGE, data=response)
+
+
+async def keyword_alerts(command, app):
+    """
+    Manage the keywords a user is notified about.
+
+    Usage: ``/alerts``, ``/alerts add KEYWORD`` or ``/alerts remove KEYWORD``.
+    """
+    keywords = app["plugins"]["keywords"]
+    response = Message()
+    response["channel"] = command["user_id"]
+    action, _, keyword = command["text"].strip().partition(" ")
+    keyword = keyword.strip()
+    subscriptions = keywords.subscriptions(command["user_id"])
+
+    if action == "add" and len(keyword) >= 3:
+        if len(subscriptions) >= MAX_KEYWORDS:
+            response[
+                "text"
+            ] = f"Sorry you can not subscribe to more than {MAX_KEYWORDS} keywords"
+        else:
+            await keywords.subscribe(command["user_id"], keyword)
+            response["text"] = f"You will be notified when `{keyword}` is mentioned"
+    elif action == "remove" and keyword:
+        await keywords.unsubscribe(command["user_id"], keyword)
+        response["text"] = f"You will not be notified about `{keyword}` anymore"
+    elif not action and subscriptions:
+        response["text"] = "Your keywords: " + ", ".join(
+            f"`{k}`" for k in subscriptions
+        )
+    elif not action:
+        response["text"] = "You are not subscribed to any keyword"
+    else:
+        response["text"] = (
+            "Usage: `/alerts`, `/alerts add KEYWORD` (at least 3 characters) "
+            "or `/alerts remove KEYWORD`"
+        )
+
+    await app.plugins["slack"].api.query(url=methods.CHAT_POST_MESSAGE, data=response)
+
+
+async def stats(command, app):
+    """
+    Show the busiest channels and users, admins only.
+
+    Usage: ``/stats`` or ``/stats DAYS``.
+    """
+    if command["user_id"] not in app["plugins"]["slack"].admins:
+        return
+
+    text = command["text"].strip()
+    days = int(text) if text.isdigit() else STATS_DAYS
+    since = datetime.datetime.now() - datetime.timedelta(days=days)
+    total, channels, users = await app["plugins"]["archive"].activity(since)
+
+    response = Message()
+    response["channel"] = command["channel_id"]
+    response["user"] = command["user_id"]
+    response["text"] = f"{total:,} messages in the last {days} days"
+    response["attachments"] = [
+        {
+            "title": "Channels",
+            "text": "\n".join(f"<#{c}> {count:,}" for c, count in channels),
+        },
+        {
+            "title": "Users",
+            "text": "\n".join(f"<@{u}> {count:,}" for u, count in users),
+        },
+    ]
+
+    await app.plugins["slack"].api.query(url=methods.CHAT_POST_EPHEMERAL, data=response)
+
+
+async def jobs(command, app):
+    """
+    Show the next due scheduled jobs and their last runs, admins only.
+
+    Usage: ``/jobs``.
+    """
+    if command["user_id"] not in app["plugins"]["slack"].admins:
+        return
+
+    history = await app["plugins"]["jobs"].history(JOBS_HISTORY)
+    attachments = []
+    for name, next_run in app["plugins"]["jobs"].next_runs():
+        lines = [f"Next run: {next_run:%Y-%m-%d %H:%M %Z}"]
+        for run in history.get(name, []):
+            line = f'{JOB_OUTCOMES.get(run["outcome"], run["outcome"])} {run["started"]:%Y-%m-%d %H:%M}'
+            if run["duration"] is not None:
+                line += f' in {run["duration"]:.1f}s'
+            if run["rows"] is not None:
+                line += f' ({run["rows"]:,} rows)'
+            lines.append(line)
+        attachments.append({"title": name, "text": "\n".join(lines)})
+
+    response = Message()
+    response["channel"] = command["channel_id"]
+    response["user"] = command["user_id"]
+    response["text"] = "Scheduled jobs, soonest first"
+    response["attachments"] = attachments
+
+    await app.plugins["slack"].api.query(url=methods.CHAT_POST_EPHEMERAL, data=response)
@@ -6,13 +6,17 @@ from slack import methods
 from slack.events import Message
 
 from .utils import ADMIN_CHANNEL
+from ...plugins.tasks import supervised
+from ...plugins.lookups import INVALIDATING_EVENTS
 
 LOG = logging.getLogger(__name__)
 
 
 def create_endpoints(plugin):
-    plugin.on_event("team_join", team_join, wait=False)
+    plugin.on_event("team_join", supervised("events", team_join))
     plugin.on_event("pin_added", pin_added)
+    for event_type in INVALIDATING_EVENTS:
+        plugin.on_event(event_type, invalidate_lookups)
 
 
 async def team_join(event, app):
@@ -54,18 +58,19 @@ async def pin_added(event, app):
             message["attachments"][0]["text"] = event["item"]["message"]["text"]
             item_id = event["item"]["message"]["ts"]
         elif event["item"]["type"] == "file":
-            file = await app["plugins"]["slack"].api.query(
-                url=methods.FILES_INFO, data={"file": event["item"]["file_id"]}
+            file = await app["plugins"]["lookups"].info(
+                methods.FILES_INFO, event["item"]["file_id"]
             )
-            message["attachments"][0]["text"] = f'File: {file["file"]["title"]}'
+            title = file["file"]["title"] if file else "File not found"
+            message["attachments"][0]["text"] = f"File: {title}"
             item_id = event["item"]["file_id"]
         elif event["item"]["type"] == "file_comment":
             message["attachments"][0]["text"] = event["item"]["comment"]["comment"]
             item_id = event["item"]["comment"]["id"]
         else:
             message["attachments"][0]["text"] = "Unknown pin type"
-            await app.plugins["slack"].api.query(
-                url=methods.CHAT_POST_MESSAGE, data=message
+            app["plugins"]["notifications"].notify(
+                ADMIN_CHANNEL, "pin_added", message["attachments"][0]
             )
             return
 
@@ -91,6 +96,10 @@ async def pin_added(event, app):
             },
         ]
 
-        await app.plugins["slack"].api.query(
-            url=methods.CHAT_POST_MESSAGE, data=message
+        app["plugins"]["notifications"].notify(
+            ADMIN_CHANNEL, "pin_added", message["attachments"][0]
         )
+
+
+async def invalidate_lookups(event, app):
+    app["plugins"]["lookups"].invalidate_event(event)
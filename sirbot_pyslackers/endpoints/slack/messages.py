@@ -1,22 +1,34 @@
 import re
 import json
 import pprint
+import asyncio
 import logging
 import datetime
 
 from slack import methods
-from aiohttp import ClientResponseError
+from aiohttp import ClientError, ClientResponseError
 from slack.events import Message
 from slack.exceptions import SlackAPIError
-from asyncpg.exceptions import UniqueViolationError
 
-from .utils import ADMIN_CHANNEL, HELP_FIELD_DESCRIPTIONS
+from .utils import SNIPPET_TIP, ADMIN_CHANNEL, HELP_FIELD_DESCRIPTIONS
+from ...compaction import expand
+from ...plugins.tasks import supervised
+from ...plugins.stocks import sparkline
+from ...plugins.resilience import CircuitOpen
 
 LOG = logging.getLogger(__name__)
 STOCK_REGEX = re.compile(
     r"\b(?P<asset_class>[cs])\$(?P<symbol>\^?[A-Z.]{1,5})(?:-(?P<currency>[A-Z]{3}))?\b"
 )
+GITHUB_REPO_REGEX = re.compile(
+    r"\bg#(?:(?P<owner>[\w.-]+)/)?(?P<repo>[\w.-]*\w)", flags=re.ASCII
+)
+GITHUB_DEFAULT_OWNER = "pyslackers"
 TELL_REGEX = re.compile("tell (<(#|@)(?P<to_id>[A-Z0-9]*)(|.*)?>) (?P<msg>.*)")
+QUOTE_HISTORY_DAYS = 5
+PROFILE_REGEX = re.compile(r"profile(?: +(?P<seconds>\d+))?", flags=re.IGNORECASE)
+PROFILE_SECONDS = 10
+PROFILE_TOP_STACKS = 15
 FIAT_CURRENCY = {
     "USD": "$",
     "GBP": "£",
@@ -28,7 +40,11 @@ def create_endpoints(plugin):
     plugin.on_message("hello", hello, flags=re.IGNORECASE, mention=True)
     plugin.on_message("^tell", tell, flags=re.IGNORECASE, mention=True, admin=True)
     plugin.on_message(".*", mention, flags=re.IGNORECASE, mention=True)
-    plugin.on_message(".*", save_in_database, wait=False)
+    plugin.on_message(".*", save_in_database)
+    plugin.on_message(".*", supervised("messages", keyword_alerts))
+    plugin.on_message(".*", supervised("messages", flood_detection))
+    plugin.on_message(".*", supervised("messages", duplicate_detection))
+    plugin.on_message(".*", supervised("messages", snippet_tip))
     plugin.on_message(".*", channel_topic, subtype="channel_topic")
     plugin.on_message(
         "^inspect", inspect, flags=re.IGNORECASE, mention=True, admin=True
@@ -36,11 +52,19 @@ def create_endpoints(plugin):
     plugin.on_message("^help", help_message, flags=re.IGNORECASE, mention=True)
     # stock tickers are 1-5 capital characters, with a dot allowed. To keep
     # this from triggering with random text we require a leading '$'
-    plugin.on_message(STOCK_REGEX.pattern, stock_quote, wait=False)
+    plugin.on_message(STOCK_REGEX.pattern, supervised("lookups", stock_quote))
+    plugin.on_message(GITHUB_REPO_REGEX, supervised("lookups", github_repo))
     plugin.on_message(
         "^channels", channels, flags=re.IGNORECASE, mention=True, admin=True
     )
     plugin.on_message("^cleanup", cleanup, flags=re.IGNORECASE, mention=True)
+    plugin.on_message(
+        "^profile",
+        supervised("messages", profile),
+        flags=re.IGNORECASE,
+        mention=True,
+        admin=True,
+    )
 
 
 async def stock_quote(message, app):
@@ -79,65 +103,139 @@ async def stock_quote(message, app):
         else:
             LOG.exception("Error retrieving stock quotes.")
             response["text"] = "Unable to retrieve quotes right now."
+    except (CircuitOpen, asyncio.TimeoutError, ClientError):
+        LOG.warning("Stock quotes provider unavailable.")
+        response["text"] = "Unable to retrieve quotes right now."
     else:
         if quote is None:
             response["text"] = f"Unable to find ticker '{symbol}'"
         else:
-            color = "gray"
-            if quote.change > 0:
-                color = "good"
-            elif quote.change < 0:
-                color = "danger"
-
-            response.update(
-                attachments=[
-                    {
-                        "color": color,
-                        "title": f"{quote.symbol} ({quote.company}): {currency_symbol}{quote.price:,.4f}",
-                        "title_link": f"https://finance.yahoo.com/quote/{quote.symbol}",
-                        "fields": [
-                            {
-                                "title": "Change",
-                                "value": f"{currency_symbol}{quote.change:,.4f} ({quote.change_percent:,.4f}%)",
-                                "short": True,
-                            },
-                            {
-                                "title": "Volume",
-                                "value": f"{quote.volume:,}",
-                                "short": True,
-                            },
-                            {
-                                "title": "Open",
-                                "value": f"{currency_symbol}{quote.market_open:,.4f}",
-                                "short": True,
-                            },
-                            {
-                                "title": "Close",
-                                "value": f"{currency_symbol}{quote.market_close:,.4f}",
-                                "short": True,
-                            },
-                            {
-                                "title": "Low",
-                                "value": f"{currency_symbol}{quote.low:,.4f}",
-                                "short": True,
-                            },
-                            {
-                                "title": "High",
-                                "value": f"{currency_symbol}{quote.high:,.4f}",
-                                "short": True,
-                            },
-                        ],
-                        "footer_icon": quote.logo,
-                        "ts": int(quote.time.timestamp()),
-                    }
-                ]
+            attachment = quote_attachment(quote, currency_symbol)
+            attachment["fields"].extend(
+                await _quote_history_fields(stocks, quote, currency_symbol)
             )
+            response["attachments"] = [attachment]
 
     await app["plugins"]["slack"].api.query(
         url=methods.CHAT_POST_MESSAGE, data=response
     )
 
 
+def quote_attachment(quote, currency_symbol):
+    color = "gray"
+    if quote.change > 0:
+        color = "good"
+    elif quote.change < 0:
+        color = "danger"
+
+    attachment = {
+        "color": color,
+        "title": f"{quote.symbol} ({quote.company}): {currency_symbol}{quote.price:,.4f}",
+        "title_link": f"https://finance.yahoo.com/quote/{quote.symbol}",
+        "fields": [
+            {
+                "title": "Change",
+                "value": f"{currency_symbol}{quote.change:,.4f} ({quote.change_percent:,.4f}%)",
+                "short": True,
+            },
+            {"title": "Volume", "value": f"{quote.volume:,}", "short": True},
+            {
+                "title": "Open",
+                "value": f"{currency_symbol}{quote.market_open:,.4f}",
+                "short": True,
+            },
+            {
+                "title": "Close",
+                "value": f"{currency_symbol}{quote.market_close:,.4f}",
+                "short": True,
+            },
+            {
+                "title": "Low",
+                "value": f"{currency_symbol}{quote.low:,.4f}",
+                "short": True,
+            },
+            {
+                "title": "High",
+                "value": f"{currency_symbol}{quote.high:,.4f}",
+                "short": True,
+            },
+        ],
+        "footer_icon": quote.logo,
+        "ts": int(quote.time.timestamp()),
+    }
+
+    if quote.stale:
+        attachment["footer"] = "Cached quote, Yahoo Finance is unavailable right now"
+
+    return attachment
+
+
+async def _quote_history_fields(stocks, quote, currency_symbol):
+    since = quote.time - datetime.timedelta(days=QUOTE_HISTORY_DAYS)
+    history = await stocks.history(quote.symbol, since=since)
+    if len(history) < 2:
+        return []
+
+    prices = [price for _, price in history]
+    change = quote.price - prices[0]
+    change_percent = change / prices[0] * 100 if prices[0] else 0
+    return [
+        {
+            "title": f"{QUOTE_HISTORY_DAYS} Days Change",
+            "value": f"{currency_symbol}{change:,.4f} ({change_percent:,.4f}%)",
+            "short": True,
+        },
+        {"title": "Trend", "value": sparkline(prices), "short": True},
+    ]
+
+
+async def github_repo(message, app):
+    github = app["plugins"]["github"]
+    attachments = []
+    for match in GITHUB_REPO_REGEX.finditer(message.get("text", "")):
+        owner = match.group("owner") or GITHUB_DEFAULT_OWNER
+        try:
+            repo = await github.repo(owner, match.group("repo"))
+        except Exception:
+            LOG.exception("Error retrieving github repository %s", match.group(0))
+            continue
+
+        if repo:
+            attachments.append(_github_repo_attachment(repo))
+
+        if len(attachments) >= 3:
+            break
+
+    if attachments:
+        response = message.response()
+        response["attachments"] = attachments
+        await app["plugins"]["slack"].api.query(
+            url=methods.CHAT_POST_MESSAGE, data=response
+        )
+
+
+def _github_repo_attachment(repo):
+    return {
+        "fallback": repo["full_name"],
+        "color": "#24292e",
+        "title": repo["full_name"],
+        "title_link": repo["html_url"],
+        "text": repo["description"] or "",
+        "fields": [
+            {"title": "Stars", "value": f'{repo["stargazers_count"]:,}', "short": True},
+            {"title": "Forks", "value": f'{repo["forks_count"]:,}', "short": True},
+            {
+                "title": "Open issues",
+                "value": f'{repo["open_issues_count"]:,}',
+                "short": True,
+            },
+            {"title": "Language", "value": repo["language"] or "-", "short": True},
+        ],
+        "footer": "GitHub",
+        "footer_icon": "https://github.githubassets.com/favicon.ico",
+    }
+
+
 async def hello(message, app):
     response = message.response()
     response["text"] = "Hello <@{user}>".format(user=message["user"])
@@ -194,26 +292,13 @@ async def mention(message, app):
 
 
 async def save_in_database(message, app):
-    if "pg" in app["plugins"]:
-        LOG.debug('Saving message "%s" to database.', message["ts"])
-
-        if message["ts"]:  # We sometimes receive message without a timestamp. See #45
-            try:
-                async with app["plugins"]["pg"].connection() as pg_con:
-                    await pg_con.execute(
-                        """INSERT INTO slack.messages (id, text, "user", channel, raw, time)
-                        VALUES ($1, $2, $3, $4, $5, $6)""",
-                        message["ts"],
-                        message.get("text"),
-                        message.get("user"),
-                        message.get("channel"),
-                        dict(message),
-                        datetime.datetime.fromtimestamp(
-                            int(message["ts"].split(".")[0])
-                        ),
-                    )
-            except UniqueViolationError:
-                LOG.debug('Message "%s" already in database.', message["ts"])
+    if "archive" in app["plugins"]:
+        LOG.debug('Saving message "%s" to database.', message.get("ts"))
+        app["plugins"]["archive"].save(message)
+
+
+async def keyword_alerts(message, app):
+    app["plugins"]["keywords"].scan(message)
 
 
 async def channel_topic(message, app):
@@ -266,8 +351,8 @@ async def channel_topic(message, app):
                 },
             ]
 
-        await app["plugins"]["slack"].api.query(
-            url=methods.CHAT_POST_MESSAGE, data=response
+        app["plugins"]["notifications"].notify(
+            ADMIN_CHANNEL, "topic_change", response["attachments"][0]
         )
 
 
@@ -285,23 +370,26 @@ async def inspect(message, app):
     if match:
         user_id = match.group(1)
 
-        async with app["plugins"]["pg"].connection() as pg_con:
+        async with app["plugins"]["pg_read"].connection() as pg_con:
             data = await pg_con.fetchrow(
-                """SELECT raw, join_date FROM slack.users WHERE id = $1""", user_id
+                """SELECT id, deleted, admin, bot, raw, join_date FROM slack.users
+                WHERE id = $1""",
+                user_id,
             )
 
         if data:
-            user = data["raw"]
+            user = expand("slack.users", data["raw"], data)
             user["join_date"] = data["join_date"].isoformat()
         else:
-            data = await app["plugins"]["slack"].api.query(
-                url=methods.USERS_INFO, data={"user": user_id}
-            )
-            user = data["user"]
+            data = await app["plugins"]["lookups"].info(methods.USERS_INFO, user_id)
+            user = data["user"] if data else None
 
-        response[
-            "text"
-        ] = f"<@{user_id}> profile information \n```{pprint.pformat(user)}```"
+        if user:
+            response[
+                "text"
+            ] = f"<@{user_id}> profile information \n```{pprint.pformat(user)}```"
+        else:
+            response["text"] = f"Sorry I couldn't find user <@{user_id}>"
     else:
         response["text"] = f"Sorry I couldn't figure out which user to inspect"
 
@@ -312,7 +400,7 @@ async def inspect(message, app):
 
 async def channels(message, app):
     if message["channel"] == ADMIN_CHANNEL and "text" in message and message["text"]:
-        async with app["plugins"]["pg"].connection() as pg_con:
+        async with app["plugins"]["pg_read"].connection() as pg_con:
             rows = await pg_con.fetch(
                 """with channels as (
   SELECT DISTINCT ON (channels.id) channels.id,
@@ -356,35 +444,143 @@ async def cleanup(message, app):
     if match:
         user_id = match.group(1)
 
-        async with app["plugins"]["pg"].connection() as pg_con:
-            messages = await pg_con.fetchrow(
-                """SELECT count(id) FROM slack.messages WHERE "user" = $1""", user_id
-            )
+        count = await app["plugins"]["archive"].user_count(user_id)
 
         response["channel"] = ADMIN_CHANNEL
         response["attachments"] = [
-            {
-                "fallback": "User cleanup",
-                "title": f'Confirm cleanup of <@{user_id}> {messages["count"]} messages.',
-                "callback_id": "user_cleanup",
-                "actions": [
-                    {
-                        "name": "cancel",
-                        "text": "Cancel",
-                        "style": "primary",
-                        "type": "button",
-                    },
-                    {
-                        "name": "confirm",
-                        "text": "Burn baby burn !",
-                        "style": "danger",
-                        "type": "button",
-                        "value": user_id,
-                    },
-                ],
-            }
+            user_cleanup_attachment(
+                user_id, f"Confirm cleanup of <@{user_id}> {count} messages.",
+            )
         ]
 
         await app["plugins"]["slack"].api.query(
             url=methods.CHAT_POST_MESSAGE, data=response
         )
+
+
+async def profile(message, app):
+    """
+    Profile the event loop for a few seconds and post the most sampled stacks,
+    with the full collapsed stacks as a file usable with the flamegraph tools.
+
+    Usage: ``@sirbot profile`` or ``@sirbot profile SECONDS``.
+    """
+    match = PROFILE_REGEX.search(message.get("text", ""))
+    seconds = int(match and match.group("seconds") or PROFILE_SECONDS)
+
+    response = Message()
+    response["channel"] = ADMIN_CHANNEL
+    try:
+        stacks = await app["plugins"]["diagnostics"].profile(seconds)
+    except RuntimeError as e:
+        response["text"] = str(e)
+        await app["plugins"]["slack"].api.query(
+            url=methods.CHAT_POST_MESSAGE, data=response
+        )
+        return
+
+    # Only the innermost frames of the most sampled stacks fit in a message
+    samples = sum(stacks.values()) or 1
+    top = "\n".join(
+        f'{count / samples:6.1%} {";".join(stack.split(";")[-4:])}'
+        for stack, count in stacks.most_common(PROFILE_TOP_STACKS)
+    )
+    response["text"] = (
+        f"Event loop profile requested by <@{message['user']}>, "
+        f"{samples} samples over {seconds}s\n```{top}```"
+    )
+    await app["plugins"]["slack"].api.query(
+        url=methods.CHAT_POST_MESSAGE, data=response
+    )
+
+    collapsed = "\n".join(f"{stack} {count}" for stack, count in stacks.items())
+    await app["plugins"]["slack"].api.query(
+        url=methods.FILES_UPLOAD,
+        data={
+            "channels": ADMIN_CHANNEL,
+            "content": collapsed,
+            "filename": "profile.collapsed",
+            "title": "Collapsed stacks",
+        },
+    )
+
+
+def user_cleanup_attachment(user_id, title):
+    return {
+        "fallback": "User cleanup",
+        "title": title,
+        "callback_id": "user_cleanup",
+        "actions": [
+            {"name": "cancel", "text": "Cancel", "style": "primary", "type": "button"},
+            {
+                "name": "confirm",
+                "text": "Burn baby burn !",
+                "style": "danger",
+                "type": "button",
+                "value": user_id,
+            },
+        ],
+    }
+
+
+async def flood_detection(message, app):
+    for kind, flood_id in app["plugins"]["flood"].record(message):
+        LOG.info("Flood detected for %s %s", kind, flood_id)
+        response = Message()
+        response["channel"] = ADMIN_CHANNEL
+        if kind == "user":
+            response["attachments"] = [
+                user_cleanup_attachment(
+                    flood_id,
+                    f"<@{flood_id}> is flooding <#{message['channel']}>. Cleanup its messages ?",
+                )
+            ]
+        else:
+            response["text"] = f"Unusual message rate in <#{flood_id}>"
+
+        await app["plugins"]["slack"].api.query(
+            url=methods.CHAT_POST_MESSAGE, data=response
+        )
+
+
+async def duplicate_detection(message, app):
+    duplicates = app["plugins"]["duplicates"].check(message)
+    if not duplicates:
+        return
+
+    channels = " ".join(sorted({f"<#{post.channel}>" for post in duplicates}))
+    users = " ".join(
+        sorted(
+            {f"<@{post.user}>" for post in duplicates} | {f"<@{message.get('user')}>"}
+        )
+    )
+    LOG.info("Cross-post detected in %s", message["channel"])
+
+    response = Message()
+    response["channel"] = ADMIN_CHANNEL
+    response["attachments"] = [
+        {
+            "fallback": "Cross-post notice",
+            "title": f'Message posted in <#{message["channel"]}> already seen in {channels}',
+            "text": message["text"][:500],
+            "fields": [{"title": "Posted by", "value": users}],
+        }
+    ]
+
+    await app["plugins"]["slack"].api.query(
+        url=methods.CHAT_POST_MESSAGE, data=response
+    )
+
+
+async def snippet_tip(message, app):
+    if not app["plugins"]["snippets"].should_remind(message):
+        return
+
+    tip_message = Message()
+    tip_message["channel"] = message["channel"]
+    tip_message["user"] = message["user"]
+    tip_message["text"] = SNIPPET_TIP
+
+    await app["plugins"]["slack"].api.query(
+        url=methods.CHAT_POST_EPHEMERAL, data=tip_message
+    )
@@ -3,6 +3,15 @@ import os
 ANNOUCEMENTS_CHANNEL = os.environ.get("SLACK_ANNOUCEMENTS_CHANNEL") or "annoucements"
 ADMIN_CHANNEL = os.environ.get("SLACK_ADMIN_CHANNEL") or "G1DRT62UC"
 
+SNIPPET_TIP = (
+    "Please use the snippet feature, or backticks, when sharing code. You can do so by "
+    "clicking on the :heavy_plus_sign: on the left of the input box for a snippet.\n"
+    "For more information on snippets click "
+    "<https://get.slack.help/hc/en-us/articles/204145658-Create-a-snippet|here>.\n"
+    "For more information on inline code formatting with backticks click "
+    "<https://get.slack.help/hc/en-us/articles/202288908-Format-your-messages#inline-code|here>."
+)
+
 HELP_FIELD_DESCRIPTIONS = [
     {
         "title": "@sir_botalot hello",
@@ -45,6 +54,14 @@ HELP_FIELD_DESCRIPTIONS = [
         "value": "Share resources for new python developers",
         "short": True,
     },
+    {
+        "title": "/watch TICKER above|below PRICE",
+        "value": "Get notified in the channel when a stock ticker crosses a price.",
+    },
+    {
+        "title": "/alerts add|remove KEYWORD",
+        "value": "Get a direct message digest when a keyword is mentioned.",
+    },
     {
         "title": "g#user/repo",
         "value": "Share the link to that github repo. User default to `pyslackers`.",
@@ -0,0 +1,190 @@
+import gzip
+import json
+import time
+import logging
+import argparse
+import datetime
+
+from .compaction import expand
+
+LOG = logging.getLogger(__name__)
+EXPORTS = {
+    "messages": {
+        "table": "slack.messages",
+        "time": "time",
+        "where": "deleted_at IS NULL",
+        # Table whose compacted raw payloads are expanded on export
+        "compacted": "slack.messages",
+        "columns": {
+            "id": "string",
+            "text": "string",
+            "user": "string",
+            "channel": "string",
+            "raw": "json",
+            "time": "timestamp",
+        },
+    },
+    "reports": {
+        "table": "slack.reports",
+        "time": "timestamp",
+        "columns": {
+            "id": "int",
+            "timestamp": "timestamptz",
+            "user": "string",
+            "channel": "string",
+            "comment": "string",
+            "by": "string",
+        },
+    },
+}
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        prog="sirbot_pyslackers export",
+        description="Export a table to gzipped JSON lines (.jsonl.gz) or parquet (.parquet)",
+    )
+    parser.add_argument("name", choices=EXPORTS)
+    parser.add_argument("path")
+    parser.add_argument("--since", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--channel", action="append", dest="channels")
+    return parser.parse_args(args)
+
+
+async def export(
+    postgres, name, path, since=None, until=None, channels=None, batch_size=10000
+):
+    """
+    Stream a table to a file.
+
+    Rows are read with a server side cursor and written by batches of
+    ``batch_size`` rows.
+
+    Returns:
+        Number of exported rows.
+    """
+    query, args = _query(EXPORTS[name], since, until, channels)
+    columns = EXPORTS[name]["columns"]
+    if path.endswith(".parquet"):
+        writer = ParquetWriter(path, columns)
+    else:
+        writer = JSONLinesWriter(path, columns)
+
+    count = 0
+    start = time.perf_counter()
+    with writer:
+        async with postgres.connection() as pg_con:
+            async with pg_con.transaction():
+                batch = []
+                async for row in pg_con.cursor(query, *args, prefetch=batch_size):
+                    batch.append(_expand(EXPORTS[name], row))
+                    if len(batch) >= batch_size:
+                        writer.write(batch)
+                        count += len(batch)
+                        batch = []
+                writer.write(batch)
+                count += len(batch)
+
+    elapsed = time.perf_counter() - start
+    LOG.info(
+        "Exported %s %s to %s, %.0f rows/s",
+        count,
+        name,
+        path,
+        count / elapsed if elapsed else 0,
+    )
+    return count
+
+
+def _query(table, since, until, channels):
+    conditions, args = [], []
+    if "where" in table:
+        conditions.append(table["where"])
+    if since:
+        args.append(since)
+        conditions.append(f'"{table["time"]}" >= ${len(args)}')
+    if until:
+        args.append(until)
+        conditions.append(f'"{table["time"]}" < ${len(args)}')
+    if channels:
+        args.append(channels)
+        conditions.append(f"channel = ANY(${len(args)})")
+
+    columns = ", ".join(f'"{column}"' for column in table["columns"])
+    where = " AND ".join(conditions) or "TRUE"
+    return f"""SELECT {columns} FROM {table["table"]} WHERE {where}""", args
+
+
+def _expand(table, row):
+    if "compacted" not in table:
+        return row
+
+    row = dict(row)
+    row["raw"] = expand(table["compacted"], row["raw"], row)
+    return row
+
+
+class JSONLinesWriter:
+    def __init__(self, path, columns):
+        self.columns = columns
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+    def write(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(dict(row), default=str))
+            self._file.write("\n")
+
+
+class ParquetWriter:
+    """Parquet file writer, requires the optional ``pyarrow`` package"""
+
+    def __init__(self, path, columns):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet exports require the pyarrow package")
+
+        types = {
+            "string": pyarrow.string(),
+            "json": pyarrow.string(),
+            "int": pyarrow.int64(),
+            "timestamp": pyarrow.timestamp("us"),
+            "timestamptz": pyarrow.timestamp("us", tz="UTC"),
+        }
+        self.columns = columns
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema(
+            [(column, types[kind]) for column, kind in columns.items()]
+        )
+        self._file = pyarrow.parquet.ParquetWriter(
+            path, self._schema, compression="zstd"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+    def write(self, rows):
+        if not rows:
+            return
+
+        data = {
+            column: [
+                json.dumps(row[column]) if kind == "json" else row[column]
+                for row in rows
+            ]
+            for column, kind in self.columns.items()
+        }
+        self._file.write_table(
+            self._pyarrow.Table.from_pydict(data, schema=self._schema)
+        )
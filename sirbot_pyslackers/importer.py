@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import logging
+import zipfile
+import datetime
+
+from .compaction import compact
+from .plugins.archive import reconcile
+
+LOG = logging.getLogger(__name__)
+# Export files listing the conversations, and the key naming their directory
+CONVERSATION_FILES = {
+    "channels.json": "name",
+    "groups.json": "name",
+    "mpims.json": "name",
+    "dms.json": "id",
+}
+
+
+async def import_export(postgres, path, batch_size=5000):
+    """
+    Import the messages of a slack workspace export in ``slack.messages``.
+
+    The archive is read one daily file at a time. Messages are copied by batches in
+    a temporary table and inserted from there, skipping the messages already
+    stored. Imported files are recorded in ``slack.imports`` in the same
+    transaction, so an interrupted import resumes after the last batch. The
+    activity rollups are recomputed from the oldest imported message.
+
+    Returns:
+        Number of messages read and inserted, of files imported and skipped, the
+        time of the oldest imported message and the import duration in seconds.
+    """
+    archive_name = os.path.basename(path)
+    stats = {"rows": 0, "inserted": 0, "files": 0, "skipped": 0, "since": None}
+    start = time.perf_counter()
+
+    async with postgres.connection() as pg_con:
+        await pg_con.execute(
+            """CREATE TEMPORARY TABLE IF NOT EXISTS import_messages (
+            id TEXT, text TEXT, "user" TEXT, channel TEXT, raw TEXT, time TIMESTAMP
+            ) ON COMMIT DELETE ROWS"""
+        )
+        imported = {
+            row["member"]
+            for row in await pg_con.fetch(
+                """SELECT member FROM slack.imports WHERE archive = $1""", archive_name
+            )
+        }
+
+        with zipfile.ZipFile(path) as archive:
+            rows, members = [], []
+            for member, channel in export_files(archive):
+                if member in imported:
+                    stats["skipped"] += 1
+                    continue
+
+                messages = list(read_messages(archive, member, channel))
+                rows.extend(messages)
+                members.append((archive_name, member, len(messages)))
+                if len(rows) >= batch_size:
+                    await _copy(pg_con, rows, members, stats)
+                    _report(stats, start)
+                    rows, members = [], []
+
+            if members:
+                await _copy(pg_con, rows, members, stats)
+
+        if stats["since"]:
+            await reconcile(pg_con, stats["since"])
+
+    stats["seconds"] = time.perf_counter() - start
+    _report(stats, start)
+    return stats
+
+
+def export_files(archive):
+    """
+    Daily message files of an export.
+
+    Yields:
+        Tuples of the file name and the id of its conversation.
+    """
+    conversations = {}
+    names = set(archive.namelist())
+    for filename, key in CONVERSATION_FILES.items():
+        if filename in names:
+            with archive.open(filename) as f:
+                conversations.update((c[key], c["id"]) for c in json.load(f))
+
+    for info in archive.infolist():
+        directory, _, filename = info.filename.partition("/")
+        if not filename.endswith(".json") or "/" in filename:
+            continue
+        elif directory not in conversations:
+            LOG.warning("Skipping %s, unknown conversation", info.filename)
+            continue
+
+        yield info.filename, conversations[directory]
+
+
+def read_messages(archive, member, channel):
+    """
+    Messages of a daily file normalized as ``slack.messages`` rows.
+
+    The ``raw`` column is JSON encoded text, the binary ``COPY`` can't use the
+    jsonb codec of the connections.
+    """
+    with archive.open(member) as f:
+        messages = json.load(f)
+
+    for message in messages:
+        if message.get("type") != "message" or not message.get("ts"):
+            continue
+
+        row = {
+            "id": message["ts"],
+            "text": message.get("text"),
+            "user": message.get("user"),
+            "channel": channel,
+        }
+        yield (
+            *row.values(),
+            json.dumps(compact("slack.messages", {**message, "channel": channel}, row)),
+            datetime.datetime.fromtimestamp(int(message["ts"].split(".")[0])),
+        )
+
+
+async def _copy(pg_con, rows, members, stats):
+    async with pg_con.transaction():
+        await pg_con.copy_records_to_table("import_messages", records=rows)
+        result = await pg_con.execute(
+            """INSERT INTO slack.messages (id, text, "user", channel, raw, time)
+            SELECT id, text, "user", channel, raw::jsonb, time FROM import_messages
+            ON CONFLICT DO NOTHING"""
+        )
+        await pg_con.executemany(
+            """INSERT INTO slack.imports (archive, member, rows) VALUES ($1, $2, $3)
+            ON CONFLICT DO NOTHING""",
+            members,
+        )
+
+    oldest = min((row[5] for row in rows), default=None)
+    if oldest and (stats["since"] is None or oldest < stats["since"]):
+        stats["since"] = oldest
+    stats["rows"] += len(rows)
+    stats["inserted"] += int(result.split()[-1])
+    stats["files"] += len(members)
+
+
+def _report(stats, start):
+    elapsed = time.perf_counter() - start
+    LOG.info(
+        "Imported %s messages (%s new) from %s files, %.0f messages/s",
+        stats["rows"],
+        stats["inserted"],
+        stats["files"],
+        stats["rows"] / elapsed if elapsed else 0,
+    )
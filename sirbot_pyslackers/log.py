@@ -0,0 +1,113 @@
+import json
+import time
+import queue
+import logging
+import logging.handlers
+import multiprocessing.util
+
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Per logger token bucket sampling of the records below ``level``.
+
+    Each logger can emit ``burst`` records at once, refilled at ``rate`` records
+    per second. The number of records dropped since the last emitted one is set
+    as the ``dropped`` attribute of the next emitted record.
+    """
+
+    def __init__(self, rate=20, burst=100, level=logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.level = level
+        self._buckets = {}
+
+    def filter(self, record):
+        if record.levelno >= self.level:
+            return True
+
+        now = time.monotonic()
+        tokens, last, dropped = self._buckets.get(record.name, (self.burst, now, 0))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self._buckets[record.name] = (tokens, now, dropped + 1)
+            return False
+
+        if dropped:
+            record.dropped = dropped
+        self._buckets[record.name] = (tokens - 1, now, 0)
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including their extra attributes"""
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Non blocking queue handler.
+
+    Records are enqueued untouched, keeping their ``exc_info`` for the sentry
+    handler, and dropped when the queue is full.
+    """
+
+    def __init__(self, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def start_queue(maxsize=10000, rate=20, burst=100):
+    """
+    Move the handlers of the root logger behind a queue.
+
+    Records are sampled and enqueued by the logging thread while the handlers
+    run in a background thread, started again in forked worker processes.
+    """
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    handler = QueueHandler(maxsize)
+    handler.addFilter(SamplingFilter(rate=rate, burst=burst))
+    root.handlers = [handler]
+
+    _listen(handler, handlers)
+    multiprocessing.util.register_after_fork(
+        handler, lambda handler: _listen(handler, handlers)
+    )
+    return handler
+
+
+def _listen(handler, handlers):
+    handler.queue = queue.Queue(handler.queue.maxsize)
+    listener = logging.handlers.QueueListener(
+        handler.queue, *handlers, respect_handler_level=True
+    )
+    listener.start()
+    # multiprocessing finalizers also run on exit of the worker processes
+    multiprocessing.util.Finalize(listener, listener.stop, exitpriority=0)
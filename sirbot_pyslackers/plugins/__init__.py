@@ -1,2 +1,18 @@
+from .jobs import JobsPlugin  # noQa F401
 from .pypi import PypiPlugin  # noQa F401
+from .flood import FloodPlugin  # noQa F401
+from .tasks import TasksPlugin  # noQa F401
+from .github import GithubPlugin  # noQa F401
+from .health import HealthPlugin  # noQa F401
 from .stocks import StocksPlugin  # noQa F401
+from .archive import ArchivePlugin  # noQa F401
+from .lookups import LookupsPlugin  # noQa F401
+from .metrics import MetricsPlugin  # noQa F401
+from .replica import ReadReplicaPlugin  # noQa F401
+from .keywords import KeywordsPlugin  # noQa F401
+from .snapshot import SnapshotPlugin  # noQa F401
+from .snippets import SnippetsPlugin  # noQa F401
+from .duplicates import DuplicatesPlugin  # noQa F401
+from .diagnostics import DiagnosticsPlugin  # noQa F401
+from .socket_mode import SocketModePlugin  # noQa F401
+from .notifications import NotificationsPlugin  # noQa F401
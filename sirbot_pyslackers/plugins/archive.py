@@ -0,0 +1,344 @@
+import json
+import asyncio
+import logging
+import datetime
+
+import asyncpg
+
+from ..compaction import compact
+
+LOG = logging.getLogger(__name__)
+
+INSERT_MESSAGES = """
+WITH inserted AS (
+  INSERT INTO slack.messages (id, text, "user", channel, raw, time)
+  SELECT id, text, "user", channel, raw::jsonb, time
+  FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::text[], $6::timestamp[])
+    AS m (id, text, "user", channel, raw, time)
+  ON CONFLICT DO NOTHING
+  RETURNING "user", channel, time
+), channels AS (
+  INSERT INTO slack.channel_activity (channel, hour, messages)
+  SELECT channel, date_trunc('hour', time), count(*) FROM inserted
+  WHERE channel IS NOT NULL GROUP BY 1, 2
+  ON CONFLICT (channel, hour)
+  DO UPDATE SET messages = channel_activity.messages + EXCLUDED.messages
+), users AS (
+  INSERT INTO slack.user_activity ("user", hour, messages)
+  SELECT "user", date_trunc('hour', time), count(*) FROM inserted
+  WHERE "user" IS NOT NULL GROUP BY 1, 2
+  ON CONFLICT ("user", hour)
+  DO UPDATE SET messages = user_activity.messages + EXCLUDED.messages
+)
+INSERT INTO slack.user_message_counts ("user", messages)
+SELECT "user", count(*) FROM inserted WHERE "user" IS NOT NULL GROUP BY 1
+ON CONFLICT ("user")
+DO UPDATE SET messages = user_message_counts.messages + EXCLUDED.messages
+"""
+
+EDIT_MESSAGES = """
+UPDATE slack.messages SET text = e.text, raw = e.raw::jsonb
+FROM unnest($1::text[], $2::text[], $3::text[]) AS e (id, text, raw)
+WHERE messages.id = e.id
+"""
+
+DELETE_MESSAGES = """
+WITH deleted AS (
+  UPDATE slack.messages SET deleted_at = d.deleted_at
+  FROM unnest($1::text[], $2::timestamp[]) AS d (id, deleted_at)
+  WHERE messages.id = d.id AND messages.deleted_at IS NULL
+  RETURNING messages."user", messages.channel, messages.time
+), channels AS (
+  UPDATE slack.channel_activity SET messages = channel_activity.messages - d.count
+  FROM (
+    SELECT channel, date_trunc('hour', time) AS hour, count(*) FROM deleted
+    WHERE channel IS NOT NULL GROUP BY 1, 2
+  ) AS d
+  WHERE channel_activity.channel = d.channel AND channel_activity.hour = d.hour
+), users AS (
+  UPDATE slack.user_activity SET messages = user_activity.messages - d.count
+  FROM (
+    SELECT "user", date_trunc('hour', time) AS hour, count(*) FROM deleted
+    WHERE "user" IS NOT NULL GROUP BY 1, 2
+  ) AS d
+  WHERE user_activity."user" = d."user" AND user_activity.hour = d.hour
+)
+UPDATE slack.user_message_counts SET messages = user_message_counts.messages - d.count
+FROM (SELECT "user", count(*) FROM deleted GROUP BY 1) AS d
+WHERE user_message_counts."user" = d."user"
+"""
+
+# Buffered writes, applied in this order
+QUERIES = {
+    "saved": INSERT_MESSAGES,
+    "edited": EDIT_MESSAGES,
+    "deleted": DELETE_MESSAGES,
+}
+# Errors of concurrent writes, the statement succeeds when retried
+RETRYABLE_ERRORS = (asyncpg.DeadlockDetectedError, asyncpg.SerializationError)
+RETRIES = 3
+# Errors caused by the rows of a batch, other errors keep the rows for later
+ROW_ERRORS = (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError)
+# Notifications not describing a message
+IGNORED_SUBTYPES = {"message_replied"}
+
+# Rollups are rebuilt from scratch, dropping the hours and users left without
+# messages
+RECONCILE = (
+    """DELETE FROM slack.channel_activity WHERE hour >= $1""",
+    """INSERT INTO slack.channel_activity (channel, hour, messages)
+    SELECT channel, date_trunc('hour', time), count(*) FROM slack.messages
+    WHERE time >= $1 AND channel IS NOT NULL AND deleted_at IS NULL GROUP BY 1, 2""",
+    """DELETE FROM slack.user_activity WHERE hour >= $1""",
+    """INSERT INTO slack.user_activity ("user", hour, messages)
+    SELECT "user", date_trunc('hour', time), count(*) FROM slack.messages
+    WHERE time >= $1 AND "user" IS NOT NULL AND deleted_at IS NULL GROUP BY 1, 2""",
+)
+RECONCILE_COUNTS = (
+    """DELETE FROM slack.user_message_counts""",
+    """INSERT INTO slack.user_message_counts ("user", messages)
+    SELECT "user", count(*) FROM slack.messages
+    WHERE "user" IS NOT NULL AND deleted_at IS NULL GROUP BY 1""",
+)
+
+
+class PendingRows(Exception):
+    """Raised with the rows of a batch not stored when the database is unavailable"""
+
+    def __init__(self, rows):
+        super().__init__(f"{len(rows)} rows not stored")
+        self.rows = rows
+
+
+class ArchivePlugin:
+    """
+    Store the slack messages and maintain the activity rollups.
+
+    Messages are buffered and inserted by batches. The statement inserting a
+    batch also increments the hourly per channel and per user rollups, and the
+    per user message counts, with the messages actually inserted.
+
+    Edits and deletions are buffered the same way and applied after the inserts.
+    Deleted messages are kept with their ``deleted_at`` time set and no longer
+    count in the rollups and the per user message counts.
+
+    A batch failing on a deadlock or serialization failure is retried. A batch
+    failing on a data or constraint error is split in halves until the failing
+    messages are isolated, so only those are lost. On any other error, such as
+    the database being unavailable, the messages are kept for the next flush.
+
+    Args:
+        flush_interval: Maximum seconds a message is buffered.
+        batch_size: Number of buffered messages triggering a flush.
+        max_pending: Maximum number of buffered messages kept when the database
+            is unavailable.
+    """
+
+    __name__ = "archive"
+
+    def __init__(self, flush_interval=1, batch_size=500, max_pending=20000):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.counts = dict.fromkeys((*QUERIES, "dropped", "failed"), 0)
+        self._pending = {kind: [] for kind in QUERIES}
+        self._plugins = {}
+        self._full = None
+        self._flusher = None
+        self._stopping = False
+
+    def load(self, sirbot):
+        LOG.info("Loading archive plugin")
+        self._plugins = sirbot["plugins"]
+        sirbot.on_startup.append(self.startup)
+        sirbot.on_shutdown.append(self.shutdown)
+
+    async def startup(self, sirbot):
+        self._full = asyncio.Event()
+        self._flusher = asyncio.ensure_future(self._flush_loop())
+
+    async def shutdown(self, sirbot):
+        self._stopping = True
+        if self._flusher:
+            self._full.set()
+            await self._flusher
+        await self.flush()
+
+    def metrics(self):
+        for kind, rows in self._pending.items():
+            yield ("sirbot_archive_pending", {"kind": kind}, len(rows))
+        for outcome, count in self.counts.items():
+            yield ("sirbot_archive_messages_total", {"outcome": outcome}, count)
+
+    def save(self, message):
+        """Buffer a message, an edit or a deletion to be stored"""
+        subtype = message.get("subtype")
+        if subtype == "message_changed":
+            edited = {**message["message"], "channel": message["channel"]}
+            # The edit only updates the text, the other columns keep their values
+            row = {"id": edited["ts"], "text": edited.get("text")}
+            self._buffer(
+                "edited",
+                (
+                    row["id"],
+                    row["text"],
+                    json.dumps(compact("slack.messages", edited, row)),
+                ),
+            )
+        elif subtype == "message_deleted":
+            self.tombstone(message["deleted_ts"])
+        elif subtype in IGNORED_SUBTYPES or not message.get("ts"):
+            # We sometimes receive message without a timestamp. See #45
+            return
+        else:
+            row = {
+                "id": message["ts"],
+                "text": message.get("text"),
+                "user": message.get("user"),
+                "channel": message.get("channel"),
+            }
+            self._buffer(
+                "saved",
+                (
+                    *row.values(),
+                    json.dumps(compact("slack.messages", dict(message), row)),
+                    datetime.datetime.fromtimestamp(int(message["ts"].split(".")[0])),
+                ),
+            )
+
+    def tombstone(self, ts):
+        """Buffer the deletion of a message"""
+        self._buffer("deleted", (ts, datetime.datetime.now()))
+
+    async def flush(self):
+        pending = self._pending
+        self._pending = {kind: [] for kind in QUERIES}
+        # Only the last edit of a message is applied
+        pending["edited"] = list({row[0]: row for row in pending["edited"]}.values())
+
+        size = self.batch_size
+        for kind in QUERIES:
+            while pending[kind]:
+                batch, pending[kind] = pending[kind][:size], pending[kind][size:]
+                try:
+                    await self._store(kind, batch)
+                except PendingRows as e:
+                    LOG.exception("Database unavailable, keeping messages for later")
+                    pending[kind] = e.rows + pending[kind]
+                    self._retry(pending)
+                    return
+
+    async def _store(self, kind, batch):
+        """
+        Store a batch, isolating the rows failing with a data error.
+
+        Raises:
+            ``PendingRows`` with the rows not stored yet on any other error.
+        """
+        chunks = [batch]
+        while chunks:
+            chunk = chunks.pop()
+            try:
+                await self._execute(QUERIES[kind], chunk)
+            except ROW_ERRORS:
+                if len(chunk) == 1:
+                    LOG.exception("Failed to store %s message %s", kind, chunk[0][0])
+                    self.counts["failed"] += 1
+                else:
+                    middle = len(chunk) // 2
+                    chunks.extend((chunk[middle:], chunk[:middle]))
+            except Exception as e:
+                remaining = [row for c in (chunk, *reversed(chunks)) for row in c]
+                raise PendingRows(remaining) from e
+            else:
+                self.counts[kind] += len(chunk)
+
+    async def _execute(self, query, rows):
+        for attempt in range(RETRIES):
+            try:
+                async with self._plugins["pg"].connection() as pg_con:
+                    await pg_con.execute(query, *zip(*rows))
+                return
+            except RETRYABLE_ERRORS:
+                if attempt == RETRIES - 1:
+                    raise
+                LOG.warning("Concurrent write conflict, retrying", exc_info=True)
+                await asyncio.sleep(0.1 * (attempt + 1))
+
+    async def user_count(self, user):
+        async with self._plugins["pg_read"].connection() as pg_con:
+            count = await pg_con.fetchval(
+                """SELECT messages FROM slack.user_message_counts WHERE "user" = $1""",
+                user,
+            )
+        return count or 0
+
+    async def activity(self, since, limit=10):
+        """
+        Busiest channels and users since ``since``.
+
+        Returns:
+            Total number of messages, and lists of ``(id, messages)`` tuples for the
+            channels and the users.
+        """
+        async with self._plugins["pg_read"].connection() as pg_con:
+            channels = await pg_con.fetch(
+                """SELECT channel, sum(messages) AS messages FROM slack.channel_activity
+                WHERE hour >= $1 GROUP BY channel ORDER BY messages DESC""",
+                since,
+            )
+            users = await pg_con.fetch(
+                """SELECT "user", sum(messages) AS messages FROM slack.user_activity
+                WHERE hour >= $1 GROUP BY "user" ORDER BY messages DESC LIMIT $2""",
+                since,
+                limit,
+            )
+
+        total = sum(row["messages"] for row in channels)
+        return (
+            total,
+            [tuple(row) for row in channels[:limit]],
+            [tuple(row) for row in users],
+        )
+
+    async def reconcile(self, days=2):
+        """Recompute the rollups of the last ``days`` days and the per user counts"""
+        since = datetime.datetime.now() - datetime.timedelta(days=days)
+        async with self._plugins["pg"].connection() as pg_con:
+            await reconcile(pg_con, since)
+
+    def _buffer(self, kind, row):
+        self._pending[kind].append(row)
+        if len(self._pending[kind]) >= self.batch_size and self._full:
+            self._full.set()
+
+    def _retry(self, pending):
+        for kind, rows in pending.items():
+            rows = rows + self._pending[kind]
+            dropped = max(0, len(rows) - self.max_pending)
+            if dropped:
+                LOG.warning("Dropped %s buffered %s messages", dropped, kind)
+                self.counts["dropped"] += dropped
+            self._pending[kind] = rows[dropped:]
+
+    async def _flush_loop(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+
+async def reconcile(pg_con, since):
+    """
+    Recompute the rollups since ``since`` and the per user counts from the stored
+    messages, accounting for messages not inserted by the archive plugin.
+    """
+    since = since.replace(minute=0, second=0, microsecond=0)
+    async with pg_con.transaction():
+        for query in RECONCILE:
+            await pg_con.execute(query, since)
+        for query in RECONCILE_COUNTS:
+            await pg_con.execute(query)
@@ -0,0 +1,168 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import collections
+
+from aiohttp.web import json_response
+
+LOG = logging.getLogger(__name__)
+
+
+class DiagnosticsPlugin:
+    """
+    Event loop diagnostics.
+
+    When enabled, every callback run by the event loop is timed. Callbacks
+    blocking the loop longer than ``slow_callback`` seconds are logged and kept in
+    a bounded history, named after the handler or background task they belong to.
+    Timing replaces the private ``asyncio.Handle._run`` of CPython for the whole
+    process and adds a small overhead to every callback, it is disabled by
+    default and the original method is restored on shutdown.
+
+    The ``profile`` method samples the stack of the event loop thread from
+    another thread, without tracing overhead in the loop itself, and returns the
+    collapsed stacks usable with the flamegraph tools.
+
+    Args:
+        time_callbacks: Time the event loop callbacks (env var:
+            `SIRBOT_TIME_CALLBACKS`).
+        slow_callback: Seconds above which a callback is reported.
+        history: Number of slow callbacks kept.
+        interval: Seconds between two profiler samples.
+        max_seconds: Maximum duration of a profile.
+
+    **Endpoints**:
+        * ``/sirbot/diagnostics``: Recent slow callbacks.
+    """
+
+    __name__ = "diagnostics"
+
+    def __init__(
+        self,
+        time_callbacks=None,
+        slow_callback=0.1,
+        history=100,
+        interval=0.005,
+        max_seconds=60,
+    ):
+        if time_callbacks is None:
+            time_callbacks = "SIRBOT_TIME_CALLBACKS" in os.environ
+        self.time_callbacks = time_callbacks
+        self.slow_callback = slow_callback
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.slow = collections.deque(maxlen=history)
+        self.counts = {"slow_callbacks": 0, "profiles": 0}
+        self._plugins = {}
+        self._original_run = None
+        self._profiling = False
+
+    def load(self, sirbot):
+        LOG.info("Loading diagnostics plugin")
+        self._plugins = sirbot["plugins"]
+        sirbot.router.add_route("GET", "/sirbot/diagnostics", self.list_slow)
+        sirbot.on_startup.append(self.startup)
+        sirbot.on_shutdown.append(self.shutdown)
+
+    async def startup(self, sirbot):
+        if not self.time_callbacks:
+            return
+
+        self._original_run = original_run = asyncio.Handle._run
+        threshold = self.slow_callback
+        record = self._record
+
+        def _run(handle):
+            start = time.perf_counter()
+            original_run(handle)
+            duration = time.perf_counter() - start
+            if duration > threshold:
+                record(handle, duration)
+
+        asyncio.Handle._run = _run
+
+    async def shutdown(self, sirbot):
+        if self._original_run:
+            asyncio.Handle._run = self._original_run
+            self._original_run = None
+
+    def metrics(self):
+        for name, count in self.counts.items():
+            yield (f"sirbot_diagnostics_{name}_total", {}, count)
+
+    async def list_slow(self, request):
+        return json_response(list(self.slow))
+
+    async def profile(self, seconds):
+        """
+        Sample the event loop thread stack for ``seconds`` seconds.
+
+        Returns:
+            :class:`collections.Counter` of collapsed stacks, root frame first.
+        """
+        if self._profiling:
+            raise RuntimeError("A profile is already running")
+
+        self._profiling = True
+        self.counts["profiles"] += 1
+        try:
+            return await asyncio.get_event_loop().run_in_executor(
+                None,
+                sample,
+                threading.get_ident(),
+                min(seconds, self.max_seconds),
+                self.interval,
+            )
+        finally:
+            self._profiling = False
+
+    def _record(self, handle, duration):
+        name = self._describe(handle)
+        self.counts["slow_callbacks"] += 1
+        self.slow.append(
+            {"callback": name, "duration": round(duration, 3), "time": time.time()}
+        )
+        LOG.warning(
+            "Callback %s blocked the event loop for %.3fs",
+            name,
+            duration,
+            extra={"callback": name, "duration": duration},
+        )
+
+    def _describe(self, handle):
+        callback = handle._callback
+        task = getattr(callback, "__self__", None)
+        if not isinstance(task, asyncio.Task):
+            return getattr(callback, "__qualname__", repr(callback))
+
+        tasks = self._plugins.get("tasks")
+        for pool in tasks.pools.values() if tasks else ():
+            if task in pool.tasks:
+                return f"{pool.name}:{pool.tasks[task][0]}"
+        coro = getattr(task, "_coro", None)
+        return getattr(coro, "__qualname__", repr(task))
+
+
+def sample(thread_id, seconds, interval):
+    """Collapsed stacks of ``thread_id`` sampled every ``interval`` seconds"""
+    stacks = collections.Counter()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            stacks[collapse(frame)] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def collapse(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        stack.append(f"{module}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
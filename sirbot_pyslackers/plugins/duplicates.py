@@ -0,0 +1,199 @@
+import re
+import time
+import hashlib
+import logging
+import itertools
+from collections import deque, namedtuple, defaultdict
+
+LOG = logging.getLogger(__name__)
+WORD_REGEX = re.compile(r"\w+")
+FINGERPRINT_BITS = 64
+# Measured on long messages with 2 words shingles: editing, inserting or removing a
+# word, or adding a greeting, moves the fingerprint by up to 9 bits while unrelated
+# messages are more than 20 bits apart.
+MAX_DISTANCE = 10
+BLOCK_BITS = 16
+
+Post = namedtuple(
+    "Post", ("id", "group", "fingerprint", "user", "channel", "ts", "time")
+)
+
+
+def simhash(text, shingle_size=2):
+    """64 bits SimHash of the word shingles of a text"""
+    words = WORD_REGEX.findall(text.lower())
+    shingles = {
+        " ".join(shingle) for shingle in zip(*(words[i:] for i in range(shingle_size)))
+    } or {" ".join(words)}
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big")
+        for s in shingles
+    ]
+
+    fingerprint = 0
+    for bit in range(FINGERPRINT_BITS):
+        if sum((h >> bit) & 1 for h in hashes) * 2 > len(hashes):
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class SimHashIndex:
+    """
+    Time expiring index of SimHash fingerprints.
+
+    Fingerprints are split in blocks of ``BLOCK_BITS`` bits, each indexed in its
+    own table. Two fingerprints at a hamming distance of at most ``max_distance``
+    have a block at a distance of at most ``max_distance // blocks``, so a lookup
+    only compares the fingerprints with a block within that distance of the
+    query's (multi-index hashing).
+
+    Near duplicate posts form a group, identified by the id of its first post.
+
+    Args:
+        max_distance: Maximum hamming distance of near duplicates.
+        ttl: Seconds a fingerprint is kept.
+        max_size: Maximum number of fingerprints kept.
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE, ttl=3600, max_size=20000):
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_size = max_size
+        self._blocks = [defaultdict(set) for _ in range(FINGERPRINT_BITS // BLOCK_BITS)]
+        radius = max_distance // len(self._blocks)
+        # Masks flipping up to ``radius`` bits of a block
+        self._flips = [
+            sum(1 << bit for bit in bits)
+            for distance in range(radius + 1)
+            for bits in itertools.combinations(range(BLOCK_BITS), distance)
+        ]
+        self._posts = {}
+        self._order = deque()
+        self._ids = itertools.count()
+
+    def __len__(self):
+        return len(self._posts)
+
+    def add(self, fingerprint, user, channel, ts, now, group=None):
+        self._expire(now)
+        post_id = next(self._ids)
+        post = Post(
+            post_id,
+            post_id if group is None else group,
+            fingerprint,
+            user,
+            channel,
+            ts,
+            now,
+        )
+        self._posts[post.id] = post
+        self._order.append(post.id)
+        for block, key in zip(self._blocks, self._keys(fingerprint)):
+            block[key].add(post.id)
+        return post
+
+    def near(self, fingerprint, now):
+        """Indexed posts near duplicate of ``fingerprint``"""
+        self._expire(now)
+        return [
+            self._posts[post_id]
+            for post_id in self._candidates(fingerprint)
+            if bin(self._posts[post_id].fingerprint ^ fingerprint).count("1")
+            <= self.max_distance
+        ]
+
+    def _candidates(self, fingerprint):
+        candidates = set()
+        for block, key in zip(self._blocks, self._keys(fingerprint)):
+            for flip in self._flips:
+                candidates.update(block.get(key ^ flip, ()))
+        return candidates
+
+    def _keys(self, fingerprint):
+        mask = (1 << BLOCK_BITS) - 1
+        return [
+            (fingerprint >> (i * BLOCK_BITS)) & mask for i in range(len(self._blocks))
+        ]
+
+    def _expire(self, now):
+        while self._order and (
+            len(self._order) > self.max_size
+            or now - self._posts[self._order[0]].time > self.ttl
+        ):
+            post = self._posts.pop(self._order.popleft())
+            for block, key in zip(self._blocks, self._keys(post.fingerprint)):
+                block[key].discard(post.id)
+                if not block[key]:
+                    del block[key]
+
+
+class DuplicatesPlugin:
+    """
+    Detect long messages posted again in another channel.
+
+    A group of near duplicate messages is reported once, when it is first posted
+    in a second channel.
+
+    Args:
+        min_length: Minimum number of characters of a checked message.
+        max_distance: Maximum hamming distance between two near duplicates.
+        ttl: Seconds during which a message is remembered.
+    """
+
+    __name__ = "duplicates"
+
+    def __init__(self, min_length=120, max_distance=MAX_DISTANCE, ttl=3600):
+        self.min_length = min_length
+        self.ttl = ttl
+        self.index = SimHashIndex(max_distance=max_distance, ttl=ttl)
+        self.detected = 0
+        self._reported = {}
+
+    def load(self, sirbot):
+        pass
+
+    def metrics(self):
+        yield ("sirbot_duplicates_indexed", {}, len(self.index))
+        yield ("sirbot_duplicates_detected_total", {}, self.detected)
+
+    def check(self, message, now=None):
+        """
+        Index a message.
+
+        Returns:
+            Previous posts of the message in other channels, if its group was not
+            reported yet.
+        """
+        text = message.get("text") or ""
+        if len(text) < self.min_length or "channel" not in message:
+            return []
+
+        now = time.monotonic() if now is None else now
+        fingerprint = simhash(text)
+        near = self.index.near(fingerprint, now)
+        group = min((post.group for post in near), default=None)
+        self.index.add(
+            fingerprint,
+            message.get("user"),
+            message["channel"],
+            message.get("ts"),
+            now,
+            group=group,
+        )
+
+        self._reported = {
+            group: reported
+            for group, reported in self._reported.items()
+            if now - reported <= self.ttl
+        }
+        duplicates = [
+            post
+            for post in near
+            if post.group == group and post.channel != message["channel"]
+        ]
+        if not duplicates or group in self._reported:
+            return []
+
+        self._reported[group] = now
+        self.detected += 1
+        return duplicates
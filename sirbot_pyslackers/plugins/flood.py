@@ -0,0 +1,119 @@
+import time
+import logging
+from array import array
+from collections import OrderedDict
+
+LOG = logging.getLogger(__name__)
+# Subtypes of messages posted by users, other subtypes (edits, deletions, joins,
+# bot messages, ...) are not recorded
+RECORDED_SUBTYPES = {None, "thread_broadcast", "file_share"}
+
+
+class RateWindow:
+    """
+    Ring buffer of the last ``size`` event timestamps.
+
+    Recording an event overwrites the oldest timestamp. The rate is exceeded when
+    that timestamp is still inside the window, meaning more than ``size`` events
+    happened during the window.
+    """
+
+    __slots__ = ("times", "index", "alerted")
+
+    def __init__(self, size):
+        self.times = array("d", [float("-inf")]) * size
+        self.index = 0
+        self.alerted = float("-inf")
+
+    def hit(self, now, window):
+        oldest = self.times[self.index]
+        self.times[self.index] = now
+        self.index = (self.index + 1) % len(self.times)
+        return now - oldest < window
+
+
+class RateLimiter:
+    """
+    Per-key sliding window rate detector with a bounded number of keys.
+
+    Args:
+        max_events: Maximum number of events allowed in ``window``.
+        window: Window length in seconds.
+        max_keys: Number of tracked keys, the least recently active are dropped.
+        cooldown: Seconds before alerting again for the same key.
+    """
+
+    def __init__(self, max_events, window, max_keys=50000, cooldown=600):
+        self.max_events = max_events
+        self.window = window
+        self.max_keys = max_keys
+        self.cooldown = cooldown
+        self._windows = OrderedDict()
+
+    def __len__(self):
+        return len(self._windows)
+
+    def hit(self, key, now):
+        """Record an event, return ``True`` when the rate is newly exceeded"""
+        rate = self._windows.get(key)
+        if rate is None:
+            rate = self._windows[key] = RateWindow(self.max_events)
+            if len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(key)
+
+        if rate.hit(now, self.window) and now - rate.alerted > self.cooldown:
+            rate.alerted = now
+            return True
+        return False
+
+
+class FloodPlugin:
+    """
+    Detect users and channels posting too many messages.
+
+    Args:
+        user_limit: Maximum number of messages per user and window, and the window
+            length in seconds.
+        channel_limit: Maximum number of messages per channel and window, and the
+            window length in seconds.
+    """
+
+    __name__ = "flood"
+
+    def __init__(self, user_limit=(10, 30), channel_limit=(40, 30)):
+        self.users = RateLimiter(*user_limit)
+        self.channels = RateLimiter(*channel_limit)
+        self.alerts = {"user": 0, "channel": 0}
+
+    def load(self, sirbot):
+        pass
+
+    def metrics(self):
+        yield ("sirbot_flood_tracked", {"kind": "user"}, len(self.users))
+        yield ("sirbot_flood_tracked", {"kind": "channel"}, len(self.channels))
+        for kind, count in self.alerts.items():
+            yield ("sirbot_flood_alerts_total", {"kind": kind}, count)
+
+    def record(self, message, now=None):
+        """
+        Record a message posted by a user.
+
+        Returns:
+            List of ``(kind, id)`` tuples, for each user or channel exceeding its
+            rate limit.
+        """
+        if message.get("subtype") not in RECORDED_SUBTYPES:
+            return []
+
+        now = time.monotonic() if now is None else now
+        floods = []
+        if message.get("user") and self.users.hit(message["user"], now):
+            floods.append(("user", message["user"]))
+        if message.get("channel") and self.channels.hit(message["channel"], now):
+            floods.append(("channel", message["channel"]))
+
+        for kind, _ in floods:
+            self.alerts[kind] += 1
+        return floods
@@ -0,0 +1,118 @@
+import os
+import time
+import logging
+
+from gidgethub import BadRequest
+from gidgethub.aiohttp import GitHubAPI
+
+from .cache import LRUCache
+
+LOG = logging.getLogger(__name__)
+
+
+class GithubPlugin:
+    """
+    Retrieve github repositories information.
+
+    Responses are cached. A repository looked up less than ``fresh_for`` seconds
+    ago is answered without any request. Older entries are revalidated with
+    conditional requests (``If-None-Match``) which do not count against the
+    github rate limit when answered with ``304 Not Modified``.
+
+    When less than ``min_remaining`` requests are left in the rate limit window,
+    cached entries are served regardless of their age.
+
+    Args:
+        token: Github oauth token (env var: `GITHUB_TOKEN`).
+        base_url: Github API url.
+        fresh_for: Seconds during which a cached repository is served as is.
+        cache_size: Number of cached repositories.
+        min_remaining: Rate limit requests to keep in reserve.
+    """
+
+    __name__ = "github"
+
+    def __init__(
+        self,
+        *,
+        token=None,
+        base_url="https://api.github.com",
+        fresh_for=600,
+        cache_size=512,
+        min_remaining=500,
+    ):
+        self.api = None
+        self.token = token or os.environ.get("GITHUB_TOKEN")
+        self.base_url = base_url
+        self.fresh_for = fresh_for
+        self.min_remaining = min_remaining
+        self.lookups = dict.fromkeys(("fresh", "reserve", "request"), 0)
+        self._etags = LRUCache(cache_size)
+        self._repos = LRUCache(cache_size)
+
+    def load(self, sirbot):
+        self.api = GitHubAPI(
+            sirbot["http_session"],
+            sirbot["user_agent"],
+            oauth_token=self.token,
+            cache=self._etags,
+            base_url=self.base_url,
+        )
+
+    def metrics(self):
+        for outcome, count in self.lookups.items():
+            yield ("sirbot_github_lookups_total", {"outcome": outcome}, count)
+        if self.api and self.api.rate_limit:
+            yield (
+                "sirbot_github_rate_limit_remaining",
+                {},
+                self.api.rate_limit.remaining,
+            )
+
+    def snapshot(self):
+        now = time.monotonic()
+        return {
+            "etags": list(self._etags.items()),
+            "repos": [
+                (key, now - fetched, data)
+                for key, (fetched, data) in self._repos.items()
+            ],
+        }
+
+    def restore(self, state, age):
+        now = time.monotonic()
+        self._etags.update(state["etags"])
+        for key, elapsed, data in state["repos"]:
+            self._repos[key] = (now - elapsed - age, data)
+
+    async def repo(self, owner, name):
+        """
+        Repository information or ``None`` if it does not exist.
+        """
+        key = f"{owner}/{name}".lower()
+        cached = self._repos[key] if key in self._repos else None
+        if cached and time.monotonic() - cached[0] < self.fresh_for:
+            self.lookups["fresh"] += 1
+            return cached[1]
+        elif cached and self._low_on_requests():
+            self.lookups["reserve"] += 1
+            return cached[1]
+
+        self.lookups["request"] += 1
+        try:
+            data = await self.api.getitem(
+                "/repos/{owner}/{name}", {"owner": owner, "name": name}
+            )
+        except BadRequest as e:
+            if e.status_code == 404:
+                # Unknown repositories are cached too, without an etag to revalidate
+                self._repos[key] = (time.monotonic(), None)
+                return None
+            raise
+
+        self._repos[key] = (time.monotonic(), data)
+        return data
+
+    def _low_on_requests(self):
+        rate_limit = self.api.rate_limit
+        return rate_limit is not None and rate_limit.remaining < self.min_remaining
@@ -0,0 +1,155 @@
+import time
+import asyncio
+import logging
+
+from slack import methods
+from aiohttp.web import middleware, json_response
+
+from .resilience import CircuitBreaker
+
+LOG = logging.getLogger(__name__)
+
+
+class HealthPlugin:
+    """
+    Report the health of the bot dependencies and its readiness.
+
+    Dependencies are probed in the background every ``interval`` seconds. The
+    endpoints serve the last results, so checking health adds neither load on the
+    dependencies nor latency.
+
+    Postgres and Slack are probed with a trivial query. Yahoo Finance and PyPI
+    are not called: their health is the state of their plugin circuit breaker.
+
+    The bot is ready once the plugins are warmed up and the required probes
+    succeeded. Plugins with a ``ready`` attribute are warmed up when it is true,
+    the scheduler when it is running. Until the plugins are warmed up requests to
+    the slack endpoints are answered with ``503``, and slack retries the events
+    later.
+
+    Args:
+        interval: Seconds between two probes.
+        timeout: Seconds before a probe is considered failed.
+        required: Probes the readiness depends on.
+
+    **Endpoints**:
+        * ``/health``: Last probe results, always ``200``.
+        * ``/ready``: Readiness, ``503`` when not ready.
+    """
+
+    __name__ = "health"
+
+    def __init__(self, interval=30, timeout=5, required=("postgres",)):
+        self.interval = interval
+        self.timeout = timeout
+        self.required = required
+        self.probes = {
+            "postgres": postgres_probe,
+            "slack": slack_probe,
+            "yahoo": provider_probe("stocks"),
+            "pypi": provider_probe("pypi"),
+        }
+        self.results = {}
+        self._warm = False
+        self._plugins = {}
+        self._prober = None
+
+    def load(self, sirbot):
+        LOG.info("Loading health plugin")
+        self._plugins = sirbot["plugins"]
+        sirbot.router.add_route("GET", "/health", self.health)
+        sirbot.router.add_route("GET", "/ready", self.ready)
+        sirbot.middlewares.append(self.middleware)
+        sirbot.on_startup.append(self.startup)
+        sirbot.on_shutdown.append(self.shutdown)
+
+    async def startup(self, sirbot):
+        self._prober = asyncio.ensure_future(self._probe_loop())
+
+    async def shutdown(self, sirbot):
+        if self._prober:
+            self._prober.cancel()
+
+    def metrics(self):
+        for name, result in self.results.items():
+            yield ("sirbot_health_up", {"probe": name}, int(result["ok"]))
+            yield ("sirbot_health_latency_seconds", {"probe": name}, result["latency"])
+
+    async def health(self, request):
+        ok = all(result["ok"] for result in self.results.values())
+        return json_response(
+            {"status": "ok" if ok else "degraded", "probes": self.results}
+        )
+
+    async def ready(self, request):
+        plugins = self.plugins_ready()
+        probes = {
+            name: name in self.results and self.results[name]["ok"]
+            for name in self.required
+        }
+        ready = all(plugins.values()) and all(probes.values())
+        return json_response(
+            {"ready": ready, "plugins": plugins, "probes": probes},
+            status=200 if ready else 503,
+        )
+
+    def plugins_ready(self):
+        ready = {}
+        for name, plugin in self._plugins.items():
+            if name == "scheduler":
+                ready[name] = plugin.scheduler.running
+            elif hasattr(plugin, "ready"):
+                ready[name] = bool(plugin.ready)
+        return ready
+
+    @middleware
+    async def middleware(self, request, handler):
+        if not self._warm and request.path.startswith("/slack/"):
+            self._warm = all(self.plugins_ready().values())
+            if not self._warm:
+                return json_response({"ready": False}, status=503)
+        return await handler(request)
+
+    async def probe(self):
+        names = list(self.probes)
+        results = await asyncio.gather(*(self._probe(name) for name in names))
+        self.results = dict(zip(names, results))
+
+    async def _probe(self, name):
+        start = time.monotonic()
+        result = {"ok": True, "error": None}
+        try:
+            await asyncio.wait_for(self.probes[name](self._plugins), self.timeout)
+        except Exception as e:
+            result = {"ok": False, "error": repr(e)}
+        result["latency"] = round(time.monotonic() - start, 3)
+        result["checked"] = time.time()
+        return result
+
+    async def _probe_loop(self):
+        while True:
+            try:
+                await self.probe()
+            except Exception:
+                LOG.exception("Failed to probe the dependencies")
+            await asyncio.sleep(self.interval)
+
+
+async def postgres_probe(plugins):
+    async with plugins["pg"].connection() as pg_con:
+        await pg_con.fetchval("SELECT 1")
+
+
+async def slack_probe(plugins):
+    await plugins["slack"].api.query(url=methods.AUTH_TEST)
+
+
+def provider_probe(plugin):
+    """Probe failing while the circuit breaker of the plugin provider is not closed"""
+
+    async def probe(plugins):
+        state = plugins[plugin].provider.breaker.state
+        if state != CircuitBreaker.CLOSED:
+            raise RuntimeError(f"Circuit {state}")
+
+    return probe
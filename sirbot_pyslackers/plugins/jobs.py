@@ -0,0 +1,154 @@
+import time
+import logging
+import datetime
+import functools
+from collections import defaultdict
+
+from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES
+
+LOG = logging.getLogger(__name__)
+
+INSERT_RUN = """INSERT INTO bot.job_runs (job, started, duration, rows, outcome, error)
+VALUES ($1, $2, $3, $4, $5, $6)"""
+HISTORY = """SELECT job, started, duration, rows, outcome FROM (
+  SELECT *, row_number() OVER (PARTITION BY job ORDER BY started DESC) AS n
+  FROM bot.job_runs
+) AS runs WHERE n <= $1 ORDER BY job, started DESC"""
+
+
+class JobsPlugin:
+    """
+    Record the runs of the scheduled jobs.
+
+    Jobs wrapped with :func:`recorded` are timed and each run is stored in the
+    ``bot.job_runs`` table with its outcome and the number of rows it processed.
+    The scheduler skips a job still running when it is due again
+    (``max_instances=1``), and the runs it missed. Both are recorded as well.
+
+    Runs are recorded under the scheduler job name, give a distinct ``name`` to
+    the jobs scheduling the same function.
+
+    The plugin can be loaded by workers not running the scheduler, to look at the
+    job runs and the next due jobs.
+
+    Args:
+        scheduler: The :class:`apscheduler.schedulers.asyncio.AsyncIOScheduler`
+            the jobs are added to.
+    """
+
+    __name__ = "jobs"
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.counts = defaultdict(int)
+        self.durations = {}
+        self._running = {}
+        self._plugins = {}
+        scheduler.add_listener(self._missed, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+
+    def load(self, sirbot):
+        LOG.info("Loading jobs plugin")
+        self._plugins = sirbot["plugins"]
+
+    def metrics(self):
+        for (job, outcome), count in self.counts.items():
+            yield ("sirbot_jobs_runs_total", {"job": job, "outcome": outcome}, count)
+        for job, duration in self.durations.items():
+            yield ("sirbot_jobs_last_duration_seconds", {"job": job}, duration)
+        for job in self._running:
+            yield ("sirbot_jobs_running", {"job": job}, 1)
+
+    async def run(self, name, job, **kwargs):
+        """
+        Run ``job`` and record the run.
+
+        The number of processed rows is the job return value when it is an
+        integer, or its ``rows`` item when it is a mapping.
+        """
+        started = datetime.datetime.now(datetime.timezone.utc)
+        start = self._running[name] = time.monotonic()
+        try:
+            result = await job(**kwargs)
+        except Exception as e:
+            duration = time.monotonic() - start
+            await self._record(name, started, duration, None, "failure", repr(e))
+            raise
+        finally:
+            del self._running[name]
+
+        duration = time.monotonic() - start
+        rows = result.get("rows") if isinstance(result, dict) else result
+        rows = rows if isinstance(rows, int) else None
+        await self._record(name, started, duration, rows, "success")
+        return result
+
+    def next_runs(self):
+        """``(job name, next run time)`` of the scheduled jobs, soonest first"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        runs = [
+            (job.name, job.trigger.get_next_fire_time(None, now))
+            for job in self.scheduler.get_jobs()
+        ]
+        return sorted((run for run in runs if run[1]), key=lambda run: run[1])
+
+    async def history(self, limit=5):
+        """The last ``limit`` runs of every job, most recent first"""
+        async with self._plugins["pg_read"].connection() as pg_con:
+            rows = await pg_con.fetch(HISTORY, limit)
+
+        history = defaultdict(list)
+        for row in rows:
+            history[row["job"]].append(row)
+        return history
+
+    async def _record(self, name, started, duration, rows, outcome, error=None):
+        self.counts[(name, outcome)] += 1
+        if duration is not None:
+            self.durations[name] = duration
+        LOG.info(
+            "Job %s: %s",
+            name,
+            outcome,
+            extra={"job": name, "outcome": outcome, "duration": duration, "rows": rows},
+        )
+
+        try:
+            async with self._plugins["pg"].connection() as pg_con:
+                await pg_con.execute(
+                    INSERT_RUN, name, started, duration, rows, outcome, error
+                )
+        except Exception:
+            LOG.exception("Failed to record run of job %s", name)
+
+    def _missed(self, event):
+        job = self.scheduler.get_job(event.job_id)
+        name = job.name if job else event.job_id
+        if event.code == EVENT_JOB_MISSED:
+            outcome, scheduled = "missed", event.scheduled_run_time
+        else:
+            outcome, scheduled = "overlap", event.scheduled_run_times[0]
+
+        LOG.warning(
+            "Skipped run of job %s scheduled at %s: %s", name, scheduled, outcome
+        )
+        self._plugins["tasks"].spawn(
+            "jobs", self._record(name, scheduled, None, None, outcome)
+        )
+
+
+def recorded(job, name=None):
+    """
+    Run a scheduled job through the jobs plugin.
+
+    Args:
+        job: Coroutine function of the job.
+        name: Name of the recorded runs, the job function name by default. Must
+            match the scheduler job name.
+    """
+    name = name or job.__name__
+
+    @functools.wraps(job)
+    async def wrapper(bot, **kwargs):
+        return await bot["plugins"]["jobs"].run(name, job, bot=bot, **kwargs)
+
+    return wrapper
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+from collections import deque, defaultdict
+
+from slack import methods
+from slack.events import Message
+
+LOG = logging.getLogger(__name__)
+# Channel types of the conversations scanned, other conversations are private
+SCANNED_CHANNEL_TYPES = {"channel"}
+
+
+class Automaton:
+    """
+    Aho-Corasick automaton matching many keywords in a single pass over a text.
+
+    The automaton is rebuilt from the current keywords before the next search
+    after they change, so removed keywords don't leave nodes behind.
+    """
+
+    def __init__(self):
+        self.keywords = set()
+        self._goto = [{}]
+        self._fail = [0]
+        self._matches = [()]
+        self._dirty = False
+
+    def add(self, keyword):
+        self.keywords.add(keyword)
+        self._dirty = True
+
+    def remove(self, keyword):
+        self.keywords.discard(keyword)
+        self._dirty = True
+
+    def search(self, text):
+        """
+        Find keywords in ``text``.
+
+        Yields:
+            Tuples of the keyword and its end index in ``text``.
+        """
+        if self._dirty:
+            self._build()
+
+        goto, fail, matches = self._goto, self._fail, self._matches
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for keyword in matches[node]:
+                yield keyword, index + 1
+
+    def _build(self):
+        goto, outputs = [{}], [set()]
+        for keyword in self.keywords:
+            node = 0
+            for char in keyword:
+                if char not in goto[node]:
+                    goto.append({})
+                    outputs.append(set())
+                    goto[node][char] = len(goto) - 1
+                node = goto[node][char]
+            outputs[node].add(keyword)
+
+        fail = [0] * len(goto)
+        matches = [()] * len(goto)
+        matches[0] = tuple(outputs[0])
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            matches[node] = tuple(outputs[node] | set(matches[fail[node]]))
+            for char, child in goto[node].items():
+                fallback = fail[node]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(char, 0)
+                queue.append(child)
+
+        self._goto, self._fail, self._matches = goto, fail, matches
+        self._dirty = False
+
+
+class KeywordsPlugin:
+    """
+    Notify users when a keyword they subscribed to is mentioned.
+
+    Every message is scanned once by an Aho-Corasick automaton holding the
+    keywords of all subscriptions. Matches are accumulated and delivered per
+    user as a direct message digest every ``digest_interval`` seconds.
+
+    Only messages of public channels are scanned, mentions in direct messages and
+    private conversations are not shared with the subscribers.
+
+    Subscriptions are reloaded from the database every ``reload_interval``
+    seconds, to pick up the changes made in the other workers.
+
+    Args:
+        digest_interval: Seconds between two digests.
+        max_pending: Maximum number of matches kept per user and digest.
+        reload_interval: Seconds between two reloads of the subscriptions.
+    """
+
+    __name__ = "keywords"
+
+    def __init__(self, digest_interval=300, max_pending=20, reload_interval=60):
+        self.digest_interval = digest_interval
+        self.max_pending = max_pending
+        self.reload_interval = reload_interval
+        self.automaton = Automaton()
+        self.subscribers = defaultdict(set)
+        self.pending = defaultdict(list)
+        self.ready = False
+        self._plugins = {}
+        self._digest = None
+        self._reloader = None
+
+    def load(self, sirbot):
+        LOG.info("Loading keywords plugin")
+        self._plugins = sirbot["plugins"]
+        sirbot.on_startup.append(self.startup)
+        # Flush before the http session is closed
+        sirbot.on_shutdown.insert(0, self.shutdown)
+
+    async def startup(self, sirbot):
+        await self.reload()
+        LOG.info(
+            "Loaded %s keyword subscriptions",
+            sum(len(users) for users in self.subscribers.values()),
+        )
+        self.ready = True
+        self._digest = asyncio.ensure_future(self._digest_loop())
+        self._reloader = asyncio.ensure_future(self._reload_loop())
+
+    async def shutdown(self, sirbot):
+        for task in (self._digest, self._reloader):
+            if task:
+                task.cancel()
+        await self.flush()
+
+    async def reload(self):
+        """Apply the subscriptions changes stored in the database"""
+        async with self._plugins["pg"].connection() as pg_con:
+            rows = await pg_con.fetch("""SELECT "user", keyword FROM slack.keywords""")
+
+        stored = {(row["user"], row["keyword"]) for row in rows}
+        current = {
+            (user, keyword)
+            for keyword, users in self.subscribers.items()
+            for user in users
+        }
+        for user, keyword in stored - current:
+            self._subscribe(user, keyword)
+        for user, keyword in current - stored:
+            self._unsubscribe(user, keyword)
+
+    async def subscribe(self, user, keyword):
+        keyword = keyword.lower()
+        async with self._plugins["pg"].connection() as pg_con:
+            await pg_con.execute(
+                """INSERT INTO slack.keywords ("user", keyword) VALUES ($1, $2)
+                ON CONFLICT DO NOTHING""",
+                user,
+                keyword,
+            )
+        self._subscribe(user, keyword)
+
+    async def unsubscribe(self, user, keyword):
+        keyword = keyword.lower()
+        async with self._plugins["pg"].connection() as pg_con:
+            await pg_con.execute(
+                """DELETE FROM slack.keywords WHERE "user" = $1 AND keyword = $2""",
+                user,
+                keyword,
+            )
+        self._unsubscribe(user, keyword)
+
+    def subscriptions(self, user):
+        return sorted(k for k, users in self.subscribers.items() if user in users)
+
+    def scan(self, message):
+        """Record the keywords mentioned in a message for their subscribers"""
+        text = (message.get("text") or "").lower()
+        if not text or not self.subscribers or not _is_public(message):
+            return
+
+        for keyword in {
+            k for k, end in self.automaton.search(text) if _is_word(text, k, end)
+        }:
+            for user in self.subscribers[keyword]:
+                if user == message.get("user"):
+                    continue
+                elif len(self.pending[user]) < self.max_pending:
+                    self.pending[user].append((keyword, message))
+
+    async def flush(self):
+        pending, self.pending = self.pending, defaultdict(list)
+        for user, matches in pending.items():
+            try:
+                await self._plugins["slack"].api.query(
+                    url=methods.CHAT_POST_MESSAGE,
+                    data=self._digest_message(user, matches),
+                )
+            except Exception:
+                LOG.exception("Failed to send keywords digest to %s", user)
+
+    def _subscribe(self, user, keyword):
+        if keyword not in self.subscribers:
+            self.automaton.add(keyword)
+        self.subscribers[keyword].add(user)
+
+    def _unsubscribe(self, user, keyword):
+        self.subscribers[keyword].discard(user)
+        if not self.subscribers[keyword]:
+            del self.subscribers[keyword]
+            self.automaton.remove(keyword)
+
+    def _digest_message(self, user, matches):
+        message = Message()
+        message["channel"] = user
+        message["text"] = f"Your keywords were mentioned {len(matches)} times"
+        message["attachments"] = [
+            {
+                "fallback": f"{keyword} mentioned",
+                "title": f'`{keyword}` in <#{mention.get("channel")}> by <@{mention.get("user")}>',
+                "text": (mention.get("text") or "")[:300],
+                "ts": int(float(mention["ts"])),
+            }
+            for keyword, mention in matches
+        ]
+        return message
+
+    async def _digest_loop(self):
+        while True:
+            await asyncio.sleep(self.digest_interval)
+            await self.flush()
+
+    async def _reload_loop(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except Exception:
+                LOG.exception("Failed to reload the keyword subscriptions")
+
+
+def _is_public(message):
+    # Direct messages have a D id, multi-party and legacy private groups a G id
+    return message.get("channel", "").startswith("C") and (
+        message.get("channel_type", "channel") in SCANNED_CHANNEL_TYPES
+    )
+
+
+def _is_word(text, keyword, end):
+    start = end - len(keyword)
+    return (start == 0 or not text[start - 1].isalnum()) and (
+        end == len(text) or not text[end].isalnum()
+    )
@@ -0,0 +1,158 @@
+import time
+import asyncio
+import logging
+
+from slack import methods
+from slack.exceptions import SlackAPIError
+
+from .cache import LRUCache
+
+LOG = logging.getLogger(__name__)
+
+# Cached methods with the name of their id argument and their default ttl
+LOOKUPS = {
+    methods.USERS_INFO: ("user", 3600),
+    methods.FILES_INFO: ("file", 600),
+    methods.CONVERSATIONS_INFO: ("channel", 600),
+}
+# Slack errors meaning the looked up object does not exist
+NOT_FOUND_ERRORS = {
+    "user_not_found",
+    "file_not_found",
+    "file_deleted",
+    "channel_not_found",
+}
+# Events changing or removing a cached object, with the cached method and the
+# event key holding the object or its id
+INVALIDATING_EVENTS = {
+    "user_change": (methods.USERS_INFO, "user"),
+    "team_join": (methods.USERS_INFO, "user"),
+    "file_change": (methods.FILES_INFO, "file_id"),
+    "file_deleted": (methods.FILES_INFO, "file_id"),
+    "channel_rename": (methods.CONVERSATIONS_INFO, "channel"),
+    "channel_archive": (methods.CONVERSATIONS_INFO, "channel"),
+    "channel_unarchive": (methods.CONVERSATIONS_INFO, "channel"),
+    "channel_deleted": (methods.CONVERSATIONS_INFO, "channel"),
+    "channel_created": (methods.CONVERSATIONS_INFO, "channel"),
+}
+
+
+class LookupsPlugin:
+    """
+    Read-through cache of the slack ``*.info`` methods.
+
+    Responses are cached for a per method ttl. Objects that do not exist are
+    cached for ``negative_ttl`` seconds. Concurrent lookups of the same object
+    share a single request. Cached objects are invalidated by the slack events
+    changing them (see ``INVALIDATING_EVENTS``).
+
+    Args:
+        ttls: Mapping of method to ttl in seconds, overriding the defaults.
+        negative_ttl: Seconds a missing object is cached.
+        cache_size: Number of cached objects.
+    """
+
+    __name__ = "lookups"
+
+    def __init__(self, ttls=None, negative_ttl=60, cache_size=4096):
+        self.ttls = {method: ttl for method, (_, ttl) in LOOKUPS.items()}
+        self.ttls.update(ttls or {})
+        self.negative_ttl = negative_ttl
+        self.lookups = {
+            (method, outcome): 0
+            for method in LOOKUPS
+            for outcome in ("hit", "miss", "coalesced")
+        }
+        self._cache = LRUCache(cache_size)
+        self._inflight = {}
+        self._plugins = {}
+
+    def load(self, sirbot):
+        LOG.info("Loading lookups plugin")
+        self._plugins = sirbot["plugins"]
+
+    def metrics(self):
+        yield ("sirbot_lookups_cached", {}, len(self._cache))
+        for (method, outcome), count in self.lookups.items():
+            name = method.value[0].rsplit("/", 1)[-1]
+            yield (
+                "sirbot_lookups_total",
+                {"method": name, "outcome": outcome},
+                count,
+            )
+
+    def snapshot(self):
+        now = time.monotonic()
+        return [
+            (key, expires - now, data)
+            for key, (expires, data) in self._cache.items()
+            if expires > now
+        ]
+
+    def restore(self, state, age):
+        now = time.monotonic()
+        for key, ttl, data in state:
+            if ttl > age:
+                self._cache[key] = (now + ttl - age, data)
+
+    async def info(self, method, id_):
+        """
+        Response of a slack ``*.info`` method or ``None`` if the object does not
+        exist.
+
+        Args:
+            method: One of the ``LOOKUPS`` methods.
+            id_: Id of the user, file or conversation.
+        """
+        key = (method, id_)
+        cached = self._cache[key] if key in self._cache else None
+        if cached and cached[0] > time.monotonic():
+            self.lookups[(method, "hit")] += 1
+            return cached[1]
+
+        if key in self._inflight:
+            self.lookups[(method, "coalesced")] += 1
+        else:
+            self.lookups[(method, "miss")] += 1
+            future = asyncio.ensure_future(self._fetch(method, id_))
+            future.add_done_callback(lambda f: self._store(key, f))
+            self._inflight[key] = future
+
+        # A cancelled caller must not cancel the lookup shared with other callers
+        return await asyncio.shield(self._inflight[key])
+
+    def invalidate(self, method, id_):
+        self._cache.pop((method, id_), None)
+        # Responses of lookups started before the change are not cached
+        self._inflight.pop((method, id_), None)
+
+    def invalidate_event(self, event):
+        method, field = INVALIDATING_EVENTS[event["type"]]
+        id_ = event.get(field)
+        if isinstance(id_, dict):
+            id_ = id_.get("id")
+        if id_:
+            self.invalidate(method, id_)
+
+    async def _fetch(self, method, id_):
+        argument, _ = LOOKUPS[method]
+        try:
+            return await self._plugins["slack"].api.query(
+                url=method, data={argument: id_}
+            )
+        except SlackAPIError as e:
+            if e.error in NOT_FOUND_ERRORS:
+                return None
+            raise
+
+    def _store(self, key, future):
+        if self._inflight.get(key) is not future:
+            return
+
+        del self._inflight[key]
+        if future.cancelled() or future.exception():
+            return
+
+        data = future.result()
+        ttl = self.ttls[key[0]] if data is not None else self.negative_ttl
+        self._cache[key] = (time.monotonic() + ttl, data)
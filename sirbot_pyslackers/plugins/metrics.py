@@ -0,0 +1,44 @@
+import logging
+
+from aiohttp.web import Response
+
+LOG = logging.getLogger(__name__)
+
+
+class MetricsPlugin:
+    """
+    Expose plugins metrics in the prometheus text format.
+
+    Every loaded plugin with a ``metrics`` method is collected. The method must
+    return an iterable of ``(name, labels, value)`` tuples.
+
+    **Endpoints**:
+        * ``/metrics``: Metrics of all plugins.
+    """
+
+    __name__ = "metrics"
+
+    def load(self, sirbot):
+        LOG.info("Loading metrics plugin")
+        sirbot.router.add_route("GET", "/metrics", self.export)
+
+    def collect(self, sirbot):
+        for name, plugin in sirbot["plugins"].items():
+            if not hasattr(plugin, "metrics"):
+                continue
+
+            try:
+                yield from plugin.metrics()
+            except Exception:
+                LOG.exception("Failed to collect metrics of plugin %s", name)
+
+    async def export(self, request):
+        lines = []
+        for name, labels, value in self.collect(request.app):
+            if labels:
+                labels = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{labels}}} {value}")
+            else:
+                lines.append(f"{name} {value}")
+
+        return Response(text="\n".join(lines) + "\n")
@@ -0,0 +1,152 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+from slack import methods
+from slack.events import Message
+
+LOG = logging.getLogger(__name__)
+
+
+class NotificationsPlugin:
+    """
+    Group the notifications of the same kind into digest messages.
+
+    The first notification of a kind for a channel opens a window. All the
+    notifications of that kind received during the window are posted together,
+    one attachment each, keeping their callback id and interactive buttons.
+
+    Notifications with a ``key`` are deduplicated: a notification with the same
+    key as a queued one only increments its occurrences, and a notification with
+    the same key as one posted less than ``dedupe_ttl`` seconds ago is dropped.
+
+    Args:
+        window: Seconds a notification waits for others of the same kind.
+        dedupe_ttl: Seconds a posted notification key is remembered.
+        max_attachments: Maximum number of attachments per message.
+    """
+
+    __name__ = "notifications"
+
+    def __init__(self, window=10, dedupe_ttl=3600, max_attachments=20):
+        self.window = window
+        self.dedupe_ttl = dedupe_ttl
+        self.max_attachments = max_attachments
+        self.counts = dict.fromkeys(("queued", "deduplicated", "posted", "failed"), 0)
+        self._pending = {}
+        self._sent = OrderedDict()
+        self._plugins = {}
+        self._stop = None
+        self._flusher = None
+
+    def load(self, sirbot):
+        LOG.info("Loading notifications plugin")
+        self._plugins = sirbot["plugins"]
+        sirbot.on_startup.append(self.startup)
+        # Post the queued notifications before the http session is closed
+        sirbot.on_shutdown.insert(0, self.shutdown)
+
+    async def startup(self, sirbot):
+        self._stop = asyncio.Event()
+        self._flusher = asyncio.ensure_future(self._flush_loop())
+
+    async def shutdown(self, sirbot):
+        if self._flusher:
+            self._stop.set()
+            await self._flusher
+        await self.flush()
+
+    def metrics(self):
+        pending = sum(len(group["items"]) for group in self._pending.values())
+        yield ("sirbot_notifications_pending", {}, pending)
+        for outcome, count in self.counts.items():
+            yield ("sirbot_notifications_total", {"outcome": outcome}, count)
+
+    def notify(self, channel, kind, attachment, key=None, now=None):
+        """
+        Queue a notification.
+
+        Args:
+            channel: Channel the notification is posted to.
+            kind: Kind of notification, only notifications of the same kind are
+                grouped together.
+            attachment: Attachment describing the notification.
+            key: Optional deduplication key.
+
+        Returns:
+            ``False`` when the notification is a duplicate.
+        """
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+
+        group = self._pending.get((channel, kind))
+        if key is not None:
+            if group and key in group["keys"]:
+                group["keys"][key][1] += 1
+                self.counts["deduplicated"] += 1
+                return False
+            elif (channel, kind, key) in self._sent:
+                self.counts["deduplicated"] += 1
+                return False
+
+        if group is None:
+            group = {"deadline": now + self.window, "items": [], "keys": {}}
+            self._pending[(channel, kind)] = group
+
+        item = [attachment, 1]
+        group["items"].append(item)
+        if key is not None:
+            group["keys"][key] = item
+            self._sent[(channel, kind, key)] = now
+        self.counts["queued"] += 1
+        return True
+
+    async def flush(self, now=None):
+        """Post the notifications whose window ended, or all of them if ``now`` is ``None``"""
+        for (channel, kind), group in list(self._pending.items()):
+            if now is not None and group["deadline"] > now:
+                continue
+
+            del self._pending[(channel, kind)]
+            for message in self._messages(channel, kind, group["items"]):
+                try:
+                    await self._plugins["slack"].api.query(
+                        url=methods.CHAT_POST_MESSAGE, data=message
+                    )
+                except Exception:
+                    LOG.exception("Failed to post %s notifications", kind)
+                    self.counts["failed"] += len(message["attachments"])
+                else:
+                    self.counts["posted"] += len(message["attachments"])
+
+    def _messages(self, channel, kind, items):
+        attachments = []
+        for attachment, occurrences in items:
+            if occurrences > 1:
+                attachment = {**attachment, "footer": f"{occurrences} occurrences"}
+            attachments.append(attachment)
+
+        size = self.max_attachments
+        while attachments:
+            message = Message()
+            message["channel"] = channel
+            message["attachments"], attachments = attachments[:size], attachments[size:]
+            if len(items) > 1:
+                message["text"] = f'{len(items)} {kind.replace("_", " ")} notifications'
+            yield message
+
+    def _expire(self, now):
+        while self._sent:
+            key, sent = next(iter(self._sent.items()))
+            if now - sent < self.dedupe_ttl:
+                break
+            del self._sent[key]
+
+    async def _flush_loop(self):
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), 1)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush(time.monotonic())
@@ -4,9 +4,19 @@ from operator import itemgetter
 from distance import levenshtein
 from aiohttp_xmlrpc.client import ServerProxy
 
+from .resilience import Provider
+
 LOG = logging.getLogger(__name__)
 
 
+class SearchResults(list):
+    """Search results, ``stale`` when served from cache during a PyPI outage"""
+
+    def __init__(self, results, stale=False):
+        super().__init__(results)
+        self.stale = stale
+
+
 class PypiPlugin:
     __name__ = "pypi"
     SEARCH_URL = "https://pypi.python.org/pypi"
@@ -16,11 +26,25 @@ class PypiPlugin:
 
     def __init__(self):
         self.api = None
+        self.provider = Provider("pypi", timeout=10)
 
     def load(self, sirbot):
         self.api = ServerProxy(self.SEARCH_URL, client=sirbot.http_session)
 
+    def metrics(self):
+        return self.provider.metrics()
+
+    def snapshot(self):
+        return self.provider.snapshot()
+
+    def restore(self, state, age):
+        self.provider.restore(state, age)
+
     async def search(self, search):
+        results, stale = await self.provider.call(search, lambda: self._search(search))
+        return SearchResults(results, stale=stale)
+
+    async def _search(self, search):
         results = await self.api.search({"name": search})
         for item in results:
             item["distance"] = levenshtein(str(search), item["name"])
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import contextlib
+
+from sirbot.plugins.postgres import PgPlugin
+
+from .resilience import CircuitBreaker
+
+LOG = logging.getLogger(__name__)
+
+
+class ReadReplicaPlugin:
+    """
+    Route read only queries to a postgres read replica.
+
+    Queries using :meth:`connection` run on the replica when one is configured
+    and reachable, and on the primary database otherwise. A failure to acquire a
+    replica connection falls back to the primary. After ``failure_threshold``
+    consecutive failures the replica is not tried again for ``recovery_timeout``
+    seconds.
+
+    The replica pool is created in the background, retried every
+    ``recovery_timeout`` seconds while the replica is unreachable. Queries use the
+    primary until it is created.
+
+    Replicas lag behind the primary: only use it for queries tolerating slightly
+    stale data. The fallback only covers acquiring a connection, errors raised by
+    the queries themselves (e.g. recovery conflicts) are raised to the caller.
+
+    Args:
+        dsn: Replica DSN (env var: `POSTGRES_READ_DSN`), queries go to the
+            primary when not set.
+        timeout: Seconds to wait for a replica connection, or for the pool.
+        failure_threshold: Consecutive failures before the replica is skipped.
+        recovery_timeout: Seconds the replica is skipped.
+        **kwargs: Arguments for :func:`asyncpg.pool.create_pool`.
+    """
+
+    __name__ = "pg_read"
+
+    def __init__(
+        self, dsn=None, timeout=5, failure_threshold=3, recovery_timeout=30, **kwargs
+    ):
+        self.replica = PgPlugin(dsn=dsn, **kwargs) if dsn else None
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, recovery_timeout)
+        self.counts = dict.fromkeys(("replica", "fallback"), 0)
+        self._plugins = {}
+        self._connector = None
+
+    def load(self, sirbot):
+        LOG.info("Loading read replica plugin")
+        self._plugins = sirbot["plugins"]
+        if self.replica:
+            sirbot.on_startup.append(self.startup)
+            sirbot.on_shutdown.append(self.shutdown)
+
+    async def startup(self, sirbot):
+        self._connector = asyncio.ensure_future(self._connect())
+
+    async def shutdown(self, sirbot):
+        if self._connector:
+            self._connector.cancel()
+        if self.replica.pool:
+            await self.replica.shutdown(sirbot)
+
+    def metrics(self):
+        for target, count in self.counts.items():
+            yield ("sirbot_pg_read_queries_total", {"target": target}, count)
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        """Acquire a connection to the replica, or to the primary as fallback"""
+        pg_con = await self._acquire() if self.replica else None
+        if pg_con is None:
+            async with self._plugins["pg"].connection() as pg_con:
+                yield pg_con
+            return
+
+        try:
+            yield pg_con
+        finally:
+            await self.replica.pool.release(pg_con)
+
+    async def _connect(self):
+        while self.replica.pool is None:
+            try:
+                await asyncio.wait_for(self.replica.startup(None), self.timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                LOG.exception("Read replica unavailable, reading from the primary")
+                await asyncio.sleep(self.breaker.recovery_timeout)
+
+    async def _acquire(self):
+        if self.replica.pool is None or not self.breaker.allow():
+            self.counts["fallback"] += 1
+            return None
+
+        try:
+            pg_con = await self.replica.pool.acquire(timeout=self.timeout)
+        except asyncio.CancelledError:
+            # Caught first as it subclasses ``Exception`` on python 3.7
+            self.breaker.release()
+            raise
+        except Exception:
+            LOG.exception("Failed to connect to the read replica")
+            self.breaker.record_failure()
+            self.counts["fallback"] += 1
+            return None
+
+        self.breaker.record_success()
+        self.counts["replica"] += 1
+        return pg_con
@@ -0,0 +1,202 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+from aiohttp import ClientError, ClientResponseError
+
+LOG = logging.getLogger(__name__)
+
+
+class CircuitOpen(Exception):
+    """Raised when a provider is unavailable and no cached response exists"""
+
+    def __init__(self, provider):
+        super().__init__(f"Circuit open for provider {provider}")
+        self.provider = provider
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing provider for a while.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls
+    are rejected. Once ``recovery_timeout`` seconds elapsed a single trial call is
+    let through (half open). Its outcome closes or re-opens the circuit. A trial
+    call without outcome, when cancelled, must be released to let another trial
+    through.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        elif time.monotonic() - self.opened_at >= self.recovery_timeout:
+            return self.HALF_OPEN
+        else:
+            return self.OPEN
+
+    def allow(self):
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        elif state == self.HALF_OPEN and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def release(self):
+        """Release the trial call without recording an outcome"""
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial = False
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class Provider:
+    """
+    Call an upstream provider with a timeout and a circuit breaker.
+
+    The last successful response for each key is kept. When the provider fails,
+    or while its circuit is open, that response is returned flagged as stale.
+
+    Args:
+        name: Provider name, used in logs and metrics.
+        timeout: Seconds before a call is considered failed.
+        failure_threshold: Consecutive failures opening the circuit.
+        recovery_timeout: Seconds before an open circuit is tried again.
+        max_stale_age: Maximum age, in seconds, of a stale response.
+        cache_size: Number of last-known-good responses kept.
+    """
+
+    def __init__(
+        self,
+        name,
+        *,
+        timeout=5,
+        failure_threshold=5,
+        recovery_timeout=30,
+        max_stale_age=86400,
+        cache_size=1024,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.max_stale_age = max_stale_age
+        self.cache_size = cache_size
+        self.breaker = CircuitBreaker(failure_threshold, recovery_timeout)
+        self.calls = dict.fromkeys(("success", "failure", "rejected", "stale"), 0)
+        self._cache = OrderedDict()
+
+    async def call(self, key, fetch):
+        """
+        Call ``fetch`` unless the circuit is open.
+
+        Args:
+            key: Cache key of the response.
+            fetch: Coroutine function querying the provider.
+
+        Returns:
+            Tuple of the response and whether it is stale.
+        """
+        if not self.breaker.allow():
+            self.calls["rejected"] += 1
+            return self._stale(key)
+
+        try:
+            value = await asyncio.wait_for(fetch(), self.timeout)
+        except asyncio.CancelledError:
+            # The provider health is unknown. Caught first as it subclasses
+            # ``Exception`` on python 3.7
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if not self._is_failure(e):
+                self.breaker.record_success()
+                raise
+
+            self.calls["failure"] += 1
+            self.breaker.record_failure()
+            LOG.warning("Provider %s failed: %r", self.name, e)
+            return self._stale(key, e)
+
+        self.calls["success"] += 1
+        self.breaker.record_success()
+        if value is not None:
+            self._cache[key] = (time.monotonic(), value)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return value, False
+
+    def snapshot(self):
+        """Last-known-good responses, with their age in seconds"""
+        now = time.monotonic()
+        return [
+            (key, now - fetched, value) for key, (fetched, value) in self._cache.items()
+        ]
+
+    def restore(self, state, age):
+        now = time.monotonic()
+        for key, elapsed, value in state:
+            if elapsed + age < self.max_stale_age:
+                self._cache[key] = (now - elapsed - age, value)
+
+    def metrics(self):
+        state = self.breaker.state
+        for name in (
+            CircuitBreaker.CLOSED,
+            CircuitBreaker.HALF_OPEN,
+            CircuitBreaker.OPEN,
+        ):
+            yield (
+                "sirbot_provider_circuit_state",
+                {"provider": self.name, "state": name},
+                int(state == name),
+            )
+        for outcome, count in self.calls.items():
+            yield (
+                "sirbot_provider_calls_total",
+                {"provider": self.name, "outcome": outcome},
+                count,
+            )
+        yield (
+            "sirbot_provider_cached_responses",
+            {"provider": self.name},
+            len(self._cache),
+        )
+
+    def _stale(self, key, exc=None):
+        cached = self._cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.max_stale_age:
+            self.calls["stale"] += 1
+            return cached[1], True
+        elif exc is not None:
+            raise exc
+        else:
+            raise CircuitOpen(self.name)
+
+    @staticmethod
+    def _is_failure(exc):
+        if isinstance(exc, ClientResponseError):
+            return exc.status >= 500 or exc.status == 429
+        return isinstance(exc, (asyncio.TimeoutError, ClientError, OSError))
@@ -0,0 +1,175 @@
+import os
+import time
+import zlib
+import pickle
+import struct
+import asyncio
+import logging
+
+LOG = logging.getLogger(__name__)
+# Bumped when the layout of the snapshot changes, older snapshots are ignored
+SNAPSHOT_VERSION = 1
+MAGIC = b"SIRBOTSS"
+# Magic, version and creation time
+HEADER = struct.Struct("!8sHd")
+
+
+class SnapshotPlugin:
+    """
+    Keep the in-memory caches across restarts.
+
+    Every loaded plugin with ``snapshot`` and ``restore`` methods is saved every
+    ``interval`` seconds, and on shutdown, to a compressed file. The snapshot is
+    restored on startup, before the bot receives any traffic. ``snapshot`` returns
+    a picklable state with durations relative to the time it is called, and
+    ``restore(state, age)`` receives that state and the snapshot age in seconds.
+
+    A snapshot of another version, or older than ``max_age`` seconds, is ignored
+    and the caches are rebuilt from scratch. A plugin failing to restore its state
+    starts empty without affecting the others.
+
+    The file is unpickled: only point ``path`` to a private directory.
+
+    Args:
+        path: Snapshot file (env var: `SNAPSHOT_PATH`).
+        interval: Seconds between two snapshots.
+        max_age: Maximum age, in seconds, of a restored snapshot.
+        save: Save snapshots, disabled in all but one worker.
+    """
+
+    __name__ = "snapshot"
+
+    def __init__(self, path, interval=300, max_age=6 * 3600, save=True):
+        self.path = path
+        self.interval = interval
+        self.max_age = max_age
+        self.save = save
+        self.size = 0
+        self.restored = {}
+        self._plugins = {}
+        self._saver = None
+
+    def load(self, sirbot):
+        LOG.info("Loading snapshot plugin")
+        self._plugins = sirbot["plugins"]
+        # Restore the caches before the other plugins start
+        sirbot.on_startup.insert(0, self.startup)
+        sirbot.on_shutdown.append(self.shutdown)
+
+    async def startup(self, sirbot):
+        self.restore_plugins()
+        if self.save:
+            self._saver = asyncio.ensure_future(self._save_loop())
+
+    async def shutdown(self, sirbot):
+        if self._saver:
+            self._saver.cancel()
+            await self.write()
+
+    def metrics(self):
+        yield ("sirbot_snapshot_bytes", {}, self.size)
+        for name, restored in self.restored.items():
+            yield ("sirbot_snapshot_restored", {"plugin": name}, int(restored))
+
+    def collect(self):
+        """State of the plugins with a ``snapshot`` method"""
+        state = {}
+        for name, plugin in self._plugins.items():
+            if not hasattr(plugin, "snapshot"):
+                continue
+
+            try:
+                state[name] = plugin.snapshot()
+            except Exception:
+                LOG.exception("Failed to snapshot plugin %s", name)
+        return state
+
+    async def write(self):
+        state = self.collect()
+        # Pickled in the event loop thread, while the state can't change
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        start = time.perf_counter()
+        try:
+            self.size = await asyncio.get_event_loop().run_in_executor(
+                None, write_snapshot, self.path, data
+            )
+        except Exception:
+            LOG.exception("Failed to write snapshot %s", self.path)
+        else:
+            LOG.debug(
+                "Wrote snapshot of %s bytes in %.3fs",
+                self.size,
+                time.perf_counter() - start,
+            )
+
+    def restore_plugins(self):
+        try:
+            state, age = read_snapshot(self.path, self.max_age)
+        except Exception:
+            LOG.exception("Failed to read snapshot %s", self.path)
+            return
+
+        if state is None:
+            return
+
+        for name, plugin_state in state.items():
+            plugin = self._plugins.get(name)
+            if not hasattr(plugin, "restore"):
+                continue
+
+            try:
+                plugin.restore(plugin_state, age)
+            except Exception:
+                LOG.exception("Failed to restore plugin %s", name)
+                self.restored[name] = False
+            else:
+                self.restored[name] = True
+        LOG.info("Restored snapshot of %.0fs ago", age)
+
+    async def _save_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.write()
+
+
+def write_snapshot(path, data):
+    """
+    Write a snapshot atomically, a crash leaves the previous one in place.
+
+    Returns:
+        Size of the snapshot in bytes.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    content = HEADER.pack(MAGIC, SNAPSHOT_VERSION, time.time()) + zlib.compress(data)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+    return len(content)
+
+
+def read_snapshot(path, max_age):
+    """
+    Read a snapshot.
+
+    Returns:
+        Tuple of the state and the snapshot age in seconds. The state is ``None``
+        if there is no snapshot, or if it is stale or of another version.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            magic, version, created = HEADER.unpack(header)
+            age = time.time() - created
+            if magic != MAGIC or version != SNAPSHOT_VERSION:
+                LOG.warning("Ignoring snapshot %s of version %s", path, version)
+                return None, age
+            elif not 0 <= age <= max_age:
+                LOG.warning("Ignoring stale snapshot %s of %.0fs ago", path, age)
+                return None, age
+
+            data = f.read()
+    except FileNotFoundError:
+        return None, 0
+
+    return pickle.loads(zlib.decompress(data)), age
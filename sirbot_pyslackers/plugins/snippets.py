@@ -0,0 +1,90 @@
+import re
+import time
+import logging
+from collections import OrderedDict
+
+LOG = logging.getLogger(__name__)
+CODE_LINE_REGEX = re.compile(
+    r"""^(?:
+        [ ]{2,}\S|\t                                        # indented
+        |\s*(?:def|class|async\ def|return|yield|raise|import|from\ \S+\ import)\b
+        |\s*(?:if|elif|for|while|with|try|except|else|finally)\b.*:\s*$
+        |\s*@\w+                                            # decorator
+        |\s*\w[\w.\[\]'"]*\s*[-+*/]?=\s*\S                  # assignment
+        |\s*(?:print|self\.\w+)\(                           # call
+        |.*[;{}]\s*$                                        # c-like
+        |\s*(?:Traceback|File\ ").*                         # traceback
+        |\s*>>>\ \S                                       # interpreter
+    )""",
+    flags=re.MULTILINE | re.VERBOSE,
+)
+
+
+def looks_like_code(text, min_length=200, min_lines=5, ratio=0.5):
+    """
+    Cheap heuristic detecting unformatted code.
+
+    Most chat messages are rejected on their length or line count. Otherwise the
+    lines looking like code are counted until ``ratio`` of the lines matched.
+    """
+    if len(text) < min_length or "```" in text:
+        return False
+
+    lines = text.count("\n") + 1
+    if lines < min_lines:
+        return False
+
+    needed = max(min_lines - 1, int(lines * ratio))
+    for count, _ in enumerate(CODE_LINE_REGEX.finditer(text), start=1):
+        if count >= needed:
+            return True
+    return False
+
+
+class SnippetsPlugin:
+    """
+    Detect code pasted without formatting.
+
+    Args:
+        cooldown: Seconds before a user is reminded again.
+        max_users: Number of users whose last reminder is remembered.
+    """
+
+    __name__ = "snippets"
+
+    def __init__(self, cooldown=3600, max_users=10000):
+        self.cooldown = cooldown
+        self.max_users = max_users
+        self.counts = dict.fromkeys(("checked", "detected", "reminded"), 0)
+        self._reminded = OrderedDict()
+
+    def load(self, sirbot):
+        pass
+
+    def metrics(self):
+        for name, count in self.counts.items():
+            yield ("sirbot_snippets_messages_total", {"outcome": name}, count)
+
+    def should_remind(self, message, now=None):
+        """Whether the message is unformatted code and its author was not reminded recently"""
+        user = message.get("user")
+        # Bot and integration messages have no user to remind
+        if not user:
+            return False
+
+        self.counts["checked"] += 1
+        if not looks_like_code(message.get("text") or ""):
+            return False
+
+        self.counts["detected"] += 1
+        now = time.monotonic() if now is None else now
+        if now - self._reminded.get(user, float("-inf")) < self.cooldown:
+            return False
+
+        self._reminded[user] = now
+        self._reminded.move_to_end(user)
+        if len(self._reminded) > self.max_users:
+            self._reminded.popitem(last=False)
+
+        self.counts["reminded"] += 1
+        return True
@@ -0,0 +1,234 @@
+import os
+import json
+import random
+import asyncio
+import logging
+
+from aiohttp import WSMsgType, ClientError
+from aiohttp.web import Response
+from slack.events import Event
+from slack.actions import Action
+from slack.commands import Command
+
+LOG = logging.getLogger(__name__)
+
+
+class SocketModePlugin:
+    """
+    Receive slack events, commands and actions over a socket mode websocket.
+
+    Envelopes are dispatched to the routers of the slack plugin, like the
+    requests of its HTTP endpoints, in the ``socket_mode`` pool of the tasks
+    plugin. Events are acknowledged as soon as they are received, commands and
+    actions once their handlers returned so their response can be sent back in the
+    acknowledgement. Acknowledgements are queued and written by a single task.
+
+    The connection is opened again, with an exponential backoff, when it is closed
+    or slack asks for a refresh.
+
+    Args:
+        app_token: Slack app level token (env var: `SLACK_APP_TOKEN`).
+        api_url: Slack API base url.
+        max_backoff: Maximum number of seconds between two connection attempts.
+    """
+
+    __name__ = "socket_mode"
+
+    def __init__(
+        self, app_token=None, api_url="https://slack.com/api/", max_backoff=60
+    ):
+        self.app_token = app_token or os.environ["SLACK_APP_TOKEN"]
+        self.api_url = api_url
+        self.max_backoff = max_backoff
+        self.connected = False
+        self.counts = {"connections": 0, "acks": 0}
+        self.envelopes = {}
+        self._app = None
+        self._acks = None
+        self._runner = None
+
+    @property
+    def ready(self):
+        # Warmed up once connected, reconnections do not make it unready
+        return self.counts["connections"] > 0
+
+    def load(self, sirbot):
+        LOG.info("Loading socket mode plugin")
+        self._app = sirbot
+        sirbot.on_startup.append(self.startup)
+        sirbot.on_shutdown.insert(0, self.shutdown)
+
+    async def startup(self, sirbot):
+        self._acks = asyncio.Queue()
+        self._runner = asyncio.ensure_future(self._run())
+
+    async def shutdown(self, sirbot):
+        if self._runner:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+
+    def metrics(self):
+        yield ("sirbot_socket_mode_connected", {}, int(self.connected))
+        yield ("sirbot_socket_mode_connections_total", {}, self.counts["connections"])
+        yield ("sirbot_socket_mode_acks_total", {}, self.counts["acks"])
+        for kind, count in self.envelopes.items():
+            yield ("sirbot_socket_mode_envelopes_total", {"type": kind}, count)
+
+    async def _run(self):
+        attempt = 0
+        while True:
+            try:
+                url = await self._open()
+                async with self._app.http_session.ws_connect(url, heartbeat=30) as ws:
+                    attempt = 0
+                    await self._listen(ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                LOG.exception("Socket mode connection failed")
+
+            self.connected = False
+            delay = min(self.max_backoff, 2 ** attempt) * random.uniform(0.5, 1)
+            attempt += 1
+            LOG.info("Socket mode reconnecting in %.1f seconds", delay)
+            await asyncio.sleep(delay)
+
+    async def _open(self):
+        async with self._app.http_session.post(
+            self.api_url + "apps.connections.open",
+            headers={"Authorization": f"Bearer {self.app_token}"},
+        ) as r:
+            data = await r.json()
+
+        if not data.get("ok"):
+            raise ClientError(f"apps.connections.open failed: {data}")
+        return data["url"]
+
+    async def _listen(self, ws):
+        writer = asyncio.ensure_future(self._write_acks(ws))
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    break
+
+                envelope = json.loads(msg.data)
+                if envelope["type"] == "hello":
+                    self.connected = True
+                    self.counts["connections"] += 1
+                    LOG.info("Socket mode connected")
+                elif envelope["type"] == "disconnect":
+                    LOG.info("Socket mode disconnect: %s", envelope.get("reason"))
+                    break
+                else:
+                    await self._app["plugins"]["tasks"].submit(
+                        "socket_mode", self._handle(envelope), name=envelope["type"]
+                    )
+        finally:
+            writer.cancel()
+
+    async def _write_acks(self, ws):
+        while True:
+            acks = [await self._acks.get()]
+            while not self._acks.empty():
+                acks.append(self._acks.get_nowait())
+
+            for ack in acks:
+                await ws.send_str(json.dumps(ack))
+            self.counts["acks"] += len(acks)
+
+    def _ack(self, envelope, payload=None):
+        ack = {"envelope_id": envelope["envelope_id"]}
+        if payload:
+            ack["payload"] = payload
+        self._acks.put_nowait(ack)
+
+    async def _handle(self, envelope):
+        kind = envelope["type"]
+        self.envelopes[kind] = self.envelopes.get(kind, 0) + 1
+        slack = self._app["plugins"]["slack"]
+        try:
+            if kind == "events_api":
+                self._ack(envelope)
+                event = Event.from_http(envelope["payload"])
+                if event["type"] == "message":
+                    futures = _dispatch_message(slack, event, self._app)
+                else:
+                    futures = _dispatch(slack.routers["event"], event, self._app)
+                await _responses(futures)
+            elif kind == "slash_commands":
+                command = Command(envelope["payload"])
+                futures = _dispatch(slack.routers["command"], command, self._app)
+                self._ack(envelope, await _responses(futures))
+            elif kind == "interactive":
+                action = Action(envelope["payload"])
+                futures = _dispatch(slack.routers["action"], action, self._app)
+                self._ack(envelope, await _responses(futures))
+            else:
+                LOG.debug("Unhandled socket mode envelope: %s", envelope)
+                self._ack(envelope)
+        except Exception:
+            LOG.exception("Failed to handle socket mode envelope %s", kind)
+
+
+def _dispatch(router, event, app):
+    return _start(router.dispatch(event), event, app)
+
+
+def _dispatch_message(slack, message, app):
+    """Mirror the bot and mention filtering of the slack plugin HTTP endpoint"""
+    if slack.bot_id and (
+        message.get("bot_id") == slack.bot_id
+        or message.get("message", {}).get("bot_id") == slack.bot_id
+    ):
+        return []
+
+    text = message.get("text")
+    mention = bool(
+        slack.bot_user_id
+        and text
+        and (slack.bot_user_id in text or message["channel"].startswith("D"))
+    )
+    prefix = f"<@{slack.bot_user_id}>"
+    if mention and text.startswith(prefix):
+        message["text"] = text.replace(prefix, "", 1).strip()
+
+    return _start(
+        (
+            (handler, configuration)
+            for handler, configuration in slack.routers["message"].dispatch(message)
+            if (mention or not configuration["mention"])
+            and (not configuration["admin"] or message["user"] in slack.admins)
+        ),
+        message,
+        app,
+    )
+
+
+def _start(handlers, event, app):
+    futures = []
+    for handler, configuration in handlers:
+        future = asyncio.ensure_future(handler(event, app))
+        if configuration["wait"]:
+            futures.append(future)
+        else:
+            future.add_done_callback(_log_exception)
+    return futures
+
+
+def _log_exception(future):
+    if not future.cancelled() and future.exception():
+        LOG.error("Handler failed", exc_info=future.exception())
+
+
+async def _responses(futures):
+    """Wait for the handlers, return the JSON body of their response if any"""
+    payload = None
+    for result in await asyncio.gather(*futures, return_exceptions=True):
+        if isinstance(result, Exception):
+            LOG.error("Handler failed", exc_info=result)
+        elif isinstance(result, Response) and result.body:
+            try:
+                payload = json.loads(result.body)
+            except ValueError:
+                payload = {"text": result.text}
+    return payload
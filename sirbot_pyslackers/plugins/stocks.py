@@ -1,9 +1,18 @@
 import os
+import logging
 import datetime
+import itertools
 import dataclasses
-from typing import Optional
+from typing import Dict, List, Tuple, Optional
 from decimal import Decimal
 
+import asyncpg
+
+from .resilience import Provider
+
+LOG = logging.getLogger(__name__)
+SPARKLINE_TICKS = "▁▂▃▄▅▆▇█"
+
 
 @dataclasses.dataclass(frozen=True)
 class StockQuote:
@@ -19,30 +28,187 @@ class StockQuote:
     volume: Decimal
     time: datetime.datetime
     logo: Optional[str] = None
+    stale: bool = False
+
+
+def sparkline(values: List[Decimal], width: int = 20) -> str:
+    """Render values as a string of unicode block characters"""
+    if len(values) > width:
+        step = (len(values) - 1) / (width - 1)
+        values = [values[round(i * step)] for i in range(width)]
+
+    low, high = min(values), max(values)
+    if low == high:
+        return SPARKLINE_TICKS[0] * len(values)
+
+    scale = (len(SPARKLINE_TICKS) - 1) / (high - low)
+    return "".join(SPARKLINE_TICKS[int((v - low) * scale)] for v in values)
 
 
 class StocksPlugin:
+    """
+    Retrieve quotes from Yahoo Finance.
+
+    Fetched quotes are stored in the ``stocks.quotes`` table. A quote fetched less
+    than ``cache_ttl`` seconds ago is answered from that table.
+    """
+
     __name__ = "stocks"
+    BATCH_SIZE = 50
 
-    def __init__(self):
+    def __init__(self, cache_ttl=60):
         self.session = None  # set lazily on plugin load
+        self.plugins = {}
+        self.cache_ttl = datetime.timedelta(seconds=cache_ttl)
+        self.provider = Provider("yahoo", timeout=5)
 
     def load(self, sirbot):
         self.session = sirbot.http_session
+        self.plugins = sirbot["plugins"]
+
+    def metrics(self):
+        return self.provider.metrics()
+
+    def snapshot(self):
+        return self.provider.snapshot()
+
+    def restore(self, state, age):
+        self.provider.restore(state, age)
 
     async def price(self, symbol: str) -> StockQuote:
+        quote, fetched = await self._latest(symbol)
+        if quote and fetched > _now() - self.cache_ttl:
+            return quote
+
+        quote, stale = await self.provider.call(symbol, lambda: self._price(symbol))
+        if stale:
+            quote = dataclasses.replace(quote, stale=True)
+        elif quote:
+            await self._save(quote)
+        return quote
+
+    async def prices(self, symbols: List[str]) -> Dict[str, StockQuote]:
+        """
+        Fetch quotes of many symbols with batched requests.
+
+        Stale quotes are discarded.
+        """
+        quotes = {}
+        symbols = iter(sorted(symbols))
+        while True:
+            batch = list(itertools.islice(symbols, self.BATCH_SIZE))
+            if not batch:
+                break
+
+            try:
+                fetched, stale = await self.provider.call(
+                    tuple(batch), lambda: self._fetch(batch)
+                )
+            except Exception:
+                LOG.exception("Failed to fetch quotes of %s", batch)
+                continue
+
+            if not stale:
+                await self._save(*fetched)
+                quotes.update((quote.symbol, quote) for quote in fetched)
+
+        return quotes
+
+    async def history(
+        self, symbol: str, since: datetime.datetime
+    ) -> List[Tuple[datetime.datetime, Decimal]]:
+        """
+        Stored ``(time, price)`` of a symbol, oldest first. Empty when the quotes
+        table can't be read.
+        """
+        if "pg" not in self.plugins:
+            return []
+
+        try:
+            async with self.plugins["pg"].connection() as pg_con:
+                rows = await pg_con.fetch(
+                    """SELECT time, price FROM stocks.quotes
+                    WHERE symbol = $1 AND time >= $2 ORDER BY time""",
+                    symbol,
+                    since,
+                )
+        except (asyncpg.PostgresError, OSError):
+            LOG.exception("Failed to read the quotes history of %s", symbol)
+            return []
+        return [(row["time"], row["price"]) for row in rows]
+
+    async def _latest(
+        self, symbol: str
+    ) -> Tuple[Optional[StockQuote], Optional[datetime.datetime]]:
+        if "pg" not in self.plugins:
+            return None, None
+
+        try:
+            async with self.plugins["pg"].connection() as pg_con:
+                row = await pg_con.fetchrow(
+                    """SELECT symbol, company, price, change, change_percent,
+                    market_open, market_close, high, low, volume, time, logo, fetched
+                    FROM stocks.quotes WHERE symbol = $1 ORDER BY time DESC LIMIT 1""",
+                    symbol,
+                )
+        except (asyncpg.PostgresError, OSError):
+            # A cache miss, the quote is fetched from the provider
+            LOG.exception("Failed to read the last quote of %s", symbol)
+            return None, None
+
+        if not row:
+            return None, None
+
+        row = dict(row)
+        fetched = row.pop("fetched")
+        return StockQuote(**row), fetched
+
+    async def _save(self, *quotes: StockQuote) -> None:
+        if "pg" not in self.plugins:
+            return
+
+        try:
+            async with self.plugins["pg"].connection() as pg_con:
+                await pg_con.executemany(
+                    """INSERT INTO stocks.quotes (symbol, time, price, change, change_percent,
+                    market_open, market_close, high, low, volume, company, logo)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
+                    ON CONFLICT (symbol, time) DO UPDATE SET fetched = now()""",
+                    [
+                        (
+                            quote.symbol,
+                            quote.time,
+                            quote.price,
+                            quote.change,
+                            quote.change_percent,
+                            quote.market_open,
+                            quote.market_close,
+                            quote.high,
+                            quote.low,
+                            quote.volume,
+                            quote.company,
+                            quote.logo,
+                        )
+                        for quote in quotes
+                    ],
+                )
+        except Exception:
+            LOG.exception("Failed to save quotes of %s", [q.symbol for q in quotes])
+
+    async def _price(self, symbol: str) -> Optional[StockQuote]:
+        quotes = await self._fetch([symbol])
+        return quotes[0] if quotes else None
+
+    async def _fetch(self, symbols: List[str]) -> List[StockQuote]:
         async with self.session.get(
             "https://query1.finance.yahoo.com/v7/finance/quote",
-            params={"symbols": symbol},
+            params={"symbols": ",".join(symbols)},
         ) as r:
             r.raise_for_status()
             body = (await r.json())["quoteResponse"]["result"]
-            if len(body) < 1:
-                return None
 
-            quote = body[0]
-
-            return StockQuote(
+        return [
+            StockQuote(
                 symbol=quote["symbol"],
                 company=quote.get("longName", quote.get("shortName", "")),
                 price=Decimal(quote.get("regularMarketPrice", 0)),
@@ -53,6 +219,14 @@ class StocksPlugin:
                 high=Decimal(quote.get("regularMarketDayHigh", 0)),
                 low=Decimal(quote.get("regularMarketDayLow", 0)),
                 volume=Decimal(quote.get("regularMarketVolume", 0)),
-                time=datetime.datetime.fromtimestamp(quote.get("regularMarketTime", 0)),
+                time=datetime.datetime.fromtimestamp(
+                    quote.get("regularMarketTime", 0), tz=datetime.timezone.utc
+                ),
                 logo=quote.get("coinImageUrl"),
             )
+            for quote in body
+        ]
+
+
+def _now():
+    return datetime.datetime.now(tz=datetime.timezone.utc)
@@ -0,0 +1,189 @@
+import time
+import asyncio
+import logging
+import functools
+
+from aiohttp.web import json_response
+
+LOG = logging.getLogger(__name__)
+
+
+class PoolFull(Exception):
+    """Raised when too many tasks are pending in a pool"""
+
+
+class Pool:
+    def __init__(self, name, concurrency, max_pending):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.tasks = {}
+        self.running = set()
+        self.counts = dict.fromkeys(("completed", "failed", "cancelled", "rejected"), 0)
+        self._semaphore = None
+
+    @property
+    def semaphore(self):
+        # Created lazily to bind it to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    @property
+    def full(self):
+        return len(self.tasks) >= self.max_pending
+
+
+class TasksPlugin:
+    """
+    Run background work in named pools of tracked tasks.
+
+    Each pool limits the number of concurrently running tasks and of pending tasks.
+    Failures are logged. On shutdown pending tasks are given ``drain_timeout``
+    seconds to finish before being cancelled.
+
+    **Endpoints**:
+        * ``/sirbot/tasks``: In flight tasks and their age.
+
+    Args:
+        pools: Mapping of pool names to ``(concurrency, max_pending)``.
+        default: ``(concurrency, max_pending)`` of pools not in ``pools``.
+        drain_timeout: Seconds given to pending tasks on shutdown.
+    """
+
+    __name__ = "tasks"
+
+    def __init__(self, pools=None, default=(10, 100), drain_timeout=20):
+        self.default = default
+        self.drain_timeout = drain_timeout
+        self.pools = {
+            name: Pool(name, *configuration)
+            for name, configuration in (pools or {}).items()
+        }
+
+    def load(self, sirbot):
+        LOG.info("Loading tasks plugin")
+        sirbot.router.add_route("GET", "/sirbot/tasks", self.list_tasks)
+        # Drain before the http session and database pool are closed
+        sirbot.on_shutdown.insert(0, self.drain)
+
+    def pool(self, name):
+        if name not in self.pools:
+            self.pools[name] = Pool(name, *self.default)
+        return self.pools[name]
+
+    def spawn(self, pool, coro, name=None):
+        """
+        Schedule ``coro`` in ``pool``.
+
+        Raises:
+            :class:`PoolFull`: Too many tasks are pending in the pool.
+        """
+        pool = self.pool(pool)
+        if pool.full:
+            coro.close()
+            pool.counts["rejected"] += 1
+            raise PoolFull(f"Task pool {pool.name} is full")
+
+        task = asyncio.ensure_future(self._run(pool, coro))
+        pool.tasks[task] = (name or getattr(coro, "__qualname__", "task"), time.time())
+        task.add_done_callback(functools.partial(self._done, pool))
+        return task
+
+    async def submit(self, pool, coro, name=None):
+        """Schedule ``coro`` in ``pool``, waiting for room in the pool if needed"""
+        while self.pool(pool).full:
+            await asyncio.wait(
+                list(self.pool(pool).tasks), return_when=asyncio.FIRST_COMPLETED
+            )
+        return self.spawn(pool, coro, name)
+
+    async def drain(self, sirbot):
+        tasks = [task for pool in self.pools.values() for task in pool.tasks]
+        if not tasks:
+            return
+
+        LOG.info("Waiting for %s background tasks", len(tasks))
+        _, pending = await asyncio.wait(tasks, timeout=self.drain_timeout)
+        for task in pending:
+            task.cancel()
+
+        if pending:
+            LOG.warning("Cancelled %s background tasks on shutdown", len(pending))
+            await asyncio.wait(pending)
+
+    def metrics(self):
+        for pool in self.pools.values():
+            labels = {"pool": pool.name}
+            yield ("sirbot_tasks_running", labels, len(pool.running))
+            yield ("sirbot_tasks_pending", labels, len(pool.tasks))
+            for outcome, count in pool.counts.items():
+                yield ("sirbot_tasks_total", {**labels, "outcome": outcome}, count)
+
+    async def list_tasks(self, request):
+        now = time.time()
+        return json_response(
+            {
+                pool.name: {
+                    "concurrency": pool.concurrency,
+                    "max_pending": pool.max_pending,
+                    **pool.counts,
+                    "tasks": [
+                        {
+                            "name": name,
+                            "age": round(now - created, 3),
+                            "running": task in pool.running,
+                        }
+                        for task, (name, created) in pool.tasks.items()
+                    ],
+                }
+                for pool in self.pools.values()
+            }
+        )
+
+    @staticmethod
+    async def _run(pool, coro):
+        async with pool.semaphore:
+            task = asyncio.current_task()
+            pool.running.add(task)
+            try:
+                return await coro
+            finally:
+                pool.running.discard(task)
+
+    @staticmethod
+    def _done(pool, task):
+        name, created = pool.tasks.pop(task)
+        if task.cancelled():
+            pool.counts["cancelled"] += 1
+        elif task.exception():
+            pool.counts["failed"] += 1
+            LOG.error(
+                "Task %s of pool %s failed", name, pool.name, exc_info=task.exception(),
+            )
+        else:
+            pool.counts["completed"] += 1
+
+
+def supervised(pool, handler):
+    """
+    Run a slack handler as a tracked task of ``pool``.
+
+    The wrapped handler returns once the task is scheduled, so slack receives its
+    acknowledgement in time. When the pool is full the event is dropped, counted
+    as rejected: waiting for room would delay the acknowledgement and slack would
+    retry the event, adding to the backlog.
+    """
+
+    @functools.wraps(handler)
+    async def wrapper(event, app):
+        try:
+            app["plugins"]["tasks"].spawn(
+                pool, handler(event, app), name=handler.__name__
+            )
+        except PoolFull:
+            LOG.warning(
+                "Dropped %s event, task pool %s is full", handler.__name__, pool
+            )
+
+    return wrapper
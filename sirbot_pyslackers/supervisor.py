@@ -0,0 +1,213 @@
+import os
+import time
+import signal
+import asyncio
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+
+LOG = logging.getLogger(__name__)
+# Plugins keeping their state in memory, each worker only sees the messages and
+# events it received. Their behaviour is only exact with a single worker.
+PER_WORKER_PLUGINS = {
+    "flood": "message rates are counted per worker",
+    "duplicates": "cross-posts received by different workers are not detected",
+    "snippets": "the reminder cooldown of a user is per worker",
+    "notifications": "admin notifications are grouped and deduplicated per worker",
+    "keywords": "a user receives one digest per worker",
+}
+
+
+class Supervisor:
+    """
+    Run the bot in multiple worker processes sharing one listening socket.
+
+    Every worker binds the same address with ``SO_REUSEPORT`` and the kernel
+    balances incoming connections between them. Worker ``0`` is the primary
+    worker, the one running the scheduled jobs.
+
+    Workers report a heartbeat to the supervisor. A worker that exits or stops
+    reporting is restarted. On ``SIGTERM`` / ``SIGINT`` every worker is asked to
+    shut down gracefully and is killed if it did not exit after
+    ``shutdown_timeout`` seconds.
+
+    The supervisor is loaded as a plugin in every worker, exposing the heartbeat
+    age and restarts of all the workers as metrics.
+
+    The plugins in ``PER_WORKER_PLUGINS`` keep a per worker state and are only
+    exact with a single worker.
+
+    Args:
+        make_bot: Callable taking a worker id and returning a :class:`sirbot.SirBot`.
+        workers: Number of worker processes.
+        heartbeat_interval: Seconds between two worker heartbeats.
+        heartbeat_timeout: Seconds without heartbeat before a worker is restarted.
+        shutdown_timeout: Seconds given to the workers to shut down.
+        report_interval: Seconds between two health reports.
+    """
+
+    __name__ = "supervisor"
+
+    def __init__(
+        self,
+        make_bot,
+        workers,
+        *,
+        heartbeat_interval=5,
+        heartbeat_timeout=60,
+        shutdown_timeout=30,
+        report_interval=300,
+    ):
+        self.make_bot = make_bot
+        self.workers = workers
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.report_interval = report_interval
+
+        self._context = multiprocessing.get_context("fork")
+        self._heartbeats = self._context.Array("d", workers, lock=False)
+        self._processes = {}
+        self._started = {}
+        self._restarts = self._context.Array("i", workers, lock=False)
+        self._stopping = False
+
+    def run(self, host, port):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        LOG.info("Starting %s workers on %s:%s", self.workers, host, port)
+        LOG.warning(
+            "Plugins with a per worker state: %s",
+            "; ".join(
+                f"{name}, {caveat}" for name, caveat in PER_WORKER_PLUGINS.items()
+            ),
+        )
+        for worker_id in range(self.workers):
+            self._spawn(worker_id, host, port)
+
+        last_report = time.monotonic()
+        while not self._stopping:
+            wait([p.sentinel for p in self._processes.values()], timeout=1)
+            if self._stopping:
+                break
+
+            self._check_workers(host, port)
+            if time.monotonic() - last_report > self.report_interval:
+                self.report()
+                last_report = time.monotonic()
+
+        self._shutdown()
+
+    def load(self, sirbot):
+        sirbot.on_startup.append(self._start_heartbeat)
+        sirbot.on_cleanup.append(self._stop_heartbeat)
+
+    def metrics(self):
+        now = time.time()
+        for worker_id in range(self.workers):
+            labels = {"worker": str(worker_id)}
+            yield (
+                "sirbot_worker_heartbeat_age_seconds",
+                labels,
+                now - self._heartbeats[worker_id],
+            )
+            yield ("sirbot_worker_restarts_total", labels, self._restarts[worker_id])
+
+    def report(self):
+        now = time.time()
+        for worker_id, process in sorted(self._processes.items()):
+            LOG.info(
+                "Worker %s (pid %s): alive=%s, last heartbeat %.1fs ago, %s restarts",
+                worker_id,
+                process.pid,
+                process.is_alive(),
+                now - self._heartbeats[worker_id],
+                self._restarts[worker_id],
+            )
+
+    def _spawn(self, worker_id, host, port):
+        self._heartbeats[worker_id] = time.time()
+        process = self._context.Process(
+            target=self._run_worker,
+            args=(worker_id, host, port),
+            name=f"sirbot-worker-{worker_id}",
+        )
+        process.start()
+        self._processes[worker_id] = process
+        self._started[worker_id] = time.monotonic()
+        LOG.info("Worker %s started (pid %s)", worker_id, process.pid)
+
+    def _check_workers(self, host, port):
+        now = time.time()
+        for worker_id, process in list(self._processes.items()):
+            if not process.is_alive():
+                LOG.error(
+                    "Worker %s (pid %s) exited with code %s",
+                    worker_id,
+                    process.pid,
+                    process.exitcode,
+                )
+            elif now - self._heartbeats[worker_id] > self.heartbeat_timeout:
+                LOG.error(
+                    "Worker %s (pid %s) missed its heartbeat, restarting it",
+                    worker_id,
+                    process.pid,
+                )
+                process.kill()
+                process.join()
+            else:
+                continue
+
+            # Avoid a tight restart loop when a worker crashes on startup
+            if time.monotonic() - self._started[worker_id] < self.heartbeat_interval:
+                time.sleep(self.heartbeat_interval)
+
+            self._restarts[worker_id] += 1
+            self._spawn(worker_id, host, port)
+
+    def _shutdown(self):
+        LOG.info("Stopping workers")
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        for worker_id, process in self._processes.items():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                LOG.warning(
+                    "Worker %s (pid %s) did not stop in time, killing it",
+                    worker_id,
+                    process.pid,
+                )
+                process.kill()
+                process.join()
+
+        LOG.info("All workers stopped")
+
+    def _stop(self, signum, frame):
+        LOG.info("Received signal %s", signal.Signals(signum).name)
+        self._stopping = True
+
+    def _run_worker(self, worker_id, host, port):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        os.environ["SIRBOT_WORKER_ID"] = str(worker_id)
+
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        bot = self.make_bot(worker_id)
+        bot["worker_id"] = worker_id
+        bot.load_plugin(self)
+        bot.start(host=host, port=port, reuse_port=True, print=False)
+
+    async def _start_heartbeat(self, bot):
+        bot["heartbeat"] = asyncio.ensure_future(self._heartbeat(bot["worker_id"]))
+
+    async def _stop_heartbeat(self, bot):
+        bot["heartbeat"].cancel()
+
+    async def _heartbeat(self, worker_id):
+        while True:
+            self._heartbeats[worker_id] = time.time()
+            await asyncio.sleep(self.heartbeat_interval)
@@ -0,0 +1,18 @@
+CREATE SCHEMA stocks;
+
+CREATE TABLE stocks.quotes (
+  symbol TEXT NOT NULL,
+  time TIMESTAMP WITH TIME ZONE NOT NULL,
+  price NUMERIC NOT NULL,
+  change NUMERIC NOT NULL,
+  change_percent NUMERIC NOT NULL,
+  market_open NUMERIC NOT NULL,
+  market_close NUMERIC NOT NULL,
+  high NUMERIC NOT NULL,
+  low NUMERIC NOT NULL,
+  volume NUMERIC NOT NULL,
+  company TEXT,
+  logo TEXT,
+  fetched TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+  PRIMARY KEY (symbol, time)
+);
@@ -0,0 +1,13 @@
+CREATE TABLE stocks.watches (
+  id SERIAL PRIMARY KEY,
+  channel TEXT NOT NULL,
+  symbol TEXT NOT NULL,
+  direction TEXT NOT NULL CHECK (direction IN ('above', 'below')),
+  threshold NUMERIC NOT NULL,
+  "user" TEXT NOT NULL,
+  triggered BOOLEAN NOT NULL DEFAULT FALSE,
+  created TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+  UNIQUE (channel, symbol, direction, threshold)
+);
+
+CREATE INDEX ON stocks.watches (symbol);
@@ -0,0 +1,7 @@
+CREATE TABLE slack.keywords (
+  id SERIAL PRIMARY KEY,
+  "user" TEXT NOT NULL,
+  keyword TEXT NOT NULL,
+  created TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+  UNIQUE ("user", keyword)
+);
@@ -0,0 +1,7 @@
+CREATE TABLE slack.imports (
+  archive TEXT NOT NULL,
+  member TEXT NOT NULL,
+  rows INTEGER NOT NULL,
+  imported TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+  PRIMARY KEY (archive, member)
+);
@@ -0,0 +1,33 @@
+CREATE TABLE slack.channel_activity (
+  channel TEXT NOT NULL,
+  hour TIMESTAMP NOT NULL,
+  messages INTEGER NOT NULL,
+  PRIMARY KEY (channel, hour)
+);
+
+CREATE INDEX ON slack.channel_activity (hour);
+
+CREATE TABLE slack.user_activity (
+  "user" TEXT NOT NULL,
+  hour TIMESTAMP NOT NULL,
+  messages INTEGER NOT NULL,
+  PRIMARY KEY ("user", hour)
+);
+
+CREATE INDEX ON slack.user_activity (hour);
+
+CREATE TABLE slack.user_message_counts (
+  "user" TEXT PRIMARY KEY NOT NULL,
+  messages INTEGER NOT NULL
+);
+
+INSERT INTO slack.channel_activity (channel, hour, messages)
+SELECT channel, date_trunc('hour', time), count(*) FROM slack.messages
+WHERE channel IS NOT NULL AND time IS NOT NULL GROUP BY 1, 2;
+
+INSERT INTO slack.user_activity ("user", hour, messages)
+SELECT "user", date_trunc('hour', time), count(*) FROM slack.messages
+WHERE "user" IS NOT NULL AND time IS NOT NULL GROUP BY 1, 2;
+
+INSERT INTO slack.user_message_counts ("user", messages)
+SELECT "user", count(*) FROM slack.messages WHERE "user" IS NOT NULL GROUP BY 1;
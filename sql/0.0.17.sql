@@ -0,0 +1 @@
+ALTER TABLE slack.messages ADD COLUMN deleted_at TIMESTAMP;
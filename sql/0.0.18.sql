@@ -0,0 +1,13 @@
+CREATE SCHEMA bot;
+
+CREATE TABLE bot.job_runs (
+  id SERIAL PRIMARY KEY,
+  job TEXT NOT NULL,
+  started TIMESTAMP WITH TIME ZONE NOT NULL,
+  duration REAL,
+  rows INTEGER,
+  outcome TEXT NOT NULL,
+  error TEXT
+);
+
+CREATE INDEX ON bot.job_runs (job, started DESC);
@@ -1,3 +1,5 @@
+import re
+
 import pytest
 from sirbot_pyslackers.endpoints.slack import messages
 
@@ -30,3 +32,36 @@ def test_stock_regex(text, result):
         assert match is None
     else:
         assert match.groupdict() == result
+
+
+@pytest.mark.parametrize(
+    ["text", "result"],
+    [
+        ("check out g#sirbot-pyslackers", {"owner": None, "repo": "sirbot-pyslackers"}),
+        ("g#python/cpython.", {"owner": "python", "repo": "cpython"}),
+        ("did you see g#aio-libs/aiohttp?", {"owner": "aio-libs", "repo": "aiohttp"}),
+        ("this is a bug#123", None),
+    ],
+)
+def test_github_repo_regex(text, result):
+    match = messages.GITHUB_REPO_REGEX.search(text)
+    if result is None:
+        assert match is None
+    else:
+        assert match.groupdict() == result
+
+
+def test_github_repo_regex_registered_with_flags():
+    class FakeSlack:
+        def __init__(self):
+            self.patterns = {}
+
+        def on_message(self, pattern, handler, flags=0, **kwargs):
+            compiled = re.compile(pattern, flags)
+            self.patterns[compiled.pattern] = compiled
+
+    plugin = FakeSlack()
+    messages.create_endpoints(plugin)
+    registered = plugin.patterns[messages.GITHUB_REPO_REGEX.pattern]
+    assert registered.flags & re.ASCII
+    assert registered.search("g#café").group("repo") == "caf"
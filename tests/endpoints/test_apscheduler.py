@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from sirbot_pyslackers.endpoints.apscheduler import _pipeline
+
+
+async def fetch(count, page_size=100, delay=0.01):
+    for i in range(count):
+        if i % page_size == 0:
+            await asyncio.sleep(delay)
+        yield i
+
+
+def test_pipeline_overlaps_fetch_and_write():
+    written = []
+
+    async def write(batch):
+        await asyncio.sleep(0.01)
+        written.extend(batch)
+
+    stats = asyncio.run(_pipeline(fetch(1000), write, batch_size=100))
+    assert written == list(range(1000))
+    assert stats["rows"] == 1000
+    assert stats["batches"] == 10
+    # fetching and writing each take ~0.1 second
+    assert stats["total"] < stats["fetch"] + stats["write"]
+
+
+def test_pipeline_write_error():
+    async def write(batch):
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        asyncio.run(_pipeline(fetch(1000), write, batch_size=10))
@@ -0,0 +1,139 @@
+import json
+import asyncio
+import datetime
+import contextlib
+
+import asyncpg
+from sirbot_pyslackers.plugins.archive import ArchivePlugin
+
+
+def test_save_buffers_rows():
+    plugin = ArchivePlugin()
+    plugin.save(
+        {"ts": "1546300800.000100", "text": "hi", "user": "U1", "channel": "C1"}
+    )
+    plugin.save({"ts": None, "text": "no timestamp"})
+
+    assert len(plugin._pending["saved"]) == 1
+    id_, text, user, channel, raw, time = plugin._pending["saved"][0]
+    assert (id_, text, user, channel) == ("1546300800.000100", "hi", "U1", "C1")
+    # stored in their own column
+    assert json.loads(raw) == {}
+    assert time == datetime.datetime.fromtimestamp(1546300800)
+
+
+def test_retry_is_bounded():
+    plugin = ArchivePlugin(max_pending=3)
+    plugin.save({"ts": "1546300803.0"})
+    plugin._retry({"saved": [(str(i),) for i in range(3)], "deleted": [("1",)]})
+
+    assert [row[0] for row in plugin._pending["saved"]] == ["1", "2", "1546300803.0"]
+    assert plugin._pending["deleted"] == [("1",)]
+    assert plugin.counts["dropped"] == 1
+
+
+def test_edits_and_deletions():
+    plugin = ArchivePlugin()
+    plugin.save(
+        {
+            "subtype": "message_changed",
+            "channel": "C1",
+            "ts": "1546300900.0",
+            "message": {"ts": "1546300800.0", "text": "edited", "user": "U1"},
+        }
+    )
+    plugin.save(
+        {
+            "subtype": "message_deleted",
+            "channel": "C1",
+            "ts": "1546300901.0",
+            "deleted_ts": "1546300800.0",
+        }
+    )
+    plugin.save({"subtype": "message_replied", "channel": "C1", "ts": "1546300902.0"})
+
+    assert not plugin._pending["saved"]
+    id_, text, raw = plugin._pending["edited"][0]
+    assert (id_, text) == ("1546300800.0", "edited")
+    assert json.loads(raw) == {"user": "U1", "channel": "C1"}
+    assert plugin._pending["deleted"][0][0] == "1546300800.0"
+
+
+class FakeConnection:
+    def __init__(self, errors):
+        self.errors = errors
+        self.executed = []
+
+    async def execute(self, query, ids, *columns):
+        if self.errors:
+            error = self.errors.pop(0)
+            if error:
+                raise error
+        if "bad" in ids:
+            raise asyncpg.CharacterNotInRepertoireError("invalid byte sequence")
+        self.executed.extend(ids)
+
+
+class FakePg:
+    def __init__(self, pg_con):
+        self.pg_con = pg_con
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        yield self.pg_con
+
+
+def make_plugin(errors=()):
+    plugin = ArchivePlugin()
+    pg_con = FakeConnection(list(errors))
+    plugin._plugins = {"pg": FakePg(pg_con)}
+    return plugin, pg_con
+
+
+def test_flush_isolates_failing_rows():
+    plugin, pg_con = make_plugin([asyncpg.DeadlockDetectedError("deadlock")])
+    plugin._pending["deleted"] = [
+        (ts, datetime.datetime(2019, 1, 1)) for ts in ("1", "2", "bad", "3", "4")
+    ]
+    asyncio.run(plugin.flush())
+
+    assert pg_con.executed == ["1", "2", "3", "4"]
+    assert plugin.counts["deleted"] == 4
+    assert plugin.counts["failed"] == 1
+
+
+def test_flush_keeps_rows_when_unavailable():
+    plugin, pg_con = make_plugin([None, OSError("connection refused")])
+    plugin._pending["deleted"] = [
+        (ts, datetime.datetime(2019, 1, 1)) for ts in ("1", "bad", "2", "3")
+    ]
+    asyncio.run(plugin.flush())
+
+    # the batch is split after its failure, then the database is unavailable
+    assert [row[0] for row in plugin._pending["deleted"]] == ["1", "bad", "2", "3"]
+    assert not pg_con.executed
+
+
+def test_flush_keeps_rows_on_connection_errors():
+    plugin, pg_con = make_plugin(
+        [asyncpg.ConnectionDoesNotExistError("connection was closed")]
+    )
+    plugin._pending["deleted"] = [
+        (ts, datetime.datetime(2019, 1, 1)) for ts in ("1", "2", "3")
+    ]
+    asyncio.run(plugin.flush())
+
+    assert [row[0] for row in plugin._pending["deleted"]] == ["1", "2", "3"]
+    assert not pg_con.executed
+    assert plugin.counts["failed"] == 0
+
+
+def test_flush_keeps_rows_after_retries():
+    plugin, pg_con = make_plugin([asyncpg.DeadlockDetectedError("deadlock")] * 3)
+    plugin._pending["deleted"] = [
+        (ts, datetime.datetime(2019, 1, 1)) for ts in ("1", "2")
+    ]
+    asyncio.run(plugin.flush())
+
+    assert [row[0] for row in plugin._pending["deleted"]] == ["1", "2"]
+    assert plugin.counts["failed"] == 0
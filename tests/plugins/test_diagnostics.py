@@ -0,0 +1,61 @@
+import time
+import asyncio
+
+from sirbot_pyslackers.plugins.diagnostics import DiagnosticsPlugin
+
+
+def test_slow_callbacks_recorded():
+    plugin = DiagnosticsPlugin(time_callbacks=True, slow_callback=0.05)
+
+    async def blocking_handler():
+        time.sleep(0.1)
+
+    async def run():
+        await plugin.startup(None)
+        try:
+            await asyncio.ensure_future(blocking_handler())
+            await asyncio.sleep(0)
+        finally:
+            await plugin.shutdown(None)
+
+    asyncio.run(run())
+    assert [slow["callback"] for slow in plugin.slow] == [
+        "test_slow_callbacks_recorded.<locals>.blocking_handler"
+    ]
+    assert plugin.slow[0]["duration"] >= 0.1
+    assert plugin.counts["slow_callbacks"] == 1
+
+
+def test_callbacks_not_timed_by_default(monkeypatch):
+    monkeypatch.delenv("SIRBOT_TIME_CALLBACKS", raising=False)
+    plugin = DiagnosticsPlugin()
+    original = asyncio.Handle._run
+
+    async def run():
+        await plugin.startup(None)
+        assert asyncio.Handle._run is original
+        await plugin.shutdown(None)
+
+    asyncio.run(run())
+    assert asyncio.Handle._run is original
+
+
+def test_profile():
+    plugin = DiagnosticsPlugin(interval=0.001)
+
+    async def busy():
+        end = time.monotonic() + 0.2
+        while time.monotonic() < end:
+            # blocks the event loop thread
+            time.sleep(0.01)
+            await asyncio.sleep(0)
+
+    async def run():
+        profile = asyncio.ensure_future(plugin.profile(0.1))
+        await busy()
+        return await profile
+
+    stacks = asyncio.run(run())
+    assert any(
+        stack.endswith("test_diagnostics:run;test_diagnostics:busy") for stack in stacks
+    )
@@ -0,0 +1,80 @@
+import random
+
+from sirbot_pyslackers.plugins import duplicates
+from sirbot_pyslackers.plugins.duplicates import MAX_DISTANCE, DuplicatesPlugin, simhash
+
+TEXT = (
+    "Hello everyone! I am looking for a Python developer to help me build a web "
+    "scraper for my startup, paid gig, please send me a direct message if interested."
+)
+OTHER = (
+    "Does anyone know a good tutorial about asyncio for beginners? I read the "
+    "official documentation but I still do not understand how the event loop works."
+)
+
+
+def distance(a, b):
+    return bin(simhash(a) ^ simhash(b)).count("1")
+
+
+def test_simhash_near_duplicates():
+    assert simhash(TEXT.upper()) == simhash(TEXT)
+    assert distance(TEXT, "Hi all! " + TEXT) <= MAX_DISTANCE
+    assert distance(TEXT, TEXT + " Thanks!") <= MAX_DISTANCE
+    assert distance(TEXT, TEXT.replace("web scraper", "web crawler")) <= MAX_DISTANCE
+    assert distance(TEXT, OTHER) > 2 * MAX_DISTANCE
+
+
+def test_cross_post_detected():
+    plugin = DuplicatesPlugin()
+    assert (
+        plugin.check({"text": TEXT, "channel": "C1", "user": "U1", "ts": "1"}, now=0)
+        == []
+    )
+    assert (
+        plugin.check({"text": OTHER, "channel": "C2", "user": "U2", "ts": "2"}, now=1)
+        == []
+    )
+
+    edited = TEXT.replace("paid gig", "paid job") + " Thanks!"
+    duplicates = plugin.check(
+        {"text": edited, "channel": "C2", "user": "U1", "ts": "3"}, now=2
+    )
+    assert [post.channel for post in duplicates] == ["C1"]
+
+
+def test_cross_post_reported_once():
+    plugin = DuplicatesPlugin()
+    for i, channel in enumerate(("C1", "C2", "C3", "C4")):
+        duplicates = plugin.check(
+            {"text": TEXT, "channel": channel, "user": "U1", "ts": str(i)}, now=i
+        )
+        assert bool(duplicates) == (channel == "C2")
+    assert plugin.detected == 1
+
+
+def test_cross_post_expired():
+    plugin = DuplicatesPlugin(ttl=10)
+    plugin.check({"text": TEXT, "channel": "C1", "user": "U1", "ts": "1"}, now=0)
+    assert (
+        plugin.check({"text": TEXT, "channel": "C2", "user": "U1", "ts": "2"}, now=20)
+        == []
+    )
+    assert len(plugin.index) == 1
+
+
+def test_index_lookup_is_sublinear():
+    rng = random.Random(0)
+    index = duplicates.SimHashIndex()
+    for i in range(index.max_size):
+        index.add(rng.getrandbits(64), "U1", "C1", str(i), now=0)
+
+    fingerprint = rng.getrandbits(64)
+    # spread over all the blocks
+    near = fingerprint
+    for bit in rng.sample(range(64), MAX_DISTANCE):
+        near ^= 1 << bit
+    post = index.add(near, "U1", "C2", "near", now=0)
+
+    assert post in index.near(fingerprint, now=0)
+    assert len(index._candidates(fingerprint)) < index.max_size // 50
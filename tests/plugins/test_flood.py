@@ -0,0 +1,39 @@
+from sirbot_pyslackers.plugins.flood import FloodPlugin, RateLimiter
+
+
+def test_rate_limiter_window():
+    limiter = RateLimiter(max_events=3, window=10, cooldown=60)
+    assert not any(limiter.hit("U1", now) for now in (0, 1, 2))
+    assert limiter.hit("U1", 3)
+    # cooldown
+    assert not limiter.hit("U1", 4)
+    # events outside of the window
+    assert not limiter.hit("U2", 0)
+    assert not limiter.hit("U2", 20)
+
+
+def test_rate_limiter_bounded_keys():
+    limiter = RateLimiter(max_events=3, window=10, max_keys=2)
+    for user in ("U1", "U2", "U3"):
+        limiter.hit(user, 0)
+    assert len(limiter) == 2
+
+
+def test_flood_plugin_record():
+    plugin = FloodPlugin(user_limit=(2, 10), channel_limit=(100, 10))
+    message = {"user": "U1", "channel": "C1"}
+    assert plugin.record(message, now=0) == []
+    assert plugin.record(message, now=1) == []
+    assert plugin.record(message, now=2) == [("user", "U1")]
+
+
+def test_flood_plugin_ignores_subtypes():
+    plugin = FloodPlugin(user_limit=(100, 10), channel_limit=(2, 10))
+    for now in range(10):
+        deleted = {"subtype": "message_deleted", "channel": "C1", "deleted_ts": "1"}
+        assert plugin.record(deleted, now=now) == []
+
+    shared = {"subtype": "file_share", "user": "U1", "channel": "C1"}
+    assert plugin.record(shared, now=10) == []
+    assert plugin.record(shared, now=11) == []
+    assert plugin.record(shared, now=12) == [("channel", "C1")]
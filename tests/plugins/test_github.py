@@ -0,0 +1,95 @@
+import asyncio
+
+import aiohttp
+from aiohttp import web
+from sirbot_pyslackers.plugins.github import GithubPlugin
+
+REPO = {
+    "full_name": "pyslackers/sirbot-pyslackers",
+    "html_url": "https://github.com/pyslackers/sirbot-pyslackers",
+    "description": "Sir Bot-a-lot",
+    "stargazers_count": 42,
+    "forks_count": 12,
+    "open_issues_count": 3,
+    "language": "Python",
+}
+RATE_LIMIT = {
+    "X-RateLimit-Limit": "5000",
+    "X-RateLimit-Remaining": "4999",
+    "X-RateLimit-Reset": "2000000000",
+}
+
+
+def stub_github():
+    """Local stub of the github repository endpoint honoring ``If-None-Match``"""
+    app = web.Application()
+    app["hits"] = []
+
+    async def repository(request):
+        if request.match_info["name"] != "sirbot-pyslackers":
+            app["hits"].append(404)
+            return web.json_response({"message": "Not Found"}, status=404)
+
+        if request.headers.get("If-None-Match") == '"v1"':
+            app["hits"].append(304)
+            return web.Response(status=304, headers={"ETag": '"v1"', **RATE_LIMIT})
+
+        app["hits"].append(200)
+        return web.json_response(REPO, headers={"ETag": '"v1"', **RATE_LIMIT})
+
+    app.router.add_get("/repos/{owner}/{name}", repository)
+    return app
+
+
+async def with_plugin(test, **kwargs):
+    stub = stub_github()
+    runner = web.AppRunner(stub)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    async with aiohttp.ClientSession() as session:
+        plugin = GithubPlugin(base_url=f"http://127.0.0.1:{port}", **kwargs)
+        plugin.load({"http_session": session, "user_agent": "sirbot-tests"})
+        try:
+            await test(plugin, stub["hits"])
+        finally:
+            await runner.cleanup()
+
+
+def test_repo_fresh_cache():
+    async def test(plugin, hits):
+        assert await plugin.repo("pyslackers", "sirbot-pyslackers") == REPO
+        assert await plugin.repo("pyslackers", "sirbot-pyslackers") == REPO
+        assert hits == [200]
+
+    asyncio.run(with_plugin(test))
+
+
+def test_repo_conditional_request():
+    async def test(plugin, hits):
+        assert await plugin.repo("pyslackers", "sirbot-pyslackers") == REPO
+        assert await plugin.repo("pyslackers", "sirbot-pyslackers") == REPO
+        assert hits == [200, 304]
+
+    asyncio.run(with_plugin(test, fresh_for=0))
+
+
+def test_repo_rate_limit_reserve():
+    async def test(plugin, hits):
+        assert await plugin.repo("pyslackers", "sirbot-pyslackers") == REPO
+        assert await plugin.repo("pyslackers", "sirbot-pyslackers") == REPO
+        assert hits == [200]
+        assert plugin.lookups["reserve"] == 1
+
+    asyncio.run(with_plugin(test, fresh_for=0, min_remaining=5000))
+
+
+def test_repo_not_found():
+    async def test(plugin, hits):
+        assert await plugin.repo("pyslackers", "unknown") is None
+        assert await plugin.repo("pyslackers", "unknown") is None
+        assert hits == [404]
+
+    asyncio.run(with_plugin(test))
@@ -0,0 +1,58 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from sirbot_pyslackers.plugins.health import HealthPlugin
+from sirbot_pyslackers.plugins.resilience import Provider
+
+
+class FakePlugin:
+    def __init__(self):
+        self.ready = False
+        self.provider = Provider("fake", failure_threshold=1)
+
+
+async def ok(plugins):
+    pass
+
+
+async def slow(plugins):
+    await asyncio.sleep(1)
+
+
+def test_health_and_readiness():
+    plugin = HealthPlugin(timeout=0.05)
+    plugin.probes = {
+        "postgres": ok,
+        "slack": slow,
+        "yahoo": plugin.probes["yahoo"],
+    }
+
+    async def slack_events(request):
+        return web.json_response({})
+
+    async def run():
+        app = web.Application()
+        app["plugins"] = {"health": plugin, "stocks": FakePlugin()}
+        app.router.add_post("/slack/events", slack_events)
+        plugin.load(app)
+
+        async with TestClient(TestServer(app)) as client:
+            not_ready = await client.get("/ready")
+            rejected = await client.post("/slack/events")
+
+            app["plugins"]["stocks"].ready = True
+            app["plugins"]["stocks"].provider.breaker.record_failure()
+            await plugin.probe()
+            ready = await client.get("/ready")
+            accepted = await client.post("/slack/events")
+            health = await (await client.get("/health")).json()
+
+        return not_ready.status, rejected.status, ready.status, accepted.status, health
+
+    not_ready, rejected, ready, accepted, health = asyncio.run(run())
+    assert (not_ready, rejected, ready, accepted) == (503, 503, 200, 200)
+    assert health["status"] == "degraded"
+    assert health["probes"]["postgres"]["ok"]
+    assert health["probes"]["slack"]["error"] == "TimeoutError()"
+    assert health["probes"]["yahoo"]["error"] == "RuntimeError('Circuit open')"
@@ -0,0 +1,95 @@
+import asyncio
+import datetime
+import contextlib
+
+import pytest
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sirbot_pyslackers.plugins.jobs import JobsPlugin, recorded
+
+
+class FakePg:
+    def __init__(self):
+        self.runs = []
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        yield self
+
+    async def execute(self, query, *args):
+        self.runs.append(args)
+
+
+class FakeTasks:
+    def spawn(self, pool, coro):
+        return asyncio.ensure_future(coro)
+
+
+def make_bot():
+    scheduler = AsyncIOScheduler(timezone="UTC")
+    plugin = JobsPlugin(scheduler)
+    bot = {"plugins": {"jobs": plugin, "pg": FakePg(), "tasks": FakeTasks()}}
+    plugin.load(bot)
+    return bot
+
+
+async def sync_users(bot):
+    await asyncio.sleep(0.01)
+    return {"rows": 42}
+
+
+async def broken(bot):
+    raise ValueError("broken")
+
+
+def test_runs_recorded():
+    bot = make_bot()
+
+    assert asyncio.run(recorded(sync_users, "users")(bot=bot)) == {"rows": 42}
+    with pytest.raises(ValueError):
+        asyncio.run(recorded(broken)(bot=bot))
+
+    runs = bot["plugins"]["pg"].runs
+    assert [(job, rows, outcome) for job, _, _, rows, outcome, _ in runs] == [
+        ("users", 42, "success"),
+        ("broken", None, "failure"),
+    ]
+    assert runs[0][2] >= 0.01
+    assert runs[1][5] == "ValueError('broken')"
+
+
+def test_overlap_recorded():
+    bot = make_bot()
+    scheduler = bot["plugins"]["jobs"].scheduler
+
+    async def slow(bot):
+        await asyncio.sleep(0.3)
+
+    async def run():
+        scheduler.add_job(
+            recorded(slow),
+            "interval",
+            seconds=0.1,
+            name="slow",
+            next_run_time=datetime.datetime.now(datetime.timezone.utc),
+            kwargs={"bot": bot},
+        )
+        scheduler.start()
+        await asyncio.sleep(0.35)
+        scheduler.shutdown(wait=False)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    outcomes = [outcome for _, _, _, _, outcome, _ in bot["plugins"]["pg"].runs]
+    assert outcomes.count("success") == 1
+    assert "overlap" in outcomes
+
+
+def test_next_runs():
+    bot = make_bot()
+    scheduler = bot["plugins"]["jobs"].scheduler
+    scheduler.add_job(recorded(sync_users), "interval", days=1, kwargs={"bot": bot})
+    scheduler.add_job(recorded(broken), "cron", minute="*/5", kwargs={"bot": bot})
+
+    runs = bot["plugins"]["jobs"].next_runs()
+    assert [name for name, _ in runs] == ["broken", "sync_users"]
+    assert runs[0][1] < runs[1][1]
@@ -0,0 +1,85 @@
+import asyncio
+import contextlib
+
+from sirbot_pyslackers.plugins.keywords import Automaton, KeywordsPlugin
+
+
+def test_automaton_overlapping_keywords():
+    automaton = Automaton()
+    for keyword in ("he", "she", "his", "hers"):
+        automaton.add(keyword)
+
+    assert sorted(automaton.search("ushers")) == [("he", 4), ("hers", 6), ("she", 4)]
+
+
+def test_automaton_incremental_changes():
+    automaton = Automaton()
+    automaton.add("aiohttp")
+    assert list(automaton.search("i love aiohttp")) == [("aiohttp", 14)]
+
+    automaton.add("love")
+    automaton.remove("aiohttp")
+    assert list(automaton.search("i love aiohttp")) == [("love", 6)]
+    # the nodes of removed keywords are dropped
+    assert len(automaton._goto) == len("love") + 1
+
+
+def test_scan_matches_whole_words_of_other_users():
+    plugin = KeywordsPlugin()
+    plugin._subscribe("U1", "sirbot")
+    plugin._subscribe("U2", "sirbot")
+    plugin._subscribe("U2", "cat")
+
+    plugin.scan(
+        {"user": "U1", "channel": "C1", "text": "Sirbot concatenate", "ts": "1.0"}
+    )
+
+    assert list(plugin.pending) == ["U2"]
+    assert [keyword for keyword, _ in plugin.pending["U2"]] == ["sirbot"]
+
+
+def test_scan_skips_private_conversations():
+    plugin = KeywordsPlugin()
+    plugin._subscribe("U2", "sirbot")
+
+    for channel, channel_type in (
+        ("D1", "im"),
+        ("G1", "mpim"),
+        ("G2", None),
+        ("C2", "group"),
+    ):
+        message = {"user": "U1", "channel": channel, "text": "sirbot", "ts": "1.0"}
+        if channel_type:
+            message["channel_type"] = channel_type
+        plugin.scan(message)
+
+    assert not plugin.pending
+
+
+class FakePg:
+    def __init__(self, rows):
+        self.rows = rows
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        yield self
+
+    async def fetch(self, query):
+        return self.rows
+
+
+def test_reload_applies_other_workers_changes():
+    plugin = KeywordsPlugin()
+    plugin._subscribe("U1", "sirbot")
+    plugin._subscribe("U1", "asyncio")
+    plugin._plugins = {
+        "pg": FakePg(
+            [{"user": "U1", "keyword": "sirbot"}, {"user": "U2", "keyword": "flask"}]
+        )
+    }
+
+    asyncio.run(plugin.reload())
+
+    assert plugin.subscriptions("U1") == ["sirbot"]
+    assert plugin.subscriptions("U2") == ["flask"]
+    assert [k for k, _ in plugin.automaton.search("asyncio flask")] == ["flask"]
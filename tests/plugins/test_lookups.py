@@ -0,0 +1,65 @@
+import asyncio
+
+from slack import methods
+from slack.exceptions import SlackAPIError
+from sirbot_pyslackers.plugins.lookups import LookupsPlugin
+
+
+class FakeAPI:
+    def __init__(self):
+        self.queries = []
+
+    async def query(self, url, data):
+        self.queries.append(data)
+        await asyncio.sleep(0)
+        if data.get("user") == "U404":
+            raise SlackAPIError("user_not_found", {}, {})
+        return {"ok": True, "user": {"id": data["user"]}}
+
+
+class FakeSlack:
+    def __init__(self):
+        self.api = FakeAPI()
+
+
+def make_plugin(**kwargs):
+    plugin = LookupsPlugin(**kwargs)
+    plugin._plugins = {"slack": FakeSlack()}
+    return plugin
+
+
+def test_lookups_cached_and_coalesced():
+    plugin = make_plugin()
+
+    async def lookup():
+        first = await asyncio.gather(
+            *(plugin.info(methods.USERS_INFO, "U1") for _ in range(3))
+        )
+        second = await plugin.info(methods.USERS_INFO, "U1")
+        return first, second
+
+    first, second = asyncio.run(lookup())
+    assert first == [{"ok": True, "user": {"id": "U1"}}] * 3
+    assert second == first[0]
+    assert plugin._plugins["slack"].api.queries == [{"user": "U1"}]
+    assert plugin.lookups[(methods.USERS_INFO, "coalesced")] == 2
+    assert plugin.lookups[(methods.USERS_INFO, "hit")] == 1
+
+
+def test_lookups_negative_cache_and_invalidation():
+    plugin = make_plugin()
+
+    async def lookup():
+        missing = await plugin.info(methods.USERS_INFO, "U404")
+        await plugin.info(methods.USERS_INFO, "U404")
+        await plugin.info(methods.USERS_INFO, "U1")
+        plugin.invalidate_event({"type": "user_change", "user": {"id": "U1"}})
+        await plugin.info(methods.USERS_INFO, "U1")
+        return missing
+
+    assert asyncio.run(lookup()) is None
+    assert plugin._plugins["slack"].api.queries == [
+        {"user": "U404"},
+        {"user": "U1"},
+        {"user": "U1"},
+    ]
@@ -0,0 +1,59 @@
+import asyncio
+
+from sirbot_pyslackers.plugins.notifications import NotificationsPlugin
+
+
+class FakeAPI:
+    def __init__(self):
+        self.queries = []
+
+    async def query(self, url, data):
+        self.queries.append(data)
+
+
+class FakeSlack:
+    def __init__(self):
+        self.api = FakeAPI()
+
+
+def make_plugin(**kwargs):
+    plugin = NotificationsPlugin(**kwargs)
+    plugin._plugins = {"slack": FakeSlack()}
+    return plugin
+
+
+def test_notifications_grouped_by_kind():
+    plugin = make_plugin(window=10, max_attachments=2)
+    for i in range(3):
+        plugin.notify(
+            "admin", "pin_added", {"callback_id": "pin_added", "id": i}, now=0
+        )
+    plugin.notify("admin", "report", {"id": "report"}, now=5)
+
+    asyncio.run(plugin.flush(now=10))
+    queries = plugin._plugins["slack"].api.queries
+    assert [len(query["attachments"]) for query in queries] == [2, 1]
+    assert queries[0]["text"] == "3 pin added notifications"
+    assert queries[1]["attachments"][0]["id"] == 2
+
+    asyncio.run(plugin.flush())
+    assert queries[2]["attachments"] == [{"id": "report"}]
+    assert "text" not in queries[2]
+    assert plugin.counts["posted"] == 4
+
+
+def test_notifications_deduplicated():
+    plugin = make_plugin(window=10, dedupe_ttl=100)
+    assert plugin.notify("projects", "build_failure", {"text": "a"}, key="a", now=0)
+    assert not plugin.notify("projects", "build_failure", {"text": "a"}, key="a", now=1)
+    assert plugin.notify("projects", "build_failure", {"text": "b"}, key="b", now=2)
+
+    asyncio.run(plugin.flush(now=10))
+    attachments = plugin._plugins["slack"].api.queries[0]["attachments"]
+    assert attachments == [{"text": "a", "footer": "2 occurrences"}, {"text": "b"}]
+
+    assert not plugin.notify(
+        "projects", "build_failure", {"text": "a"}, key="a", now=50
+    )
+    assert plugin.notify("projects", "build_failure", {"text": "a"}, key="a", now=100)
+    assert plugin.counts["deduplicated"] == 2
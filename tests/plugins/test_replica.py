@@ -0,0 +1,93 @@
+import asyncio
+import contextlib
+
+from sirbot_pyslackers.plugins.replica import ReadReplicaPlugin
+
+
+class FakePg:
+    def __init__(self, name):
+        self.name = name
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        yield self.name
+
+
+class FakePool:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.released = []
+
+    async def acquire(self, timeout=None):
+        if self.fail:
+            raise OSError("connection refused")
+        return "replica"
+
+    async def release(self, pg_con):
+        self.released.append(pg_con)
+
+
+class FakeReplica:
+    def __init__(self, pool):
+        self.pool = pool
+
+
+def make_plugin(replica=None, **kwargs):
+    plugin = ReadReplicaPlugin(**kwargs)
+    plugin.replica = replica
+    plugin._plugins = {"pg": FakePg("primary")}
+    return plugin
+
+
+async def read(plugin):
+    async with plugin.connection() as pg_con:
+        return pg_con
+
+
+def test_reads_from_primary_without_replica():
+    assert asyncio.run(read(make_plugin())) == "primary"
+
+
+def test_reads_from_replica():
+    pool = FakePool()
+    plugin = make_plugin(FakeReplica(pool))
+    assert asyncio.run(read(plugin)) == "replica"
+    assert pool.released == ["replica"]
+    assert plugin.counts == {"replica": 1, "fallback": 0}
+
+
+def test_falls_back_to_primary():
+    plugin = make_plugin(FakeReplica(FakePool(fail=True)), failure_threshold=2)
+
+    async def run():
+        return [await read(plugin) for _ in range(3)]
+
+    assert asyncio.run(run()) == ["primary"] * 3
+    assert plugin.counts == {"replica": 0, "fallback": 3}
+    # the replica is skipped after two failures
+    assert plugin.breaker.state == plugin.breaker.OPEN
+
+
+def test_falls_back_while_connecting():
+    class SlowReplica(FakeReplica):
+        def __init__(self):
+            super().__init__(None)
+            self.attempts = 0
+
+        async def startup(self, sirbot):
+            self.attempts += 1
+            await asyncio.sleep(10)
+
+    replica = SlowReplica()
+    plugin = make_plugin(replica, timeout=0.01, recovery_timeout=0)
+
+    async def run():
+        plugin._connector = asyncio.ensure_future(plugin._connect())
+        await asyncio.sleep(0.05)
+        result = await asyncio.wait_for(read(plugin), 0.01)
+        plugin._connector.cancel()
+        return result
+
+    assert asyncio.run(run()) == "primary"
+    assert replica.attempts > 1
+    assert plugin.counts == {"replica": 0, "fallback": 1}
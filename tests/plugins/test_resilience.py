@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from sirbot_pyslackers.plugins.resilience import Provider, CircuitOpen, CircuitBreaker
+
+
+def test_provider_serves_stale_response_on_failure():
+    provider = Provider("test", failure_threshold=2)
+
+    async def ok():
+        return "fresh"
+
+    async def fail():
+        raise asyncio.TimeoutError()
+
+    async def run():
+        assert await provider.call("key", ok) == ("fresh", False)
+        assert await provider.call("key", fail) == ("fresh", True)
+        assert await provider.call("key", fail) == ("fresh", True)
+        assert provider.breaker.state == CircuitBreaker.OPEN
+
+        # The circuit is open, the provider is not called anymore
+        assert await provider.call("key", ok) == ("fresh", True)
+        assert provider.calls["rejected"] == 1
+
+        with pytest.raises(CircuitOpen):
+            await provider.call("other", ok)
+
+    asyncio.run(run())
+
+
+def test_provider_half_open_recovers():
+    provider = Provider("test", failure_threshold=1, recovery_timeout=0)
+
+    async def ok():
+        return "fresh"
+
+    async def fail():
+        raise asyncio.TimeoutError()
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await provider.call("key", fail)
+
+        assert provider.breaker.state == CircuitBreaker.HALF_OPEN
+        assert await provider.call("key", ok) == ("fresh", False)
+        assert provider.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(run())
+
+
+def test_provider_cancelled_trial_is_released():
+    provider = Provider("test", failure_threshold=1, recovery_timeout=0)
+    provider.breaker.record_failure()
+
+    async def ok():
+        return "fresh"
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def run():
+        trial = asyncio.ensure_future(provider.call("key", hang))
+        await asyncio.sleep(0)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        assert await provider.call("key", ok) == ("fresh", False)
+        assert provider.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(run())
@@ -0,0 +1,93 @@
+import time
+import pickle
+import asyncio
+
+from slack import methods
+from sirbot_pyslackers.plugins import snapshot
+from sirbot_pyslackers.plugins.lookups import LookupsPlugin
+from sirbot_pyslackers.plugins.resilience import Provider
+
+
+class FakePlugin:
+    def __init__(self, state=None):
+        self.state = state
+        self.provider = Provider("fake", max_stale_age=60)
+
+    def snapshot(self):
+        return self.provider.snapshot()
+
+    def restore(self, state, age):
+        if self.state == "broken":
+            raise ValueError(state)
+        self.provider.restore(state, age)
+
+
+def make_plugin(path, plugins, **kwargs):
+    plugin = snapshot.SnapshotPlugin(str(path), **kwargs)
+    plugin._plugins = plugins
+    return plugin
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "snapshots" / "caches.snapshot"
+    lookups = LookupsPlugin()
+    lookups._cache[(methods.USERS_INFO, "U1")] = (time.monotonic() + 60, {"id": 1})
+    lookups._cache[(methods.USERS_INFO, "U2")] = (time.monotonic() - 1, {"id": 2})
+    fake = FakePlugin()
+    fake.provider._cache["old"] = (time.monotonic() - 50, "old")
+    fake.provider._cache["new"] = (time.monotonic(), "new")
+
+    plugin = make_plugin(path, {"lookups": lookups, "fake": fake})
+    asyncio.run(plugin.write())
+    assert plugin.size == path.stat().st_size
+
+    restored_lookups, restored_fake = LookupsPlugin(), FakePlugin()
+    plugins = {"lookups": restored_lookups, "fake": restored_fake}
+    restored = make_plugin(path, plugins)
+    restored.restore_plugins()
+
+    assert restored.restored == {"lookups": True, "fake": True}
+    assert list(restored_lookups._cache) == [(methods.USERS_INFO, "U1")]
+    assert list(restored_fake.provider._cache) == ["old", "new"]
+
+
+def test_restore_ages_entries():
+    lookups = LookupsPlugin()
+    lookups._cache["key"] = (time.monotonic() + 60, {"id": 1})
+    provider = Provider("fake", max_stale_age=60)
+    provider._cache["old"] = (time.monotonic() - 50, "old")
+    provider._cache["new"] = (time.monotonic(), "new")
+
+    restored_lookups = LookupsPlugin()
+    restored_lookups.restore(lookups.snapshot(), 70)
+    assert not restored_lookups._cache
+
+    restored_provider = Provider("fake", max_stale_age=60)
+    restored_provider.restore(provider.snapshot(), 20)
+    assert list(restored_provider._cache) == ["new"]
+    fetched, _ = restored_provider._cache["new"]
+    assert 19 < time.monotonic() - fetched < 21
+
+
+def test_broken_plugin_state(tmp_path):
+    path = tmp_path / "caches.snapshot"
+    fake = FakePlugin()
+    fake.provider._cache["key"] = (time.monotonic(), "value")
+    asyncio.run(make_plugin(path, {"fake": fake, "other": FakePlugin()}).write())
+
+    plugins = {"fake": FakePlugin("broken"), "other": FakePlugin()}
+    restored = make_plugin(path, plugins)
+    restored.restore_plugins()
+    assert restored.restored == {"fake": False, "other": True}
+
+
+def test_stale_snapshot(tmp_path):
+    path = str(tmp_path / "caches.snapshot")
+    snapshot.write_snapshot(path, pickle.dumps({}))
+    assert snapshot.read_snapshot(path, max_age=60)[0] is not None
+    assert snapshot.read_snapshot(path, max_age=-1)[0] is None
+    assert snapshot.read_snapshot(path + ".missing", max_age=60) == (None, 0)
+
+    with open(path, "r+b") as f:
+        f.write(snapshot.HEADER.pack(snapshot.MAGIC, 0, time.time()))
+    assert snapshot.read_snapshot(path, max_age=60)[0] is None
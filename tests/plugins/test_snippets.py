@@ -0,0 +1,48 @@
+import pytest
+from sirbot_pyslackers.plugins.snippets import SnippetsPlugin, looks_like_code
+
+CODE = """import asyncio
+
+async def fetch(session, url):
+    async with session.get(url) as response:
+        return await response.text()
+
+async def main():
+    urls = ["https://example.com"] * 10
+    results = await asyncio.gather(*[fetch(s, u) for u in urls])
+    for result in results:
+        print(len(result))
+"""
+
+PROSE = """I've been trying to get my flask app deployed for two days now and it crashes.
+The logs say something about the port binding but I set the PORT env variable.
+Does anyone have a working example or a tutorial I can follow?
+I looked at the documentation but it is not very clear to me.
+Thanks a lot, this community is great."""
+
+
+@pytest.mark.parametrize(
+    ["text", "result"],
+    [
+        (CODE, True),
+        (PROSE, False),
+        (f"```{CODE}```", False),
+        ("print('hello')", False),
+        ("", False),
+    ],
+)
+def test_looks_like_code(text, result):
+    assert looks_like_code(text) is result
+
+
+def test_remind_cooldown():
+    plugin = SnippetsPlugin(cooldown=60)
+    message = {"user": "U1", "text": CODE}
+    assert plugin.should_remind(message, now=0)
+    assert not plugin.should_remind(message, now=30)
+    assert plugin.should_remind(message, now=90)
+
+
+def test_no_reminder_without_user():
+    plugin = SnippetsPlugin()
+    assert not plugin.should_remind({"bot_id": "B1", "text": CODE}, now=0)
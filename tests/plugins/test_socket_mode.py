@@ -0,0 +1,109 @@
+import json
+import asyncio
+
+import aiohttp
+from aiohttp import web
+from sirbot.plugins.slack import SlackPlugin
+from sirbot_pyslackers.plugins.tasks import TasksPlugin
+from sirbot_pyslackers.plugins.socket_mode import SocketModePlugin
+
+
+def envelope(envelope_id, kind, payload):
+    return {"envelope_id": envelope_id, "type": kind, "payload": payload}
+
+
+MESSAGE = envelope(
+    "e1",
+    "events_api",
+    {
+        "type": "event_callback",
+        "event": {"type": "message", "text": "hi", "channel": "C1"},
+    },
+)
+COMMAND = envelope("e2", "slash_commands", {"command": "/test", "text": "hi"})
+
+
+def stub_slack():
+    """Local stub of the slack socket mode API, disconnecting after the first session"""
+    app = web.Application()
+    app["acks"] = []
+    app["sessions"] = 0
+
+    async def connections_open(request):
+        assert request.headers["Authorization"] == "Bearer xapp-test"
+        url = f"ws://{request.host}/link"
+        return web.json_response({"ok": True, "url": url})
+
+    async def link(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        app["sessions"] += 1
+        await ws.send_json({"type": "hello"})
+        if app["sessions"] == 1:
+            await ws.send_json(MESSAGE)
+            await ws.send_json(COMMAND)
+            for _ in range(2):
+                app["acks"].append(json.loads((await ws.receive()).data))
+            await ws.send_json({"type": "disconnect", "reason": "refresh_requested"})
+        await ws.receive()
+        return ws
+
+    app.router.add_post("/apps.connections.open", connections_open)
+    app.router.add_get("/link", link)
+    return app
+
+
+class FakeBot(dict):
+    def __init__(self, session, *plugins):
+        super().__init__(plugins={plugin.__name__: plugin for plugin in plugins})
+        self.http_session = session
+        self.on_startup = []
+        self.on_shutdown = []
+
+
+def test_socket_mode():
+    messages = []
+
+    async def on_message(message, app):
+        messages.append(message["text"])
+
+    async def on_command(command, app):
+        return web.json_response({"text": f'you said {command["text"]}'})
+
+    async def main():
+        stub = stub_slack()
+        runner = web.AppRunner(stub)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        slack = SlackPlugin(token="xoxb-test", verify="verify")
+        slack.on_message(".*", on_message)
+        slack.on_command("/test", on_command)
+        plugin = SocketModePlugin(
+            app_token="xapp-test",
+            api_url=f"http://127.0.0.1:{port}/",
+            max_backoff=0.01,
+        )
+
+        async with aiohttp.ClientSession() as session:
+            bot = FakeBot(session, slack, TasksPlugin(), plugin)
+            plugin.load(bot)
+            await plugin.startup(bot)
+            for _ in range(100):
+                if plugin.counts["connections"] == 2:
+                    break
+                await asyncio.sleep(0.01)
+            await plugin.shutdown(bot)
+
+        await runner.cleanup()
+        return stub
+
+    stub = asyncio.run(main())
+    assert messages == ["hi"]
+    assert stub["sessions"] == 2
+    assert sorted(stub["acks"], key=lambda ack: ack["envelope_id"]) == [
+        {"envelope_id": "e1"},
+        {"envelope_id": "e2", "payload": {"text": "you said hi"}},
+    ]
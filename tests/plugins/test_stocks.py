@@ -0,0 +1,48 @@
+import asyncio
+import datetime
+import contextlib
+from decimal import Decimal
+
+from sirbot_pyslackers.plugins.stocks import StockQuote, StocksPlugin, sparkline
+
+
+def test_sparkline():
+    assert sparkline([Decimal(1), Decimal(5), Decimal(8)]) == "▁▅█"
+
+
+def test_sparkline_flat():
+    assert sparkline([Decimal(3)] * 4) == "▁▁▁▁"
+
+
+def test_sparkline_downsample():
+    values = [Decimal(i) for i in range(100)]
+    line = sparkline(values, width=10)
+    assert len(line) == 10
+    assert line[0] == "▁"
+    assert line[-1] == "█"
+
+
+class BrokenPg:
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        raise ConnectionRefusedError()
+        yield
+
+
+def test_price_without_database():
+    plugin = StocksPlugin()
+    plugin.plugins = {"pg": BrokenPg()}
+    quote = StockQuote("AAPL", "Apple", *[Decimal(1)] * 8, datetime.datetime.now())
+
+    async def fetch(symbols):
+        return [quote]
+
+    plugin._fetch = fetch
+    assert asyncio.run(plugin.price("AAPL")) == quote
+
+
+def test_history_without_database():
+    plugin = StocksPlugin()
+    plugin.plugins = {"pg": BrokenPg()}
+    since = datetime.datetime.now() - datetime.timedelta(days=30)
+    assert asyncio.run(plugin.history("AAPL", since=since)) == []
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from sirbot_pyslackers.plugins.tasks import PoolFull, TasksPlugin, supervised
+
+
+def test_pool_concurrency_and_backpressure():
+    plugin = TasksPlugin(pools={"test": (2, 3)})
+    running = []
+    peak = []
+
+    async def work():
+        running.append(None)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    async def main():
+        for _ in range(10):
+            await plugin.submit("test", work())
+            assert len(plugin.pool("test").tasks) <= 3
+        await plugin.drain(None)
+
+    asyncio.run(main())
+    assert max(peak) == 2
+    assert plugin.pool("test").counts["completed"] == 10
+
+
+def test_spawn_pool_full():
+    plugin = TasksPlugin(pools={"test": (1, 1)})
+
+    async def main():
+        plugin.spawn("test", asyncio.sleep(0.01))
+        with pytest.raises(PoolFull):
+            plugin.spawn("test", asyncio.sleep(0.01))
+        await plugin.drain(None)
+
+    asyncio.run(main())
+    assert plugin.pool("test").counts["rejected"] == 1
+
+
+def test_exceptions_captured():
+    plugin = TasksPlugin()
+
+    async def fail():
+        raise ValueError()
+
+    async def main():
+        plugin.spawn("test", fail())
+        await plugin.drain(None)
+
+    asyncio.run(main())
+    assert plugin.pool("test").counts["failed"] == 1
+    assert not plugin.pool("test").tasks
+
+
+def test_drain_deadline():
+    plugin = TasksPlugin(drain_timeout=0.01)
+
+    async def main():
+        plugin.spawn("test", asyncio.sleep(10))
+        plugin.spawn("test", asyncio.sleep(0))
+        await plugin.drain(None)
+
+    asyncio.run(main())
+    assert plugin.pool("test").counts["cancelled"] == 1
+    assert plugin.pool("test").counts["completed"] == 1
+
+
+def test_supervised_drops_events_when_full():
+    plugin = TasksPlugin(pools={"test": (1, 1)})
+    app = {"plugins": {"tasks": plugin}}
+    handled = []
+
+    async def handler(event, app):
+        await asyncio.sleep(0.01)
+        handled.append(event)
+
+    async def main():
+        wrapper = supervised("test", handler)
+        # returns at once, without waiting for room in the pool
+        await asyncio.wait_for(wrapper(1, app), 0.001)
+        await asyncio.wait_for(wrapper(2, app), 0.001)
+        await plugin.drain(None)
+
+    asyncio.run(main())
+    assert handled == [1]
+    assert plugin.pool("test").counts["rejected"] == 1
@@ -0,0 +1,42 @@
+from sirbot_pyslackers.compaction import expand, compact, _compact_query
+
+MESSAGE = {
+    "type": "message",
+    "ts": "1546300800.000100",
+    "user": "U1",
+    "text": "hi",
+    "channel": "C1",
+    "blocks": [],
+}
+ROW = {"id": "1546300800.000100", "user": "U1", "text": "hi", "channel": "C1"}
+
+
+def test_compact_and_expand():
+    compacted = compact("slack.messages", MESSAGE, ROW)
+    assert compacted == {"blocks": []}
+    assert expand("slack.messages", compacted, ROW) == MESSAGE
+
+
+def test_compact_keeps_inconsistent_fields():
+    row = {"id": "C1"}
+    channel = {"id": "C1", "name": "general", "is_channel": True, "is_private": True}
+    compacted = compact("slack.channels", channel, row)
+    assert compacted == {"name": "general", "is_private": True}
+    assert expand("slack.channels", compacted, row) == {
+        **channel,
+        "is_group": False,
+        "is_im": False,
+        "is_mpim": False,
+    }
+
+    # only the columns stored alongside raw are used
+    assert compact("slack.messages", MESSAGE, {"id": ROW["id"]})["text"] == "hi"
+    assert expand("slack.users", None, {}) is None
+
+
+def test_compact_query():
+    query = _compact_query("slack.users")
+    assert """WHEN t.raw -> 'is_admin' = to_jsonb(t."admin") THEN 'is_admin'""" in query
+    assert """WHEN t.raw -> 'is_im' = 'false'::jsonb""" in _compact_query(
+        "slack.channels"
+    )
@@ -0,0 +1,67 @@
+import gzip
+import json
+import datetime
+
+import pytest
+from sirbot_pyslackers import exporter
+
+ROWS = [
+    {
+        "id": "1546300800.000100",
+        "text": "hi",
+        "user": "U1",
+        "channel": "C1",
+        "raw": {"text": "hi"},
+        "time": datetime.datetime(2019, 1, 1),
+    }
+]
+
+
+def test_parse_args():
+    args = exporter.parse_args(
+        ["messages", "out.jsonl.gz", "--since", "2019-01-01", "--channel", "C1"]
+    )
+    assert args.since == datetime.datetime(2019, 1, 1)
+    assert args.channels == ["C1"]
+    assert args.until is None
+
+
+def test_query_filters():
+    query, args = exporter._query(
+        exporter.EXPORTS["messages"], datetime.datetime(2019, 1, 1), None, ["C1", "C2"]
+    )
+    assert query.endswith(
+        'WHERE deleted_at IS NULL AND "time" >= $1 AND channel = ANY($2)'
+    )
+    assert args == [datetime.datetime(2019, 1, 1), ["C1", "C2"]]
+
+    query, args = exporter._query(exporter.EXPORTS["reports"], None, None, None)
+    assert query.endswith("WHERE TRUE") and not args
+
+
+def test_jsonl_writer(tmp_path):
+    path = str(tmp_path / "messages.jsonl.gz")
+    with exporter.JSONLinesWriter(
+        path, exporter.EXPORTS["messages"]["columns"]
+    ) as writer:
+        writer.write(ROWS)
+        writer.write(ROWS)
+
+    with gzip.open(path, "rt") as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 2
+    assert lines[0]["raw"] == {"text": "hi"}
+    assert lines[0]["time"] == "2019-01-01 00:00:00"
+
+
+def test_parquet_writer(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "messages.parquet")
+    with exporter.ParquetWriter(
+        path, exporter.EXPORTS["messages"]["columns"]
+    ) as writer:
+        writer.write(ROWS)
+
+    table = parquet.read_table(path)
+    assert table.num_rows == 1
+    assert json.loads(table.column("raw")[0].as_py()) == {"text": "hi"}
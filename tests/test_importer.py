@@ -0,0 +1,52 @@
+import io
+import json
+import zipfile
+
+from sirbot_pyslackers.importer import export_files, read_messages
+
+
+def make_export():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("channels.json", json.dumps([{"id": "C1", "name": "general"}]))
+        archive.writestr("dms.json", json.dumps([{"id": "D1"}]))
+        archive.writestr("users.json", json.dumps([{"id": "U1"}]))
+        archive.writestr(
+            "general/2019-01-01.json",
+            json.dumps(
+                [
+                    {
+                        "type": "message",
+                        "ts": "1546300800.000100",
+                        "user": "U1",
+                        "text": "hi",
+                    },
+                    {
+                        "type": "message",
+                        "subtype": "channel_join",
+                        "ts": "1546300801.0",
+                    },
+                    {"type": "file", "ts": "1546300802.0"},
+                ]
+            ),
+        )
+        archive.writestr("D1/2019-01-02.json", json.dumps([]))
+        archive.writestr("archived/2019-01-02.json", json.dumps([]))
+    return zipfile.ZipFile(buffer)
+
+
+def test_export_files():
+    assert list(export_files(make_export())) == [
+        ("general/2019-01-01.json", "C1"),
+        ("D1/2019-01-02.json", "D1"),
+    ]
+
+
+def test_read_messages():
+    rows = list(read_messages(make_export(), "general/2019-01-01.json", "C1"))
+    assert [row[:4] for row in rows] == [
+        ("1546300800.000100", "hi", "U1", "C1"),
+        ("1546300801.0", None, None, "C1"),
+    ]
+    assert json.loads(rows[0][4]) == {}
+    assert json.loads(rows[1][4]) == {"subtype": "channel_join"}
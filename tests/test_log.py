@@ -0,0 +1,34 @@
+import json
+import logging
+
+from sirbot_pyslackers.log import JSONFormatter, SamplingFilter
+
+
+def make_record(level=logging.DEBUG, name="test", **extra):
+    record = logging.makeLogRecord(
+        {"name": name, "levelno": level, "levelname": logging.getLevelName(level)}
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+def test_sampling_filter():
+    sampling = SamplingFilter(rate=0, burst=2)
+    assert [sampling.filter(make_record()) for _ in range(4)] == [
+        True,
+        True,
+        False,
+        False,
+    ]
+    # other loggers and warnings are not sampled
+    assert sampling.filter(make_record(name="other"))
+    assert sampling.filter(make_record(level=logging.WARNING))
+
+
+def test_json_formatter():
+    record = make_record(user="U1")
+    record.msg, record.args = "hello %s", ("world",)
+    data = json.loads(JSONFormatter().format(record))
+    assert data["message"] == "hello world"
+    assert data["level"] == "DEBUG"
+    assert data["user"] == "U1"
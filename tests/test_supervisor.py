@@ -0,0 +1,71 @@
+import os
+import time
+
+import pytest
+from sirbot_pyslackers.supervisor import Supervisor
+
+
+class FakeSupervisor(Supervisor):
+    """Workers idling without heartbeat, or exiting at once"""
+
+    def __init__(self, *args, exiting=(), **kwargs):
+        super().__init__(None, *args, **kwargs)
+        self.exiting = exiting
+
+    def _run_worker(self, worker_id, host, port):
+        if worker_id in self.exiting:
+            os._exit(1)
+        time.sleep(10)
+
+
+@pytest.fixture
+def supervisor():
+    supervisors = []
+
+    def make(*args, **kwargs):
+        supervisor = FakeSupervisor(*args, heartbeat_interval=0, **kwargs)
+        supervisors.append(supervisor)
+        return supervisor
+
+    yield make
+    for supervisor in supervisors:
+        supervisor.shutdown_timeout = 0
+        supervisor._shutdown()
+
+
+def test_dead_worker_restarted(supervisor):
+    supervisor = supervisor(2, exiting=(1,))
+    for worker_id in range(2):
+        supervisor._spawn(worker_id, "127.0.0.1", 0)
+    first, dead = supervisor._processes[0], supervisor._processes[1]
+    dead.join(5)
+
+    supervisor._check_workers("127.0.0.1", 0)
+
+    assert dead.exitcode == 1
+    assert supervisor._processes[0] is first
+    assert supervisor._processes[1] is not dead
+    assert list(supervisor._restarts) == [0, 1]
+
+
+def test_missed_heartbeat_restarted(supervisor):
+    supervisor = supervisor(1, heartbeat_timeout=60)
+    supervisor._spawn(0, "127.0.0.1", 0)
+    stuck = supervisor._processes[0]
+
+    supervisor._check_workers("127.0.0.1", 0)
+    assert supervisor._processes[0] is stuck
+
+    supervisor._heartbeats[0] = time.time() - 61
+    supervisor._check_workers("127.0.0.1", 0)
+
+    assert not stuck.is_alive()
+    assert supervisor._processes[0] is not stuck
+    assert supervisor._processes[0].is_alive()
+    assert supervisor._heartbeats[0] > time.time() - 5
+
+    metrics = {
+        (name, labels["worker"]): value for name, labels, value in supervisor.metrics()
+    }
+    assert metrics[("sirbot_worker_restarts_total", "0")] == 1
+    assert metrics[("sirbot_worker_heartbeat_age_seconds", "0")] < 5